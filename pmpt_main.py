@@ -3,23 +3,46 @@
 CLI tool for prompt enhancement using various AI providers
 """
 import asyncio
+import os
 import sys
 from pathlib import Path
 import click
 
-from src.cli import PromptEnhancerCLI
-from src.version import UpdateChecker, __version__
 from src.config import ConfigManager
+from src.usage import UsageTracker, GROUPINGS
+from src.profiler import SamplingProfiler
+
+# src.cli and src.version pull in the provider SDKs and aiohttp; they are
+# imported inside the commands that need them to keep startup fast
 
 
 @click.group(invoke_without_command=True)
+@click.option('--diff', 'show_diff', is_flag=True, help='Show a word-level diff against your prompt while streaming')
+@click.option('--pipeline', is_flag=True, help='Queue prompts and keep typing while earlier ones are enhanced')
+@click.option('--debug', is_flag=True, default=lambda: bool(os.environ.get('PMPT_DEBUG')),
+              help='Report event loop stalls (also enabled by PMPT_DEBUG=1)')
+@click.option('--profile', is_flag=True, help='Profile the run and write collapsed stacks to --profile-out')
+@click.option('--profile-out', default='pmpt-profile.txt', show_default=True, metavar='OUT',
+              help='Where --profile writes collapsed stacks (summary goes to OUT.summary.txt)')
 @click.pass_context
-def cli(ctx):
+def cli(ctx, show_diff, pipeline, debug, profile, profile_out):
     """PMPT CLI - AI-powered prompt enhancement tool"""
+    if profile:
+        profiler = SamplingProfiler()
+        profiler.start()
+        
+        def write_profile():
+            profiler.stop()
+            click.echo(profiler.write(profile_out), err=True)
+            click.echo(f"\nCollapsed stacks: {profile_out} (summary: {profile_out}.summary.txt)", err=True)
+        
+        ctx.call_on_close(write_profile)
+    
     if ctx.invoked_subcommand is None:
         # Default behavior - run the interactive CLI
+        from src.cli import PromptEnhancerCLI
         try:
-            app = PromptEnhancerCLI()
+            app = PromptEnhancerCLI(show_diff=show_diff, debug=debug, pipeline=pipeline)
             asyncio.run(app.run())
         except KeyboardInterrupt:
             click.echo("\nGoodbye!")
@@ -30,12 +53,15 @@ def cli(ctx):
 @cli.command()
 def version():
     """Show version information"""
+    from src.version import __version__
     click.echo(f"PMPT CLI version {__version__}")
 
 
 @cli.command()
 def update():
     """Check for updates"""
+    from src.version import UpdateChecker, __version__
+    
     async def check_for_update():
         checker = UpdateChecker()
         update_info = await checker.check_for_updates()
@@ -82,9 +108,11 @@ def config():
         click.echo(f"• Base URL: {config.get_base_url()}")
         click.echo(f"• Model: {config.get_model()}")
         click.echo(f"• Current Style: {config.current_style}")
+        click.echo(f"• Local Gentle Engine: {'On' if config.local_gentle else 'Off'}")
         click.echo(f"• API Key: {'Set' if config.get_api_key() else 'Not set'}")
         
     elif choice == "Reconfigure settings":
+        from src.cli import PromptEnhancerCLI
         try:
             app = PromptEnhancerCLI()
             asyncio.run(app._configure_provider())
@@ -93,6 +121,274 @@ def config():
             click.echo(f"❌ Configuration failed: {e}", err=True)
 
 
+@cli.command()
+@click.option('--by', 'group_by', type=click.Choice(GROUPINGS), default='day', help='How to group requests')
+@click.option('--days', type=int, default=None, help='Only include the last N days')
+def stats(group_by, days):
+    """Show token usage, cost and latency statistics"""
+    from rich.console import Console
+    from rich.table import Table
+    
+    config_manager = ConfigManager()
+    config = config_manager.load_config()
+    tracker = UsageTracker(config_manager.config_dir)
+    records = tracker.load(days)
+    
+    if not records:
+        click.echo("No usage recorded yet.")
+        return
+    
+    rows = tracker.aggregate(records, group_by, config.model_prices)
+    
+    table = Table(title=f"Usage by {group_by}")
+    table.add_column(group_by.title())
+    table.add_column("Requests", justify="right")
+    table.add_column("Input", justify="right")
+    table.add_column("Cached", justify="right")
+    table.add_column("Output", justify="right")
+    table.add_column("Avg TTFT", justify="right")
+    table.add_column("Avg latency", justify="right")
+    table.add_column("Cost", justify="right")
+    
+    def seconds(value):
+        return f"{value:.2f}s" if value is not None else "-"
+    
+    for row in rows:
+        table.add_row(
+            row['key'],
+            str(row['requests']),
+            f"{row['input_tokens']:,}",
+            f"{row['cached_tokens']:,}",
+            f"{row['output_tokens']:,}",
+            seconds(row['avg_ttft']),
+            seconds(row['avg_latency']),
+            f"${row['cost']:.4f}" if row['cost'] is not None else "-"
+        )
+    
+    Console().print(table)
+    if not config.model_prices:
+        click.echo("Tip: add \"model_prices\" to ~/.pmpt-cli/config.json to see costs.")
+
+
+@cli.command()
+@click.argument('directory', type=click.Path(exists=True, file_okay=False))
+@click.option('--style', type=click.Choice(['gentle', 'enhanced', 'structured', 'creative']), default=None,
+              help='Enhancement style (default: your current style)')
+@click.option('--pattern', 'patterns', multiple=True, default=['*.md'], show_default=True,
+              help='File pattern to watch (repeatable)')
+@click.option('--debounce', type=float, default=0.5, show_default=True, help='Seconds a file must be quiet before it is enhanced')
+@click.option('--concurrency', type=int, default=4, show_default=True, help='Files enhanced at the same time')
+@click.option('--once', is_flag=True, help='Enhance changed files once and exit')
+def watch(directory, style, patterns, debounce, concurrency, once):
+    """Keep enhanced copies (name.enhanced.md) of prompt files up to date"""
+    from src.cli import PromptEnhancerCLI
+    from src.watcher import PromptWatcher
+
+    app = PromptEnhancerCLI()
+    if not app.config_manager.is_configured(app.config):
+        click.echo("❌ Not configured yet - run pmpt first.", err=True)
+        sys.exit(1)
+
+    watcher = PromptWatcher(
+        app, directory, style or app.config.current_style, list(patterns),
+        debounce=debounce, concurrency=concurrency
+    )
+    try:
+        asyncio.run(watcher.run(once=once))
+    except KeyboardInterrupt:
+        click.echo("\nStopped watching.")
+
+
+@cli.command()
+@click.option('--save-baseline', is_flag=True, help='Store the results as the new baseline')
+@click.option('--baseline', 'baseline_path', type=click.Path(dir_okay=False), default=None,
+              help='Baseline file (default ~/.pmpt-cli/bench-baseline.json)')
+@click.option('--threshold', type=float, default=0.2, show_default=True,
+              help='Flag benchmarks slower than the baseline by more than this fraction')
+@click.option('--only', multiple=True, help='Run only the named benchmark (repeatable)')
+@click.option('--repeat', type=int, default=5, show_default=True, help='Timed runs per benchmark')
+def benchmark(save_baseline, baseline_path, threshold, only, repeat):
+    """Benchmark local hot paths and compare against a baseline"""
+    from rich.console import Console
+    from rich.table import Table
+    from src.benchmarks import BenchmarkSuite
+
+    suite = BenchmarkSuite(repeat=repeat)
+    unknown = [name for name in only if name not in suite.benchmarks]
+    if unknown:
+        raise click.BadParameter(
+            f"unknown benchmark(s) {', '.join(unknown)}; choose from {', '.join(suite.benchmarks)}",
+            param_hint='--only'
+        )
+
+    path = Path(baseline_path) if baseline_path else None
+    results = suite.run(list(only), progress=lambda name: click.echo(f"Running {name}...", err=True))
+    baseline = suite.load_baseline(path) or {}
+    rows = suite.compare(results, baseline, threshold)
+
+    table = Table(title="Benchmarks")
+    table.add_column("Benchmark")
+    table.add_column("Median", justify="right")
+    table.add_column("Baseline", justify="right")
+    table.add_column("Change", justify="right")
+
+    for row in rows:
+        if row['change'] is None:
+            change = "-"
+        else:
+            color = "red" if row['regression'] else "green" if row['change'] < 0 else "white"
+            change = f"[{color}]{row['change']:+.1%}[/{color}]"
+        table.add_row(
+            row['name'],
+            f"{row['median'] * 1000:.1f} ms",
+            f"{row['baseline'] * 1000:.1f} ms" if row['baseline'] is not None else "-",
+            change
+        )
+
+    Console().print(table)
+
+    if save_baseline:
+        suite.save_baseline({**baseline, **results}, path)
+        click.echo(f"Baseline saved to {path or suite.baseline_file}")
+
+    regressions = [row['name'] for row in rows if row['regression']]
+    if regressions:
+        click.echo(f"Regressions beyond {threshold:.0%}: {', '.join(regressions)}", err=True)
+        sys.exit(1)
+
+
+def _split_list(ctx, param, value):
+    """Comma-separated option values, also accepting repeated options"""
+    return [item.strip() for entry in value for item in entry.split(',') if item.strip()]
+
+
+@cli.command('bench-models')
+@click.option('--models', multiple=True, callback=_split_list, help='Models to compare, comma-separated (default: configured model)')
+@click.option('--styles', multiple=True, callback=_split_list, help='Styles to run, comma-separated (default: your current style)')
+@click.option('--backends', multiple=True, callback=_split_list, help='Backends to run: sdk, http (default: configured backend)')
+@click.option('--corpus', type=click.Path(exists=True, dir_okay=False), default=None,
+              help='Prompts, one per line or separated by --- lines (default: a built-in set)')
+@click.option('--concurrency', type=int, default=4, show_default=True, help='Requests in flight per target')
+@click.option('--repeat', type=int, default=1, show_default=True, help='Passes over the corpus per target')
+@click.option('--json', 'json_path', type=click.Path(dir_okay=False), default=None, help='Also write results as JSON (- for stdout)')
+@click.option('--fake-server', is_flag=True, help='Run against a local fake provider instead of the real API')
+@click.option('--fake-ttft', type=float, default=0.05, show_default=True, help='Fake server time to first token (seconds)')
+@click.option('--fake-chunk-delay', type=float, default=0.005, show_default=True, help='Fake server delay between chunks (seconds)')
+def bench_models(models, styles, backends, corpus, concurrency, repeat, json_path, fake_server, fake_ttft, fake_chunk_delay):
+    """Compare latency, throughput, errors and usage across models, styles and backends"""
+    import dataclasses
+    import json
+    from rich.console import Console
+    from rich.table import Table
+    from src.cli import PromptEnhancerCLI
+    from src.model_bench import DEFAULT_CORPUS, BenchTarget, ModelBenchmark, load_corpus, PERCENTILES
+
+    app = PromptEnhancerCLI()
+    config = app.config
+    styles = styles or [config.current_style]
+    unknown = [style for style in styles if style not in app.enhancement_styles]
+    if unknown:
+        raise click.BadParameter(f"unknown style(s) {', '.join(unknown)}", param_hint='--styles')
+    backends = backends or [config.backend]
+    if set(backends) - {'sdk', 'http'}:
+        raise click.BadParameter("choose from sdk, http", param_hint='--backends')
+    if not fake_server and not app.config_manager.is_configured(config):
+        click.echo("❌ Not configured. Run 'pmpt config' first, or use --fake-server.", err=True)
+        sys.exit(1)
+    models = models or [config.model or "fake-model"]
+    prompts = load_corpus(corpus) if corpus else DEFAULT_CORPUS
+    if not prompts:
+        raise click.BadParameter("the corpus has no prompts", param_hint='--corpus')
+
+    targets = [BenchTarget(backend, model, style) for backend in backends for model in models for style in styles]
+    system_prompts = {style: app.enhancement_styles[style]['prompt'] for style in styles}
+    console = Console(stderr=json_path == '-')
+
+    async def run():
+        runner = None
+        bench_config = config
+        api_format = None
+        if fake_server:
+            from src.fake_server import FakeProvider, start_fake_server
+            runner, url = await start_fake_server(FakeProvider(ttft=fake_ttft, chunk_delay=fake_chunk_delay))
+            api_format = "anthropic" if "anthropic.com" in config.get_base_url() else "openai"
+            bench_config = dataclasses.replace(
+                config, api_key="fake", base_url=url if api_format == "anthropic" else url + "/v1"
+            )
+        try:
+            benchmark = ModelBenchmark(bench_config, system_prompts, concurrency, repeat, api_format)
+            return await benchmark.run(
+                targets, prompts,
+                progress=lambda target: console.print(f"[dim]Running {target.model} / {target.style} / {target.backend}...[/dim]")
+            )
+        finally:
+            if runner:
+                await runner.cleanup()
+
+    results = asyncio.run(run())
+
+    def seconds(value):
+        return f"{value:.2f}s" if value is not None else "-"
+
+    table = Table(title=f"{len(prompts)} prompt(s) x {repeat}, concurrency {concurrency}" + (" (fake server)" if fake_server else ""))
+    for column in ("Model", "Style", "Backend"):
+        table.add_column(column)
+    for column in ["Errors", "TTFT p50", "Tok/s"] + [f"p{pct}" for pct in PERCENTILES] + ["Input", "Output", "Cost"]:
+        table.add_column(column, justify="right")
+    for row in results:
+        errors = f"{row['errors']}/{row['requests']}"
+        table.add_row(
+            row['model'], row['style'], row['backend'],
+            f"[red]{errors}[/red]" if row['errors'] else errors,
+            seconds(row['ttft_p50']),
+            f"{row['tokens_per_second']:.0f}" if row['tokens_per_second'] is not None else "-",
+            *[seconds(row[f'latency_p{pct}']) for pct in PERCENTILES],
+            f"{row['input_tokens']:,}",
+            f"{row['output_tokens']:,}",
+            f"${row['cost']:.4f}" if row['cost'] is not None else "-",
+        )
+    console.print(table)
+    for row in results:
+        for message, count in row['error_messages'].items():
+            console.print(f"[red]{row['model']} / {row['style']} / {row['backend']}: {count}x {message}[/red]")
+
+    if json_path:
+        report = json.dumps({
+            'corpus': len(prompts), 'repeat': repeat, 'concurrency': concurrency,
+            'fake_server': fake_server, 'results': results
+        }, indent=2)
+        if json_path == '-':
+            click.echo(report)
+        else:
+            Path(json_path).write_text(report + "\n")
+            console.print(f"[dim]Results written to {json_path}[/dim]")
+
+
+@cli.command('fake-server', hidden=True)
+@click.option('--host', default='127.0.0.1', show_default=True)
+@click.option('--port', type=int, default=8765, show_default=True)
+@click.option('--words', type=int, default=120, show_default=True, help='Words per response')
+@click.option('--ttft', type=float, default=0.0, help='Seconds before the first chunk')
+@click.option('--chunk-delay', type=float, default=0.0, help='Seconds between chunks')
+@click.option('--drop-after', type=int, default=0, help='Cut streams off after N chunks')
+@click.option('--drops', type=int, default=1, show_default=True, help='How many streams to cut off (0 = all)')
+@click.option('--replay', type=click.Path(exists=True, dir_okay=False), default=None,
+              help='Serve a recorded SSE transcript for every stream')
+@click.option('--accept-encoding', multiple=True, callback=_split_list,
+              help='Request body encodings to accept and advertise, comma-separated (e.g. gzip,zstd)')
+@click.option('--reject-stream-options', is_flag=True, help='Answer 400 to streams that ask for usage')
+def fake_server(host, port, words, ttft, chunk_delay, drop_after, drops, replay, accept_encoding,
+                reject_stream_options):
+    """Serve a fake OpenAI/Anthropic API locally for development and tests"""
+    from aiohttp import web
+    from src.fake_server import FakeProvider
+
+    provider = FakeProvider(words, ttft, chunk_delay, drop_after, drops, replay, list(accept_encoding),
+                            reject_stream_options)
+    click.echo(f"Fake provider on http://{host}:{port} (OpenAI base URL: http://{host}:{port}/v1)")
+    web.run_app(provider.app(), host=host, port=port, print=None)
+
+
 def main():
     """Main entry point"""
     cli()
@@ -4,7 +4,7 @@ setup(
     name="pmpt-cli",
     version="0.1.7",
     description="CLI tool for AI-powered prompt enhancement",
-    packages=find_packages(),
+    packages=find_packages(exclude=["tests", "tests.*"]),
     install_requires=[
         "openai>=1.0.0",
         "anthropic>=0.3.0",
@@ -15,6 +15,9 @@ setup(
         "packaging>=21.0",
         "click>=8.0.0",
     ],
+    extras_require={
+        "zstd": ["zstandard>=0.18.0"],
+    },
     python_requires=">=3.8",
     py_modules=['pmpt_main'],
     entry_points={
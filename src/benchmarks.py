@@ -0,0 +1,292 @@
+import asyncio
+import io
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from rich.console import Console
+
+
+# Bump when fixture layouts change so cached fixtures are rebuilt
+FIXTURE_VERSION = 2
+
+DEFAULT_THRESHOLD = 0.2
+
+# Arrival rate of streamed chunks, about what a fast provider sends
+STREAM_CHUNKS_PER_SECOND = 1000
+
+
+@contextmanager
+def _working_directory(path: Path):
+    """Temporarily change the current directory"""
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+class BenchmarkSuite:
+    """Micro-benchmarks for the CLI's local hot paths
+
+    Fixtures are generated once under ~/.pmpt-cli/bench-fixtures and reused.
+    Results can be stored as a baseline and later runs compared against it.
+    A benchmark that paces itself returns the seconds it wants reported
+    instead of its wall time.
+    The CLI under test starts from the default Config in a temporary config
+    directory, so the user's settings do not change what is measured.
+    """
+
+    def __init__(self, config_dir: Path = None, repeat: int = 5):
+        self.config_dir = config_dir or Path.home() / ".pmpt-cli"
+        self.fixture_dir = self.config_dir / "bench-fixtures" / f"v{FIXTURE_VERSION}"
+        self.baseline_file = self.config_dir / "bench-baseline.json"
+        self.repeat = repeat
+        # Removed when the suite is garbage collected
+        self._app_dir = tempfile.TemporaryDirectory(prefix="pmpt-bench-")
+        self.benchmarks: Dict[str, Callable[[], Callable[[], None]]] = {
+            "completer_100k_files": self._bench_completer,
+            "language_detect_monorepo": self._bench_language_detector,
+            "file_context_multi_mb": self._bench_file_context_text,
+            "file_context_binary": self._bench_file_context_binary,
+            "file_context_data_files": self._bench_file_context_data,
+            "stream_render_1000_chunks": self._bench_stream_render,
+            "stream_render_1000_chunks_diff": self._bench_stream_render_diff,
+            "repo_search_5k_files": self._bench_repo_search,
+        }
+
+    def run(self, only: List[str] = None, progress: Callable[[str], None] = None) -> Dict[str, Dict[str, float]]:
+        """Run benchmarks and return timings in seconds"""
+        results = {}
+        for name, setup in self.benchmarks.items():
+            if only and name not in only:
+                continue
+            if progress:
+                progress(name)
+            run_once = setup()
+            run_once()  # Warm up caches and imports
+            timings = []
+            for _ in range(self.repeat):
+                started = time.perf_counter()
+                measured = run_once()
+                timings.append(measured if measured is not None else time.perf_counter() - started)
+            results[name] = {"median": statistics.median(timings), "min": min(timings)}
+        return results
+
+    def save_baseline(self, results: Dict, path: Path = None):
+        """Store results as the baseline"""
+        path = path or self.baseline_file
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    def load_baseline(self, path: Path = None) -> Optional[Dict]:
+        """Load a stored baseline"""
+        path = path or self.baseline_file
+        if not path.exists():
+            return None
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def compare(self, results: Dict, baseline: Dict, threshold: float = DEFAULT_THRESHOLD) -> List[Dict]:
+        """Compare medians against a baseline; flags slowdowns beyond threshold"""
+        rows = []
+        for name, timing in results.items():
+            previous = baseline.get(name)
+            change = None
+            if previous and previous.get("median"):
+                change = timing["median"] / previous["median"] - 1
+            rows.append({
+                "name": name,
+                "median": timing["median"],
+                "baseline": previous["median"] if previous else None,
+                "change": change,
+                "regression": change is not None and change > threshold,
+            })
+        return rows
+
+    # Fixtures
+
+    def _fixture(self, name: str, build: Callable[[Path], None]) -> Path:
+        """Create a fixture directory once and reuse it"""
+        path = self.fixture_dir / name
+        marker = path / ".complete"
+        if not marker.exists():
+            path.mkdir(parents=True, exist_ok=True)
+            build(path)
+            marker.touch()
+        return path
+
+    def _build_file_tree(self, root: Path):
+        """100k files at the completer's depth limit under 100 shallow services
+
+        Fewer files than the completer's cap sit above the depth limit, so
+        every completion lists all 100k files, its worst case.
+        """
+        (root / "requirements.txt").write_text("rich\n")
+        extensions = ['.py', '.ts', '.md', '.json', '.go', '.txt', '.css', '.yaml']
+        for service in range(100):
+            (root / "services" / f"svc{service:02d}").mkdir(parents=True, exist_ok=True)
+            (root / "services" / f"svc{service:02d}" / "README.md").touch()
+            for module in range(10):
+                directory = root / "services" / f"svc{service:02d}" / "src" / f"mod{module}"
+                directory.mkdir(parents=True, exist_ok=True)
+                for index in range(100):
+                    (directory / f"file{index:03d}{extensions[index % len(extensions)]}").touch()
+
+    def _build_monorepo(self, root: Path):
+        """Go services, a TypeScript frontend, vendored deps and ignored output"""
+        (root / ".gitignore").write_text("generated/\n*.log\n")
+        layout = {
+            "services/api": ('.go', 3000),
+            "services/worker": ('.go', 2000),
+            "web/src/components": ('.tsx', 1500),
+            "web/src/lib": ('.ts', 1000),
+            "tools/scripts": ('.py', 300),
+            "web/node_modules/pkg": ('.js', 4000),
+            "generated/proto": ('.py', 3000),
+        }
+        for directory, (ext, count) in layout.items():
+            for index in range(count):
+                sub = root / directory / f"d{index // 100}"
+                sub.mkdir(parents=True, exist_ok=True)
+                (sub / f"f{index}{ext}").touch()
+
+    def _build_large_files(self, root: Path):
+        """A multi-MB source file and a binary blob"""
+        rng = random.Random(42)
+        lines = []
+        for index in range(60000):
+            lines.append(f"    # comment {index}")
+            lines.append(f"    value_{index} = compute({index}, '{'x' * (index % 40)}')")
+        (root / "requirements.txt").write_text("rich\n")
+        (root / "big_module.py").write_text("def run():\n" + "\n".join(lines) + "\n")
+        (root / "blob.bin").write_bytes(bytes(rng.getrandbits(8) for _ in range(2 * 1024 * 1024)))
+
+    def _build_data_files(self, root: Path):
+        """A notebook with image outputs and a 100k-row CSV"""
+        rng = random.Random(3)
+        image = "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/")
+                        for _ in range(200000))
+        cells = []
+        for index in range(40):
+            cells.append({"cell_type": "markdown", "metadata": {}, "source": [f"## Step {index}\n", "Load and plot."]})
+            cells.append({"cell_type": "code", "execution_count": index + 1, "metadata": {},
+                          "source": [f"frame = load({index})\n", "frame.plot()"],
+                          "outputs": [{"output_type": "display_data", "metadata": {}, "data": {"image/png": image}}]})
+        notebook = {"cells": cells, "metadata": {"kernelspec": {"language": "python", "name": "python3"}},
+                    "nbformat": 4, "nbformat_minor": 5}
+        (root / "analysis.ipynb").write_text(json.dumps(notebook))
+        cities = ["Paris", "Oslo", "Rome", "Lima", "Kyiv"]
+        rows = ["id,user,amount,active,city,note"]
+        for index in range(100000):
+            note = "late delivery" if index % 9 == 0 else ""
+            rows.append(f"{index},user{index % 5000},{rng.random() * 500:.2f},"
+                        f"{rng.choice(['true', 'false'])},{rng.choice(cities)},{note}")
+        (root / "events.csv").write_text("\n".join(rows) + "\n")
+
+    def _build_repo_sources(self, root: Path):
+        """5,000 Python modules of 20 functions each over a shared vocabulary"""
+        rng = random.Random(7)
+        words = [f"{rng.choice('bcdfgklmnprst')}{rng.choice('aeiou')}{rng.choice('klmnrst')}{index}" for index in range(3000)]
+        for package in range(50):
+            directory = root / f"pkg{package:02d}"
+            directory.mkdir(parents=True, exist_ok=True)
+            for module in range(100):
+                functions = []
+                for index in range(20):
+                    name = "_".join(rng.sample(words, 2))
+                    body = "\n".join(f"    {rng.choice(words)} = {rng.choice(words)}({rng.choice(words)})" for _ in range(8))
+                    functions.append(f"def {name}_{index}():\n{body}\n")
+                (directory / f"mod{module:03d}.py").write_text("\n\n".join(functions))
+
+    # Benchmarks
+
+    def _make_app(self):
+        """CLI instance with the default configuration that renders into memory"""
+        from .cli import PromptEnhancerCLI
+        from .config import ConfigManager
+        app = PromptEnhancerCLI(config_manager=ConfigManager(Path(self._app_dir.name)))
+        app.console = Console(file=io.StringIO(), force_terminal=True, width=120)
+        return app
+
+    def _bench_completer(self):
+        from prompt_toolkit.document import Document
+        root = self._fixture("file-tree", self._build_file_tree)
+        completer = self._make_app().prompt_session.completer
+
+        def run_once():
+            with _working_directory(root):
+                for text in ("@", "@svc05/README", "@mod9/file099"):
+                    list(completer.get_completions(Document(text), None))
+        return run_once
+
+    def _bench_language_detector(self):
+        from .language_detector import LanguageDetector
+        root = self._fixture("monorepo", self._build_monorepo)
+
+        def run_once():
+            LanguageDetector(str(root)).detect_language_mix()
+        return run_once
+
+    def _bench_file_context(self, reference: str, fixture: str = "large-files", build=None):
+        root = self._fixture(fixture, build or self._build_large_files)
+        app = self._make_app()
+
+        def run_once():
+            with _working_directory(root):
+                app._integrate_file_context(f"Explain {reference}")
+        return run_once
+
+    def _bench_file_context_text(self):
+        return self._bench_file_context("@big_module.py:min")
+
+    def _bench_file_context_binary(self):
+        return self._bench_file_context("@blob.bin")
+
+    def _bench_file_context_data(self):
+        return self._bench_file_context("@analysis.ipynb and @events.csv", "data-files", self._build_data_files)
+
+    def _bench_repo_search(self):
+        from .repo_index import RepoIndex
+        root = self._fixture("repo-sources", self._build_repo_sources)
+        index = RepoIndex(str(root), str(self.fixture_dir / "index"))
+        index.refresh(force=True)
+
+        def run_once():
+            for query in ("why does kan12 call ril7 twice", "rename the mek150 helper", "tor2 lin44 sat9 dum81"):
+                index.search(query)
+        return run_once
+
+    def _bench_stream_render(self, show_diff: bool = False):
+        app = self._make_app()
+        app.show_diff = show_diff
+        words = "please refactor the parser so it reports clear errors with line numbers".split()
+        original = " ".join(words * 20)
+        chunks = [f"{words[index % len(words)]} " for index in range(1000)]
+
+        async def feed():
+            # Paced like a real stream, so rendering sees chunks one at a time
+            started = time.perf_counter()
+            for index, chunk in enumerate(chunks):
+                delay = started + index / STREAM_CHUNKS_PER_SECOND - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                yield chunk
+
+        def run_once():
+            # The pacing fixes the wall time; report the CPU spent rendering
+            started = time.process_time()
+            asyncio.run(app._stream_to_console(feed(), original))
+            return time.process_time() - started
+        return run_once
+
+    def _bench_stream_render_diff(self):
+        return self._bench_stream_render(show_diff=True)
@@ -0,0 +1,69 @@
+import asyncio
+import signal
+import sys
+from contextlib import contextmanager
+
+from prompt_toolkit.input import create_input
+from prompt_toolkit.keys import Keys
+
+
+CANCEL_KEYS = (Keys.Escape, Keys.ControlC)
+
+
+@contextmanager
+def _cancel_on_keypress(callback):
+    """Call callback when Esc or Ctrl-C is pressed inside the block"""
+    terminal_input = None
+    if sys.stdin.isatty():
+        try:
+            terminal_input = create_input()
+        except Exception:
+            terminal_input = None
+
+    if terminal_input is not None:
+        def keys_ready():
+            for key_press in terminal_input.read_keys() + terminal_input.flush_keys():
+                if key_press.key in CANCEL_KEYS:
+                    callback()
+
+        # Raw mode delivers Ctrl-C as a key press instead of SIGINT
+        with terminal_input.raw_mode(), terminal_input.attach(keys_ready):
+            yield
+        return
+
+    # Without a terminal fall back to handling SIGINT on the event loop
+    loop = asyncio.get_event_loop()
+    try:
+        loop.add_signal_handler(signal.SIGINT, callback)
+    except (NotImplementedError, RuntimeError, ValueError):
+        yield
+        return
+
+    try:
+        yield
+    finally:
+        loop.remove_signal_handler(signal.SIGINT)
+
+
+async def run_cancellable(coro) -> bool:
+    """Run a coroutine as a task that Esc or Ctrl-C cancels
+
+    Returns True if the user cancelled it. Cancellation coming from
+    elsewhere is propagated as usual.
+    """
+    task = asyncio.ensure_future(coro)
+    requested = []
+
+    def cancel():
+        if not task.done():
+            requested.append(True)
+            task.cancel()
+
+    try:
+        with _cancel_on_keypress(cancel):
+            await task
+    except asyncio.CancelledError:
+        if not requested:
+            raise
+        return True
+    return False
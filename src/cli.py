@@ -1,3 +1,9 @@
+import asyncio
+import functools
+import os
+import threading
+import time
+from dataclasses import dataclass, field
 from typing import Optional
 from prompt_toolkit import PromptSession
 from prompt_toolkit.formatted_text import HTML
@@ -8,26 +14,74 @@ from prompt_toolkit.completion import WordCompleter
 from rich.console import Console
 from rich.panel import Panel
 from rich.text import Text
-from rich.prompt import Confirm, Prompt
+from rich.prompt import Prompt
 import questionary
 
 from .config import Config, ConfigManager
 from .providers import APIClient
 from .clipboard import ClipboardManager
 from .language_detector import LanguageDetector
+from .diff_view import IncrementalWordDiff, render_diff_ops
+from .cancellation import run_cancellable
+from .usage import UsageTracker
+from .local_engine import LocalGentleEngine
+from .references import REFERENCE_PATTERN, extract_file_references
+from .context_reducer import ContextReducer
+from .extractors import FileExtractor
+from .symbol_index import SymbolIndex
+from .git_refs import GitReferences, GitReference
+from .repo_index import RepoIndex, RepoReference, extract_repo_references
+from .routing import ModelRouter
+from .pipeline import PipelinedSession, PIPELINE_COMMANDS
+from .speculative import SpeculativeEnhancer
+from .sections import split_sections, build_outline
+from .loop_monitor import LoopLagMonitor
+from .profiler import profile_phase
 from .version import UpdateChecker, __version__
 
 
+# Reasonable per-reference limit for @file and git context
+CONTEXT_CHAR_LIMIT = 8000
+
+
+@dataclass
+class ContextReports:
+    """What integrating one prompt's references did, for display"""
+    references: list = field(default_factory=list)  # FileReference, GitReference or RepoReference per @token
+    reductions: list = field(default_factory=list)  # ReductionReport per minified or extracted file
+    retrieval: Optional[tuple] = None  # (results, files re-indexed, search seconds) for @repo
+
+
 class PromptEnhancerCLI:
     """Main CLI application"""
     
-    def __init__(self):
+    def __init__(self, show_diff: bool = False, debug: bool = False, pipeline: bool = False,
+                 config_manager: ConfigManager = None):
         self.console = Console()
-        self.config_manager = ConfigManager()
+        self.config_manager = config_manager or ConfigManager()
         self.clipboard_manager = ClipboardManager()
         self.language_detector = LanguageDetector()
+        self.local_engine = LocalGentleEngine()
+        self.context_reducer = ContextReducer()
+        self.file_extractor = FileExtractor()
+        self.symbol_index = SymbolIndex()
+        self.git_references = GitReferences()
+        self.repo_index = None
+        # Pipeline workers and speculation integrate context in several threads at once
+        self._repo_index_lock = threading.Lock()
         self.update_checker = UpdateChecker()
+        self.usage_tracker = UsageTracker(self.config_manager.config_dir)
         self.config = self.config_manager.load_config()
+        self.model_router = ModelRouter(self.config, self.usage_tracker)
+        self.show_diff = show_diff
+        self.debug = debug
+        self.pipeline = pipeline
+        self.environment = None
+        self.language_context = None
+        self.api_client = None
+        self.partial_output = ""
+        # Messages of the last enhancement, continued by /refine
+        self.conversation = None
         
         self.style = Style.from_dict({
             'title': '#00aa00 bold',
@@ -67,12 +121,12 @@ class PromptEnhancerCLI:
         
         # Create command and file completer
         from prompt_toolkit.completion import Completer, Completion
-        import os
         import glob
         
         class CommandAndFileCompleter(Completer):
-            def __init__(self):
-                self.commands = ['/help', '/style', '/quit', '/version']
+            def __init__(self, symbol_index, extra_commands):
+                self.commands = ['/help', '/style', '/diff', '/refine', '/quit', '/version'] + extra_commands
+                self.symbol_index = symbol_index
             
             def get_completions(self, document, complete_event):
                 text_before_cursor = document.text_before_cursor
@@ -101,6 +155,22 @@ class PromptEnhancerCLI:
                     at_pos = text_before_cursor.rfind('@')
                     file_partial = text_before_cursor[at_pos + 1:]
                     
+                    # Complete symbol names after @path/to/file.py::
+                    if '::' in file_partial:
+                        file_path, symbol_partial = file_partial.split('::', 1)
+                        if os.path.isfile(file_path):
+                            for name in self.symbol_index.complete(file_path, symbol_partial)[:30]:
+                                yield Completion(
+                                    f"{file_path}::{name}",
+                                    start_position=-len(file_partial),
+                                    display=f"@{file_path}::{name}"
+                                )
+                        return
+                    
+                    # @repo retrieves relevant code rather than naming a file
+                    if file_partial and 'repo'.startswith(file_partial.lower()):
+                        yield Completion('repo', start_position=-len(file_partial), display="@repo (relevant code)")
+                    
                     # Get file list for suggestions
                     try:
                         all_files = []
@@ -182,7 +252,7 @@ class PromptEnhancerCLI:
                     except Exception:
                         pass  # Silently ignore file system errors
         
-        completer = CommandAndFileCompleter()
+        completer = CommandAndFileCompleter(self.symbol_index, PIPELINE_COMMANDS if pipeline else [])
         
         # Create key bindings for custom Enter behavior
         bindings = KeyBindings()
@@ -197,13 +267,21 @@ class PromptEnhancerCLI:
             """New line on Alt+Enter"""
             event.current_buffer.insert_text('\n')
         
-        # Create prompt session with multiline support for main prompts
+        # Create prompt session with multiline support for main prompts;
+        # completions walk the file system, so keep them off the event loop
         self.prompt_session = PromptSession(
             multiline=True,
             completer=completer,
+            complete_in_thread=True,
             key_bindings=bindings
         )
         
+        # Optionally start enhancing while the user is still typing
+        self.speculator = None
+        if self.config.speculative and not pipeline:
+            self.speculator = SpeculativeEnhancer(self, self.config.speculative_token_budget)
+            self.speculator.attach(self.prompt_session.default_buffer)
+        
         # Create single-line prompt session for configuration inputs
         self.config_prompt_session = PromptSession(
             multiline=False,
@@ -211,20 +289,12 @@ class PromptEnhancerCLI:
         )
     
     def _extract_file_references(self, prompt: str) -> list:
-        """Extract file references (@filepath) from prompt text"""
-        import re
-        
-        # Match @filepath patterns - handle both @filename and @path/to/file
-        pattern = r'@([^\s@]+(?:/[^\s@]*)*)'
-        matches = re.findall(pattern, prompt)
-        
-        # Filter out duplicates and validate files exist
-        file_paths = []
-        for match in matches:
-            if os.path.isfile(match):
-                file_paths.append(match)
-        
-        return file_paths
+        """Extract file, repo and git references (@filepath[:mode], @repo, @diff, @HEAD~1, @branch:path) from prompt text"""
+        file_references = extract_file_references(prompt)
+        tokens = {reference.token for reference in file_references}
+        repo_references = extract_repo_references(prompt, skip_tokens=tokens)
+        tokens.update(reference.token for reference in repo_references)
+        return file_references + repo_references + self.git_references.extract(prompt, skip_tokens=tokens)
     
     def _read_file_content(self, file_path: str) -> str:
         """Read and return file content with proper encoding handling"""
@@ -250,35 +320,128 @@ class PromptEnhancerCLI:
         except Exception as e:
             return f"[Error reading file {file_path}: {str(e)}]"
     
-    def _integrate_file_context(self, prompt: str) -> str:
-        """Integrate file contents into the prompt context"""
+    def _integrate_file_context(self, prompt: str) -> tuple:
+        """Integrate file contents into the prompt context; returns the prompt and its ContextReports"""
         file_references = self._extract_file_references(prompt)
+        reports = ContextReports(references=file_references)
         
         if not file_references:
-            return prompt
+            return prompt, reports
         
         # Build context from referenced files
         file_contexts = []
-        for file_path in file_references:
+        for reference in file_references:
+            if isinstance(reference, GitReference):
+                content = self._truncate_context(self.git_references.content(reference, CONTEXT_CHAR_LIMIT))
+                file_contexts.append(f"--- Git: {reference.label} ---\n{content}\n--- End of {reference.label} ---\n")
+                continue
+            if isinstance(reference, RepoReference):
+                content, reports.retrieval = self._repo_context(prompt)
+                file_contexts.append(f"--- Repository matches ---\n{content}\n--- End of repository matches ---\n")
+                continue
+            
+            file_path = reference.path
+            
+            # Notebooks and data files are summarized instead of sent raw
+            extracted = None if reference.symbol else self.file_extractor.extract(file_path)
+            if extracted:
+                content, report = extracted
+                reports.reductions.append(report)
+                content = self._truncate_context(content)
+                file_contexts.append(f"--- File: {reference.label} ---\n{content}\n--- End of {reference.label} ---\n")
+                continue
+            
             content = self._read_file_content(file_path)
             
-            # Truncate very large files to avoid token limits
-            if len(content) > 8000:  # Reasonable limit for context
-                content = content[:8000] + "\n... [File truncated for brevity]"
+            # Only send the requested definition for @file::Symbol references
+            if reference.symbol:
+                snippet = self.symbol_index.extract(
+                    file_path, content, reference.symbol,
+                    callers='callers' in reference.options,
+                    signatures='signatures' in reference.options
+                )
+                if snippet is None:
+                    content = f"[Symbol {reference.symbol} not found, full file included]\n{content}"
+                else:
+                    content = snippet
+            
+            # Strip comments, blank runs and generated noise in min mode
+            if (reference.mode or self.config.context_mode) == "min":
+                content, report = self.context_reducer.reduce(file_path, content, CONTEXT_CHAR_LIMIT)
+                reports.reductions.append(report)
             
-            file_context = f"--- File: {file_path} ---\n{content}\n--- End of {file_path} ---\n"
+            content = self._truncate_context(content)
+            file_context = f"--- File: {reference.label} ---\n{content}\n--- End of {reference.label} ---\n"
             file_contexts.append(file_context)
         
         # Integrate file contexts with the original prompt
         if file_contexts:
             context_section = "\n".join(file_contexts)
             enhanced_prompt = f"{prompt}\n\n[File Context for Reference:]\n{context_section}"
-            return enhanced_prompt
+            return enhanced_prompt, reports
         
-        return prompt
+        return prompt, reports
+    
+    def _repo_context(self, prompt: str) -> tuple:
+        """Chunks of the repository most relevant to the prompt, for @repo, and the retrieval report"""
+        # One index per session; refreshing it from two threads at once would index twice
+        with self._repo_index_lock:
+            if self.repo_index is None:
+                root = self.git_references.root or os.getcwd()
+                self.repo_index = RepoIndex(root, str(self.config_manager.config_dir), self.symbol_index)
+            if self.repo_index.is_empty:
+                self.console.print("[dim]Indexing repository for @repo (first run only)...[/dim]")
+            updated = self.repo_index.refresh()
+            
+            started = time.perf_counter()
+            results = self.repo_index.search(REFERENCE_PATTERN.sub(' ', prompt))
+            elapsed = time.perf_counter() - started
+            content = self.repo_index.render(results, CONTEXT_CHAR_LIMIT) if results else None
+        return content or "[No matching code found in the repository]", (results, updated, elapsed)
+    
+    def _truncate_context(self, content: str) -> str:
+        """Truncate very large context to avoid token limits"""
+        if len(content) > CONTEXT_CHAR_LIMIT:
+            content = content[:CONTEXT_CHAR_LIMIT] + "\n... [File truncated for brevity]"
+        return content
+    
+    def _show_context_reports(self, reports: ContextReports):
+        """Show how much each minified or extracted file shrank, and what @repo retrieved"""
+        if reports.retrieval:
+            results, updated, elapsed = reports.retrieval
+            files = len({result.path for result in results})
+            reindexed = f", {updated} file(s) re-indexed" if updated else ""
+            self.console.print(
+                f"[dim]🔎 @repo: {len(results)} chunk(s) from {files} file(s) in {elapsed * 1000:.0f} ms{reindexed}[/dim]"
+            )
+            for result in results:
+                self.console.print(f"[dim]   {result.label}[/dim]")
+        for report in reports.reductions:
+            note = f" ({report.note})" if report.note else ""
+            self.console.print(
+                f"[dim]✂ {report.path}{note}: {report.original_chars / 1024:.1f} KB → "
+                f"{report.reduced_chars / 1024:.1f} KB, ~{report.saved_tokens:,} tokens saved[/dim]"
+            )
+    
+    async def _run_blocking(self, func, *args, **kwargs):
+        """Run blocking I/O in the default executor so the event loop stays responsive"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+    
+    async def _detect_environment(self):
+        """Scan the project once, off the event loop"""
+        if self.language_context is None:
+            self.environment = await self._run_blocking(self.language_detector.describe_environment)
+            self.language_context = await self._run_blocking(self.language_detector.get_language_context)
+        return self.language_context
     
     async def run(self):
         """Main application loop"""
+        monitor = None
+        if self.debug:
+            monitor = LoopLagMonitor(console=self.console)
+            monitor.start()
+        
         try:
             # Check if this is first run (no config file)
             if not self.config_manager.config_file.exists():
@@ -286,8 +449,18 @@ class PromptEnhancerCLI:
                 if not await self._configure_provider():
                     return
             
+            with profile_phase("file ingestion"):
+                await self._detect_environment()
             self._show_welcome()
             
+            if self.pipeline:
+                if not self.config_manager.is_configured(self.config):
+                    self._show_configuration_needed()
+                    if not await self._configure_provider():
+                        return
+                await PipelinedSession(self, self.config.pipeline_concurrency).run()
+                return
+            
             while True:
                 try:
                     # Check if configured
@@ -303,14 +476,19 @@ class PromptEnhancerCLI:
                     if not user_prompt:
                         continue
                     
-                    # Enhance prompt with streaming
-                    enhanced_prompt = await self._enhance_prompt_stream(user_prompt)
+                    # Enhance prompt with streaming, or refine the last result
+                    if user_prompt.lower().split(maxsplit=1)[0] == '/refine':
+                        enhanced_prompt = await self._refine(user_prompt[len('/refine'):].strip())
+                    else:
+                        enhanced_prompt = await self._enhance_prompt_stream(user_prompt)
                     if not enhanced_prompt:
                         continue
                     
                     # Ask to copy to clipboard
-                    if Confirm.ask("[yellow]Copy enhanced prompt to clipboard?[/yellow]", default=True):
-                        if self.clipboard_manager.copy_to_clipboard(enhanced_prompt):
+                    with profile_phase("user input"):
+                        copy = await questionary.confirm("Copy enhanced prompt to clipboard?", default=True).ask_async()
+                    if copy:
+                        if await self._run_blocking(self.clipboard_manager.copy_to_clipboard, enhanced_prompt):
                             self.console.print("[green]✓ Copied to clipboard![/green]")
                         else:
                             self.console.print("[red]✗ Failed to copy to clipboard[/red]")
@@ -324,13 +502,20 @@ class PromptEnhancerCLI:
                     
         except KeyboardInterrupt:
             self.console.print("\n[yellow]Goodbye![/yellow]")
+        finally:
+            self.git_references.close()
+            if self.speculator:
+                self.speculator.close()
+            await self._close_api_client()
+            if monitor:
+                monitor.stop()
     
     def _show_welcome(self):
         """Display welcome message"""
         title = Text("PMPT CLI", style="bold cyan")
         
         current_style_name = self.enhancement_styles[self.config.current_style]['name']
-        detected_language = self.language_detector.detect_language()
+        detected_language = self.environment
         
         if self.config.provider:
             subtitle = f"Provider: {self.config.provider} | Model: {self.config.get_model()} | Style: {current_style_name}"
@@ -338,7 +523,7 @@ class PromptEnhancerCLI:
             subtitle = f"Base URL: {self.config.get_base_url()} | Model: {self.config.get_model()} | Style: {current_style_name}"
         
         if detected_language:
-            subtitle += f" | Environment: {detected_language.title()}"
+            subtitle += f" | Environment: {detected_language}"
         
         panel = Panel(
             f"[bold cyan]{title}[/bold cyan]\n"
@@ -346,14 +531,18 @@ class PromptEnhancerCLI:
             "[bold]How to use:[/bold]\n"
             "• Enter your prompt and get an enhanced version\n"
             "• [yellow]Enter[/yellow] - Process prompt\n"
-            "• [yellow]Alt+Enter[/yellow] - New line\n\n"
+            "• [yellow]Alt+Enter[/yellow] - New line\n"
+            "• [yellow]Esc[/yellow] / [yellow]Ctrl+C[/yellow] - Stop a running enhancement\n\n"
             "[bold]Available commands:[/bold]\n"
             "• [green]/help[/green] - Show detailed help\n"
             "• [green]/style[/green] - Change enhancement style\n"
+            "• [green]/diff[/green] - Toggle diff against your prompt\n"
+            "• [green]/refine[/green] - Tweak the last result\n"
             "• [green]/version[/green] - Show version info\n"
             "• [green]/quit[/green] - Exit application\n\n"
             "[bold]External commands:[/bold]\n"
             "• [cyan]pmpt config[/cyan] - Configure settings\n"
+            "• [cyan]pmpt stats[/cyan] - Token usage and cost\n"
             "• [cyan]pmpt update[/cyan] - Check for updates",
             title="🚀 Welcome",
             title_align="left",
@@ -453,7 +642,8 @@ class PromptEnhancerCLI:
             # Save configuration
             self.config.api_key = api_key
             self.config.model = model
-            self.config_manager.save_config(self.config)
+            await self._run_blocking(self.config_manager.save_config, self.config)
+            await self._close_api_client()
             
             self.console.print(f"\n[green]✓ Configuration saved successfully![/green]")
             self.console.print(f"Provider: {self.config.provider or 'Custom'}")
@@ -488,7 +678,7 @@ class PromptEnhancerCLI:
             
             if style_choice:
                 self.config.current_style = style_choice
-                self.config_manager.save_config(self.config)
+                await self._run_blocking(self.config_manager.save_config, self.config)
                 style_name = self.enhancement_styles[style_choice]['name']
                 self.console.print(f"[green]✓ Style changed to: {style_name}[/green]")
         except KeyboardInterrupt:
@@ -503,6 +693,8 @@ class PromptEnhancerCLI:
         self.console.print("\n[bold yellow]🔧 Available Commands:[/bold yellow]")
         self.console.print("  [cyan]/help[/cyan]    - Show this help message")
         self.console.print("  [cyan]/style[/cyan]   - Change enhancement style (Gentle/Structured/Creative)")
+        self.console.print("  [cyan]/diff[/cyan]    - Toggle word-level diff against your original prompt")
+        self.console.print("  [cyan]/refine[/cyan]  - Refine the last result, e.g. [cyan]/refine make it shorter[/cyan]")
         self.console.print("  [cyan]/version[/cyan] - Show version information")
         self.console.print("  [cyan]/quit[/cyan]    - Exit the application")
         
@@ -512,6 +704,8 @@ class PromptEnhancerCLI:
         self.console.print("  • Your prompt will be enhanced using AI and displayed")
         self.console.print("  • Enhanced prompts are automatically copied to clipboard")
         self.console.print("  • Supports multiline input - paste long texts freely")
+        self.console.print("  • Reference files with [cyan]@path/to/file[/cyan]; add [cyan]:min[/cyan] to strip comments and noise")
+        self.console.print("  • Reference one definition with [cyan]@file.py::Class.method[/cyan] (add [cyan]:callers[/cyan] or [cyan]:signatures[/cyan] for more)")
         
         # Styles section
         current_style = self.enhancement_styles[self.config.current_style]
@@ -524,9 +718,9 @@ class PromptEnhancerCLI:
             self.console.print(f"  {marker} [bold]{style_info['name']}[/bold]: {style_info['description']}")
         
         # Environment info
-        detected_language = self.language_detector.detect_language()
+        detected_language = self.environment
         if detected_language:
-            self.console.print(f"\n[bold yellow]🌍 Detected Environment:[/bold yellow] [green]{detected_language.title()}[/green]")
+            self.console.print(f"\n[bold yellow]🌍 Detected Environment:[/bold yellow] [green]{detected_language}[/green]")
         
         # Tips section
         self.console.print(f"\n[bold yellow]💰 Tips:[/bold yellow]")
@@ -570,9 +764,10 @@ class PromptEnhancerCLI:
             ])
             
             # Use prompt_toolkit with multiline for proper paste support
-            user_input = await self.prompt_session.prompt_async(
-                colored_prompt
-            )
+            with profile_phase("user input"):
+                user_input = await self.prompt_session.prompt_async(
+                    colored_prompt
+                )
             user_input = user_input.strip()
             
             if user_input.lower() == '/quit':
@@ -583,6 +778,11 @@ class PromptEnhancerCLI:
             elif user_input.lower() == '/help':
                 self._show_help()
                 return ""
+            elif user_input.lower() == '/diff':
+                self.show_diff = not self.show_diff
+                state = "on" if self.show_diff else "off"
+                self.console.print(f"[green]✓ Diff view {state}[/green]")
+                return ""
             elif user_input.lower() == '/version':
                 self._show_version()
                 return ""
@@ -607,42 +807,272 @@ class PromptEnhancerCLI:
         """Enhance user prompt using AI with streaming"""
         if not user_prompt:
             return ""
+        self.conversation = None
+        
+        # Simple Gentle fixes can be done locally without a network round-trip
+        if self.config.current_style == "gentle" and self.config.local_gentle:
+            local_result = self.local_engine.enhance(user_prompt)
+            if local_result is not None:
+                return await self._show_local_result(user_prompt, local_result)
         
         try:
             # Integrate file context if @filepath references are found
-            integrated_prompt = self._integrate_file_context(user_prompt)
+            integrated_prompt, context_reports = await self._run_blocking(self._integrate_file_context, user_prompt)
             
             # Show file integration info if files were referenced
-            file_references = self._extract_file_references(user_prompt)
+            file_references = context_reports.references
             if file_references:
-                self.console.print(f"[dim]🔗 Integrated {len(file_references)} file(s): {', '.join(file_references)}[/dim]")
+                labels = ', '.join(reference.label for reference in file_references)
+                self.console.print(f"[dim]🔗 Integrated {len(file_references)} reference(s): {labels}[/dim]")
+                self._show_context_reports(context_reports)
             
-            client = APIClient(self.config)
-            current_style = self.enhancement_styles[self.config.current_style]
+            # Very long prompts are enhanced section by section in parallel
+            long_prompt_chars = self.config.long_prompt_chars
+            if long_prompt_chars and len(user_prompt) >= long_prompt_chars and not file_references:
+                sections = split_sections(user_prompt)
+                if len(sections) > 1:
+                    return await self._enhance_sections(user_prompt, sections)
             
-            # Add language context to the system prompt
-            language_context = self.language_detector.get_language_context()
-            enhanced_system_prompt = current_style['prompt']
-            if language_context:
-                enhanced_system_prompt += f" The user is working on a {language_context}, so consider this context when enhancing their prompt."
+            client = self._get_api_client()
+            current_style = self.enhancement_styles[self.config.current_style]
+            enhanced_system_prompt = await self._build_system_prompt(self.config.current_style, bool(file_references))
             
-            # If files were integrated, add instruction to use the context
-            if file_references:
-                enhanced_system_prompt += " The user has provided file context that should inform and improve the enhanced prompt. Use the provided file contents to make the prompt more specific, relevant, and powerful."
+            model = await self._choose_model(self.config.current_style, len(integrated_prompt))
             
             # Show label first
             self.console.print(f"\n[bold green]Enhanced Prompt ({current_style['name']}):[/bold green]")
             
             # Stream the response using the integrated prompt
-            enhanced_prompt = ""
-            async for chunk in client.enhance_prompt_stream(integrated_prompt, enhanced_system_prompt):
-                self.console.print(chunk, end="")
-                enhanced_prompt += chunk
-            
-            self.console.print()  # New line after streaming
+            # Budget output tokens by style and the size of what the user wrote
+            max_tokens = self.config.get_output_budget(self.config.current_style, len(user_prompt))
+            speculation = None
+            if self.speculator:
+                speculation = self.speculator.take(integrated_prompt, enhanced_system_prompt, max_tokens, model)
+            if speculation:
+                # Started while the prompt was being typed; it records its own usage
+                chunks = speculation.stream()
+            else:
+                chunks = client.enhance_prompt_stream(integrated_prompt, enhanced_system_prompt, max_tokens, model)
+            enhanced_prompt = await self._stream_to_console(chunks, user_prompt)
+            usage = (speculation.usage or {}) if speculation else client.last_usage
+            if usage.get('truncated'):
+                self.console.print(
+                    f"[yellow]⚠ Output hit the {max_tokens}-token budget for {current_style['name']} and was cut off. "
+                    f"Raise output_budgets in ~/.pmpt-cli/config.json if this happens often.[/yellow]"
+                )
+            if not speculation:
+                await self._run_blocking(
+                    self.usage_tracker.record,
+                    client.last_usage,
+                    self.config.current_style,
+                    len(integrated_prompt) - len(user_prompt)
+                )
+            if enhanced_prompt:
+                self.conversation = {
+                    'style': self.config.current_style,
+                    'system_prompt': enhanced_system_prompt,
+                    'model': model,
+                    'context_chars': len(integrated_prompt) - len(user_prompt),
+                    'messages': [
+                        {"role": "user", "content": integrated_prompt},
+                        {"role": "assistant", "content": enhanced_prompt},
+                    ],
+                }
             return enhanced_prompt
             
         except Exception as e:
             self.console.print(f"[red]Enhancement failed: {e}[/red]")
             return None
     
+    async def _refine(self, instruction: str) -> Optional[str]:
+        """Continue the last enhancement with a follow-up instruction
+        
+        The earlier messages are resent unchanged, so from the second
+        refinement on providers serve the system prompt and file context
+        from their prompt cache.
+        """
+        if not self.conversation:
+            self.console.print("[yellow]Nothing to refine yet - enhance a prompt first[/yellow]")
+            return None
+        if not instruction:
+            self.console.print("[yellow]Usage: /refine <instruction>, e.g. /refine make it shorter[/yellow]")
+            return None
+        
+        conversation = self.conversation
+        previous = conversation['messages'][-1]['content']
+        messages = conversation['messages'] + [{
+            "role": "user",
+            "content": f"Revise the enhanced prompt above as follows: {instruction}\nReturn ONLY the complete revised prompt."
+        }]
+        
+        try:
+            client = self._get_api_client()
+            style = conversation['style']
+            self.console.print(f"\n[bold green]Refined Prompt ({self.enhancement_styles[style]['name']}):[/bold green]")
+            max_tokens = self.config.get_output_budget(style, len(previous))
+            refined = await self._stream_to_console(
+                client.stream_conversation(messages, conversation['system_prompt'], max_tokens, conversation['model']),
+                previous
+            )
+            usage = client.last_usage
+            if usage.get('cached_tokens'):
+                self.console.print(f"[dim]♻ {usage['cached_tokens']:,} input tokens served from the prompt cache[/dim]")
+            if usage.get('truncated'):
+                self.console.print(f"[yellow]⚠ Output hit the {max_tokens}-token budget and was cut off.[/yellow]")
+            await self._run_blocking(self.usage_tracker.record, usage, style, conversation['context_chars'])
+            
+            if refined:
+                conversation['messages'] = messages + [{"role": "assistant", "content": refined}]
+            return refined
+            
+        except Exception as e:
+            self.console.print(f"[red]Refinement failed: {e}[/red]")
+            return None
+    
+    async def _choose_model(self, style: str, input_chars: int) -> str:
+        """Model for a request, announced when routing picks a non-default one"""
+        # Adaptive routing reads the usage log, so keep it off the event loop
+        model = await self._run_blocking(self.model_router.choose, style, input_chars)
+        if model != self.config.get_model():
+            self.console.print(f"[dim]↪ Routed to {model}[/dim]")
+        return model
+    
+    async def _build_system_prompt(self, style: str, has_file_context: bool = False) -> str:
+        """System prompt for a style, with project and file context instructions"""
+        system_prompt = self.enhancement_styles[style]['prompt']
+        
+        # Add language context to the system prompt
+        language_context = await self._detect_environment()
+        if language_context:
+            system_prompt += f" The user is working on a {language_context}, so consider this context when enhancing their prompt."
+        
+        # If files were integrated, add instruction to use the context
+        if has_file_context:
+            system_prompt += " The user has provided file context that should inform and improve the enhanced prompt. Use the provided file contents to make the prompt more specific, relevant, and powerful."
+        return system_prompt
+    
+    async def _enhance_text(self, text: str, style: str) -> tuple:
+        """Enhance text without any interactive output; returns the result and its recorded usage"""
+        system_prompt = await self._build_system_prompt(style)
+        max_tokens = self.config.get_output_budget(style, len(text))
+        model = await self._run_blocking(self.model_router.choose, style, len(text))
+        client = self._get_api_client()
+        enhanced = await client.enhance_prompt(text, system_prompt, max_tokens, model)
+        usage = dict(client.last_usage)
+        await self._run_blocking(self.usage_tracker.record, usage, style, 0)
+        return enhanced, usage
+    
+    async def _enhance_sections(self, user_prompt: str, sections: list) -> str:
+        """Enhance sections concurrently, showing them in order as the leading ones finish"""
+        client = self._get_api_client()
+        style = self.config.current_style
+        current_style = self.enhancement_styles[style]
+        outline = build_outline(sections)
+        base_system_prompt = await self._build_system_prompt(style)
+        concurrency = max(1, self.config.section_concurrency)
+        semaphore = asyncio.Semaphore(concurrency)
+        truncated = []
+        
+        async def enhance(index, section):
+            system_prompt = (
+                f"{base_system_prompt} The prompt is long, so it is enhanced one section at a time. "
+                f"You are given section {index + 1} of {len(sections)}; the outline of the whole prompt is below "
+                f"for context. Return ONLY the enhanced text of this section, keep its heading, and do not "
+                f"repeat or summarize other sections.\n\n{outline}"
+            )
+            max_tokens = self.config.get_output_budget(style, len(section.text))
+            routed_model = await self._run_blocking(self.model_router.choose, style, len(section.text))
+            async with semaphore:
+                result = await client.enhance_prompt(section.text, system_prompt, max_tokens, routed_model)
+            usage = dict(client.last_usage)
+            if usage.get('truncated'):
+                truncated.append(index + 1)
+            await self._run_blocking(self.usage_tracker.record, usage, style, 0)
+            return result
+        
+        tasks = [asyncio.ensure_future(enhance(index, section)) for index, section in enumerate(sections)]
+        
+        async def ordered_results():
+            try:
+                for index, task in enumerate(tasks):
+                    separator = "\n\n" if index < len(tasks) - 1 else ""
+                    yield (await task).strip() + separator
+            finally:
+                for task in tasks:
+                    task.cancel()
+                # Let cancelled requests close their connections, and collect
+                # their errors so none is reported as never retrieved
+                await asyncio.gather(*tasks, return_exceptions=True)
+        
+        self.console.print(f"\n[bold green]Enhanced Prompt ({current_style['name']}):[/bold green]")
+        self.console.print(
+            f"[dim]Long prompt: enhancing {len(sections)} sections, "
+            f"{min(len(sections), concurrency)} at a time[/dim]"
+        )
+        enhanced_prompt = await self._stream_to_console(ordered_results(), user_prompt)
+        if truncated:
+            self.console.print(
+                f"[yellow]⚠ Section(s) {', '.join(map(str, sorted(truncated)))} hit the output budget and were cut off.[/yellow]"
+            )
+        return enhanced_prompt
+    
+    async def _show_local_result(self, user_prompt: str, result: str) -> str:
+        """Display a result produced by the local engine"""
+        self.console.print(f"\n[bold green]Enhanced Prompt (Gentle, local):[/bold green]")
+        
+        async def chunks():
+            yield result
+        
+        return await self._stream_to_console(chunks(), user_prompt)
+    
+    def _get_api_client(self) -> APIClient:
+        """Reuse one client per session so its connection pool survives between requests"""
+        if self.api_client is None:
+            self.api_client = APIClient(self.config)
+        return self.api_client
+    
+    async def _close_api_client(self):
+        """Release the client's pooled connections"""
+        if self.api_client is not None:
+            await self.api_client.close()
+            self.api_client = None
+    
+    async def _stream_to_console(self, chunks, original_prompt: str) -> str:
+        """Print streamed chunks until done or cancelled with Esc/Ctrl-C"""
+        self.partial_output = ""
+        diff = IncrementalWordDiff(original_prompt) if self.show_diff else None
+        
+        error = None
+        
+        async def consume():
+            nonlocal error
+            try:
+                async for chunk in chunks:
+                    if diff:
+                        ops = diff.feed(chunk)
+                        if ops:
+                            self.console.print(render_diff_ops(ops), end="")
+                    else:
+                        self.console.print(chunk, end="")
+                    self.partial_output += chunk
+            except Exception as e:
+                # Streams are resumed after dropped connections; if that
+                # fails too, whatever arrived is still worth keeping
+                if not self.partial_output:
+                    raise
+                error = e
+        
+        with profile_phase("network wait"):
+            cancelled = await run_cancellable(consume())
+        
+        if diff:
+            self.console.print(render_diff_ops(diff.finish()), end="")
+        self.console.print()  # New line after streaming
+        
+        if cancelled:
+            self.console.print("[yellow]⏹ Cancelled - keeping the partial output[/yellow]")
+        elif error:
+            self.console.print(f"[red]✗ Stream failed: {error}[/red]")
+            self.console.print("[yellow]Keeping the partial output[/yellow]")
+        return self.partial_output
+    
@@ -0,0 +1,214 @@
+import gzip
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+try:
+    import zstandard
+except ImportError:  # Optional: pip install pmpt-cli[zstd]
+    zstandard = None
+
+
+# Smaller bodies gain less from compression than the endpoint spends inflating them
+COMPRESS_MIN_BYTES = 16 * 1024
+
+# Hosted APIs that reject compressed request bodies; never compressed or probed
+PUBLIC_HOSTS = ('api.openai.com', 'api.anthropic.com', 'openrouter.ai')
+
+# Probe results are trusted for a week, then the endpoint is asked again
+CAPABILITY_TTL = 7 * 24 * 3600
+
+COMPRESSION_MODES = ('off', 'auto', 'gzip', 'zstd')
+
+
+def supported_encodings() -> List[str]:
+    """Encodings this install can produce, most effective first"""
+    return (['zstd'] if zstandard else []) + ['gzip']
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=3).compress(body)
+    return gzip.compress(body, compresslevel=5)
+
+
+def parse_accept_encoding(header: str) -> List[str]:
+    """Codings listed in an Accept-Encoding header, without q=0 entries"""
+    codings = []
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding or params.replace(' ', '').lower() in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        codings.append(coding)
+    return codings
+
+
+def is_public_endpoint(base_url: str) -> bool:
+    host = (urlparse(base_url).hostname or '').lower()
+    return any(host == public or host.endswith('.' + public) for public in PUBLIC_HOSTS)
+
+
+class CompressionCapabilities:
+    """Request encodings accepted by each endpoint, cached across runs
+
+    Stored in ~/.pmpt-cli/capabilities.json as
+    {base_url: {"encodings": [...], "checked": timestamp}}.
+    """
+
+    def __init__(self, cache_file: Optional[Path] = None):
+        self.cache_file = cache_file or Path.home() / ".pmpt-cli" / "capabilities.json"
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.cache_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, base_url: str) -> Optional[List[str]]:
+        """Cached encodings for an endpoint, or None if it has to be probed"""
+        entry = self._load().get(base_url)
+        if not entry or time.time() - entry.get('checked', 0) > CAPABILITY_TTL:
+            return None
+        return entry.get('encodings', [])
+
+    def set(self, base_url: str, encodings: List[str]):
+        with self._lock:
+            data = self._load()
+            data[base_url] = {'encodings': encodings, 'checked': time.time()}
+            try:
+                self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+                temp_file = self.cache_file.with_suffix(".tmp")
+                with open(temp_file, 'w') as f:
+                    json.dump(data, f, indent=2)
+                os.replace(temp_file, self.cache_file)
+            except OSError:
+                pass  # Probed again next run
+
+
+class RequestCompressor:
+    """Decides whether and how to compress request bodies for one endpoint
+
+    In "auto" mode the endpoint is probed once with an OPTIONS request and
+    its Accept-Encoding response header (RFC 7694) is cached. A 415 reply
+    to a compressed request marks the encoding as unsupported, and the
+    caller resends the body uncompressed.
+    """
+
+    def __init__(self, base_url: str, mode: str, capabilities: CompressionCapabilities = None,
+                 min_bytes: int = COMPRESS_MIN_BYTES):
+        self.base_url = base_url
+        self.mode = mode
+        self.capabilities = capabilities or CompressionCapabilities()
+        self.min_bytes = min_bytes
+        self.encoding: Optional[str] = None
+        self.needs_probe = False
+        if mode == 'auto':
+            cached = self.capabilities.get(base_url)
+            if cached is None:
+                self.needs_probe = True
+            else:
+                self.encoding = self._choose(cached)
+        elif mode in ('gzip', 'zstd'):
+            self.encoding = mode if mode in supported_encodings() else 'gzip'
+
+    @classmethod
+    def for_endpoint(cls, base_url: str, mode: str) -> Optional['RequestCompressor']:
+        """A compressor for a custom OpenAI-compatible endpoint, or None"""
+        if mode not in COMPRESSION_MODES or mode == 'off' or is_public_endpoint(base_url):
+            return None
+        return cls(base_url, mode)
+
+    @staticmethod
+    def _choose(accepted: List[str]) -> Optional[str]:
+        for encoding in supported_encodings():
+            if encoding in accepted:
+                return encoding
+        return None
+
+    def record_probe(self, accept_encoding: str):
+        """Store what the endpoint advertised in reply to the probe"""
+        accepted = parse_accept_encoding(accept_encoding)
+        self.capabilities.set(self.base_url, accepted)
+        self.encoding = self._choose(accepted)
+        self.needs_probe = False
+
+    def reject(self, encoding: str):
+        """The endpoint answered 415 to a body with this encoding"""
+        if encoding == self.encoding:
+            self.encoding = None
+        if self.mode == 'auto':
+            accepted = [coding for coding in self.capabilities.get(self.base_url) or [] if coding != encoding]
+            self.capabilities.set(self.base_url, accepted)
+            self.encoding = self._choose(accepted)
+
+    def encode(self, body: bytes) -> Tuple[bytes, Optional[str]]:
+        """The body to send and its Content-Encoding (None if sent as is)"""
+        if self.encoding is None or len(body) < self.min_bytes:
+            return body, None
+        return compress(body, self.encoding), self.encoding
+
+
+class CompressingTransport:
+    """Async transport wrapper for the OpenAI SDK's HTTP client
+
+    Works on the SDK's request and response objects by duck typing, so it
+    fits whichever httpx-compatible package the SDK was built on.
+    """
+
+    def __init__(self, transport, compressor: RequestCompressor):
+        self.transport = transport
+        self.compressor = compressor
+
+    async def handle_async_request(self, request):
+        if self.compressor.needs_probe:
+            await self._probe(request)
+        if request.method == 'POST':
+            body = await request.aread()
+            compressed, encoding = self.compressor.encode(body)
+            if encoding:
+                headers = [(name, value) for name, value in request.headers.multi_items()
+                           if name.lower() != 'content-length']
+                headers.append(('Content-Encoding', encoding))
+                compressed_request = type(request)(
+                    request.method, request.url, headers=headers, content=compressed,
+                    extensions=request.extensions
+                )
+                response = await self.transport.handle_async_request(compressed_request)
+                if response.status_code != 415:
+                    return response
+                await response.aclose()
+                self.compressor.reject(encoding)
+        return await self.transport.handle_async_request(request)
+
+    async def _probe(self, request):
+        """Ask the endpoint which request encodings it accepts"""
+        headers = [(name, value) for name, value in request.headers.multi_items()
+                   if name.lower() not in ('content-length', 'content-type')]
+        probe = type(request)('OPTIONS', request.url, headers=headers, extensions=request.extensions)
+        try:
+            response = await self.transport.handle_async_request(probe)
+            try:
+                await response.aread()
+                self.compressor.record_probe(response.headers.get('accept-encoding', ''))
+            finally:
+                await response.aclose()
+        except Exception:
+            # Unreachable or unusual endpoint: send uncompressed for now, probe next run
+            self.compressor.needs_probe = False
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+    async def __aenter__(self):
+        await self.transport.__aenter__()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.transport.__aexit__(*args)
@@ -1,7 +1,7 @@
 import json
 from pathlib import Path
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Optional, Dict, List
 
 
 # Predefined providers - base URLs only
@@ -17,6 +17,29 @@ PROVIDERS = {
     }
 }
 
+# Output token budgets per style: ratio of estimated input tokens, clamped to [min, max].
+# The minimums leave room for reasoning models, which spend part of the budget thinking
+DEFAULT_OUTPUT_BUDGETS = {
+    "gentle": {"ratio": 1.5, "min": 1024, "max": 8192},
+    "enhanced": {"ratio": 2.5, "min": 2048, "max": 8192},
+    "structured": {"ratio": 5.0, "min": 2048, "max": 8192},
+    "creative": {"ratio": 4.0, "min": 2048, "max": 8192},
+}
+
+# A rewrite is about as long as its input, so budgets never go below this
+# multiple of the estimated input tokens, up to the style's max (the most a
+# model is asked to produce; providers reject larger limits)
+MIN_INPUT_COVERAGE = 1.2
+
+# Defaults of the numeric settings, also used to save only changed values
+DEFAULT_LONG_PROMPT_CHARS = 12000
+DEFAULT_SECTION_CONCURRENCY = 4
+DEFAULT_PIPELINE_CONCURRENCY = 3
+DEFAULT_SPECULATIVE_TOKEN_BUDGET = 50000
+
+# Rough characters-per-token estimate used before the provider reports usage
+CHARS_PER_TOKEN = 4
+
 
 @dataclass
 class Config:
@@ -26,6 +49,31 @@ class Config:
     base_url: Optional[str] = None
     model: str = ""
     current_style: str = "gentle"
+    # Per-million-token prices by model, e.g. {"gpt-4o": {"input": 2.5, "output": 10}}
+    model_prices: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    # Overrides for DEFAULT_OUTPUT_BUDGETS, e.g. {"structured": {"max": 12000}}
+    output_budgets: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    # How @file context is included: "full" or "min" (comments and noise stripped)
+    context_mode: str = "full"
+    # Handle the Gentle style offline when the input is simple prose
+    local_gentle: bool = False
+    # Prompts at least this long are enhanced section by section in parallel (0 disables)
+    long_prompt_chars: int = DEFAULT_LONG_PROMPT_CHARS
+    section_concurrency: int = DEFAULT_SECTION_CONCURRENCY
+    # Prompts enhanced at once in pipelined mode (pmpt --pipeline)
+    pipeline_concurrency: int = DEFAULT_PIPELINE_CONCURRENCY
+    # Enhance the prompt in the background while typing, up to this many tokens per session
+    speculative: bool = False
+    speculative_token_budget: int = DEFAULT_SPECULATIVE_TOKEN_BUDGET
+    # Model per style and input size, e.g. [{"style": "gentle", "max_chars": 2000, "model": "gpt-4o-mini"}]
+    routing: List[Dict] = field(default_factory=list)
+    # Pick among models by recorded speed, e.g. {"models": ["gpt-4o-mini", "gpt-4o"], "target_latency": 8}
+    adaptive_routing: Dict = field(default_factory=dict)
+    # How requests are sent: "sdk" (vendor SDKs) or "http" (built-in aiohttp client)
+    backend: str = "sdk"
+    # Compress large request bodies to custom OpenAI-compatible endpoints:
+    # "off", "auto" (when the endpoint advertises it), "gzip" or "zstd"
+    request_compression: str = "off"
     
     def get_base_url(self) -> str:
         """Get effective base URL"""
@@ -43,6 +91,25 @@ class Config:
         """Get model - must be explicitly set"""
         return self.model
     
+    def _style_budget(self, style: str) -> Dict[str, float]:
+        budget = dict(DEFAULT_OUTPUT_BUDGETS.get(style, DEFAULT_OUTPUT_BUDGETS["enhanced"]))
+        budget.update(self.output_budgets.get(style, {}))
+        return budget
+    
+    def get_output_budget(self, style: str, prompt_chars: int) -> int:
+        """Get max output tokens for a style, proportional to the input size"""
+        budget = self._style_budget(style)
+        
+        input_tokens = max(1, prompt_chars // CHARS_PER_TOKEN)
+        tokens = max(budget["min"], input_tokens * budget["ratio"], input_tokens * MIN_INPUT_COVERAGE)
+        return int(min(budget["max"], tokens))
+    
+    def estimate_output_tokens(self, style: str, prompt_chars: int) -> int:
+        """Expected output tokens: the style's ratio without the budget's safety floor"""
+        budget = self._style_budget(style)
+        input_tokens = max(1, prompt_chars // CHARS_PER_TOKEN)
+        return int(min(budget["max"], input_tokens * budget["ratio"]))
+    
     def get_api_key(self) -> str:
         """Get API key"""
         return self.api_key
@@ -51,8 +118,8 @@ class Config:
 class ConfigManager:
     """Manages configuration loading and saving"""
     
-    def __init__(self):
-        self.config_dir = Path.home() / ".pmpt-cli"
+    def __init__(self, config_dir: Path = None):
+        self.config_dir = config_dir or Path.home() / ".pmpt-cli"
         self.config_file = self.config_dir / "config.json"
         self.config_dir.mkdir(exist_ok=True)
     
@@ -80,6 +147,32 @@ class ConfigManager:
                 data['provider'] = config.provider
             if config.base_url:
                 data['base_url'] = config.base_url
+            if config.model_prices:
+                data['model_prices'] = config.model_prices
+            if config.output_budgets:
+                data['output_budgets'] = config.output_budgets
+            if config.context_mode != "full":
+                data['context_mode'] = config.context_mode
+            if config.local_gentle:
+                data['local_gentle'] = config.local_gentle
+            if config.long_prompt_chars != DEFAULT_LONG_PROMPT_CHARS:
+                data['long_prompt_chars'] = config.long_prompt_chars
+            if config.section_concurrency != DEFAULT_SECTION_CONCURRENCY:
+                data['section_concurrency'] = config.section_concurrency
+            if config.pipeline_concurrency != DEFAULT_PIPELINE_CONCURRENCY:
+                data['pipeline_concurrency'] = config.pipeline_concurrency
+            if config.speculative:
+                data['speculative'] = config.speculative
+            if config.speculative_token_budget != DEFAULT_SPECULATIVE_TOKEN_BUDGET:
+                data['speculative_token_budget'] = config.speculative_token_budget
+            if config.backend != "sdk":
+                data['backend'] = config.backend
+            if config.request_compression != "off":
+                data['request_compression'] = config.request_compression
+            if config.routing:
+                data['routing'] = config.routing
+            if config.adaptive_routing:
+                data['adaptive_routing'] = config.adaptive_routing
                 
             with open(self.config_file, 'w') as f:
                 json.dump(data, f, indent=2)
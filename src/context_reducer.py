@@ -0,0 +1,285 @@
+import io
+import json
+import os
+import re
+import tokenize
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from .config import CHARS_PER_TOKEN
+from .language_detector import LanguageDetector
+
+
+# Languages by comment syntax, keyed like LanguageDetector.LANGUAGE_PATTERNS
+C_STYLE_LANGUAGES = {
+    'javascript', 'typescript', 'java', 'cpp', 'c', 'csharp', 'php', 'go',
+    'rust', 'swift', 'kotlin', 'scala', 'dart',
+}
+HASH_STYLE_LANGUAGES = {'ruby', 'shell', 'r', 'powershell'}
+
+LOCKFILES = {
+    'package-lock.json', 'yarn.lock', 'pnpm-lock.yaml', 'poetry.lock', 'pipfile.lock',
+    'cargo.lock', 'composer.lock', 'gemfile.lock', 'go.sum', 'uv.lock',
+}
+VENDORED_DIRS = {'vendor', 'node_modules', 'third_party', 'bower_components', 'site-packages'}
+GENERATED_MARKERS = ('@generated', 'do not edit', 'code generated by', 'auto-generated', 'autogenerated')
+
+C_STYLE_SPECIAL = re.compile(r'["\'`/]')
+
+# Languages where ' opens a string of any length; elsewhere it only starts
+# a char or rune literal ('x', '\n'), and otherwise is a Rust lifetime ('a),
+# a C++ digit separator (1'000) or similar, and is copied as is
+SINGLE_QUOTE_STRING_LANGUAGES = {'javascript', 'typescript', 'php', 'dart'}
+# Languages with `...` strings (template literals, raw strings)
+BACKTICK_STRING_LANGUAGES = {'javascript', 'typescript', 'go', 'kotlin', 'scala'}
+# Backslash is not an escape inside Go's `...` raw strings
+RAW_BACKTICK_LANGUAGES = {'go'}
+
+# Languages with /.../ regex literals, which may contain // or /*
+REGEX_LITERAL_LANGUAGES = {'javascript', 'typescript'}
+# A / after these starts a regex literal; after anything else it divides
+REGEX_PRECEDING_CHARS = set('(,=:[!&|?{};+-*%<>~^')
+REGEX_PRECEDING_KEYWORDS = {
+    'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+    'throw', 'case', 'do', 'else', 'yield', 'await',
+}
+REGEX_LITERAL = re.compile(r'/(?:\\.|\[(?:\\.|[^\]\\\n])*\]|[^/\\\[\n])+/')
+
+CHAR_LITERAL = re.compile(r"'(?:\\(?:u\{[0-9a-fA-F]{1,6}\}|x[0-9a-fA-F]{2}|[0-7]{1,3}|.)|[^'\\\n])'")
+
+# With a size limit, reduce this many times the limit from the start of the
+# file first, and more only if that does not produce enough output
+REDUCE_PREFIX_FACTOR = 4
+
+# Lines longer than this are almost always minified bundles or embedded data
+MAX_LINE_CHARS = 1000
+
+
+@dataclass
+class ReductionReport:
+    """Size of a file's context before and after reduction"""
+    path: str
+    original_chars: int
+    reduced_chars: int
+    note: str = ""
+
+    @property
+    def saved_chars(self) -> int:
+        return self.original_chars - self.reduced_chars
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.saved_chars // CHARS_PER_TOKEN
+
+
+class ContextReducer:
+    """Shrinks @file context: strips comments and docstrings, collapses
+    whitespace and drops generated, vendored and lockfile content"""
+
+    def reduce(self, path: str, content: str, limit: int = None) -> Tuple[str, ReductionReport]:
+        """Reduce file content for inclusion in a prompt
+
+        With a limit, only as much of the start of the file is reduced as it
+        takes to produce `limit` characters; the rest would be truncated anyway.
+        """
+        omitted = self._omission_reason(path, content)
+        if omitted:
+            lines = content.count('\n') + 1
+            reduced = f"[{omitted} omitted: {lines} lines]"
+            return reduced, ReductionReport(path, len(content), len(reduced), omitted.lower())
+
+        language = self.detect_language(path)
+        # JSON has to be parsed whole to be minified
+        if not limit or path.lower().endswith('.json'):
+            reduced = self._reduce_text(path, language, content)
+            return reduced, ReductionReport(path, len(content), len(reduced))
+
+        prefix_chars = limit * REDUCE_PREFIX_FACTOR
+        while True:
+            prefix = self._line_prefix(content, prefix_chars)
+            reduced = self._reduce_text(path, language, prefix)
+            if len(prefix) == len(content) or len(reduced) >= limit:
+                break
+            prefix_chars *= 4
+        note = "" if len(prefix) == len(content) else f"first {len(prefix) / 1024:.0f} KB reduced"
+        return reduced, ReductionReport(path, len(content), len(reduced), note)
+
+    def _reduce_text(self, path: str, language: Optional[str], content: str) -> str:
+        if language == 'python':
+            reduced = self._strip_python(content)
+        elif language in C_STYLE_LANGUAGES:
+            reduced = self._strip_c_style(content, language)
+        elif language in HASH_STYLE_LANGUAGES:
+            reduced = self._strip_hash_comments(content)
+        elif path.lower().endswith('.json'):
+            return self._minify_json(content)
+        else:
+            reduced = content
+        return self._collapse_whitespace(reduced)
+
+    @staticmethod
+    def _line_prefix(content: str, chars: int) -> str:
+        """Start of content up to about chars, ending at a line break"""
+        if len(content) <= chars:
+            return content
+        cut = content.rfind('\n', 0, chars)
+        return content[:cut + 1] if cut > 0 else content[:chars]
+
+    def detect_language(self, path: str) -> Optional[str]:
+        """Language of a file from its extension"""
+        ext = os.path.splitext(path)[1].lower()
+        return LanguageDetector.EXTENSION_LANGUAGES.get(ext)
+
+    def _omission_reason(self, path: str, content: str) -> Optional[str]:
+        """Why a whole file should be left out, if it should"""
+        parts = path.replace('\\', '/').lower().split('/')
+        if parts[-1] in LOCKFILES:
+            return "Lockfile"
+        if any(part in VENDORED_DIRS for part in parts[:-1]):
+            return "Vendored file"
+        header = "\n".join(content.splitlines()[:5]).lower()
+        if any(marker in header for marker in GENERATED_MARKERS):
+            return "Generated file"
+        return None
+
+    def _strip_python(self, content: str) -> str:
+        """Remove comments and docstrings using the tokenizer"""
+        removals = []
+        previous = tokenize.NEWLINE
+        try:
+            tokens = list(tokenize.generate_tokens(io.StringIO(content).readline))
+        except (tokenize.TokenError, IndentationError, SyntaxError):
+            return self._strip_hash_comments(content)
+
+        for index, token in enumerate(tokens):
+            if token.type == tokenize.COMMENT:
+                removals.append((token.start, token.end))
+            elif token.type == tokenize.STRING and previous in (tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT):
+                following = tokens[index + 1].type if index + 1 < len(tokens) else tokenize.ENDMARKER
+                # A string that is a whole statement is a docstring
+                if following in (tokenize.NEWLINE, tokenize.ENDMARKER):
+                    removals.append((token.start, token.end))
+            if token.type not in (tokenize.NL, tokenize.COMMENT):
+                previous = token.type
+
+        if not removals:
+            return content
+
+        line_offsets = [0]
+        # Split like the tokenizer's readline so rows map to the same offsets
+        for line in io.StringIO(content):
+            line_offsets.append(line_offsets[-1] + len(line))
+
+        parts = []
+        position = 0
+        for (start_row, start_col), (end_row, end_col) in removals:
+            start = line_offsets[start_row - 1] + start_col
+            parts.append(content[position:start])
+            position = line_offsets[end_row - 1] + end_col
+        parts.append(content[position:])
+        return "".join(parts)
+
+    def _strip_c_style(self, content: str, language: str = None) -> str:
+        """Remove // and /* */ comments, leaving string and char literals intact"""
+        single_quote_strings = language in SINGLE_QUOTE_STRING_LANGUAGES
+        backtick_strings = language in BACKTICK_STRING_LANGUAGES
+        regex_literals = language in REGEX_LITERAL_LANGUAGES
+        result = []
+        index = 0
+        length = len(content)
+        while index < length:
+            char = content[index]
+            if char == '"' or (char == "'" and single_quote_strings) or (char == '`' and backtick_strings):
+                raw_terminator = self._rust_raw_terminator(content, index) if language == 'rust' else None
+                if raw_terminator:
+                    end = content.find(raw_terminator, index + 1)
+                    end = length if end == -1 else end + len(raw_terminator) - 1
+                elif char == '`' and language in RAW_BACKTICK_LANGUAGES:
+                    end = content.find('`', index + 1)
+                    end = length if end == -1 else end
+                else:
+                    end = index + 1
+                    while end < length and content[end] != char:
+                        end += 2 if content[end] == '\\' else 1
+                result.append(content[index:end + 1])
+                index = end + 1
+            elif char == "'":
+                match = CHAR_LITERAL.match(content, index)
+                end = match.end() if match else index + 1
+                result.append(content[index:end])
+                index = end
+            elif content.startswith('//', index):
+                end = content.find('\n', index)
+                index = length if end == -1 else end
+            elif content.startswith('/*', index):
+                end = content.find('*/', index + 2)
+                index = length if end == -1 else end + 2
+            elif regex_literals and char == '/' and self._starts_regex(result):
+                match = REGEX_LITERAL.match(content, index)
+                end = match.end() if match else index + 1
+                result.append(content[index:end])
+                index = end
+            else:
+                # Copy everything up to the next interesting character in one go
+                match = C_STYLE_SPECIAL.search(content, index + 1)
+                end = match.start() if match else length
+                result.append(content[index:end])
+                index = end
+        return "".join(result)
+
+    @staticmethod
+    def _starts_regex(result: list) -> bool:
+        """Whether a / after the output so far begins a regex literal rather than a division"""
+        for chunk in reversed(result):
+            previous = chunk.rstrip()
+            if previous:
+                break
+        else:
+            return True
+        if previous[-1] in REGEX_PRECEDING_CHARS:
+            return True
+        word = re.search(r'\w+$', previous)
+        return bool(word) and word.group() in REGEX_PRECEDING_KEYWORDS
+
+    @staticmethod
+    def _rust_raw_terminator(content: str, index: int) -> Optional[str]:
+        """Closing delimiter if the quote at index opens a Rust raw string (r"..", br#".."#)"""
+        start = index
+        while start > 0 and content[start - 1] == '#':
+            start -= 1
+        if start == 0 or content[start - 1] != 'r':
+            return None
+        prefix = start - 1
+        if prefix > 0 and content[prefix - 1] == 'b':
+            prefix -= 1
+        if prefix > 0 and (content[prefix - 1].isalnum() or content[prefix - 1] == '_'):
+            return None  # An identifier ending in r, e.g. buffer"...
+        return '"' + '#' * (index - start)
+
+    def _strip_hash_comments(self, content: str) -> str:
+        """Remove full-line # comments, keeping a shebang"""
+        lines = content.splitlines()
+        kept = [
+            line for number, line in enumerate(lines)
+            if not line.lstrip().startswith('#') or (number == 0 and line.startswith('#!'))
+        ]
+        return "\n".join(kept)
+
+    def _minify_json(self, content: str) -> str:
+        """Re-serialize JSON without indentation"""
+        try:
+            return json.dumps(json.loads(content), separators=(',', ':'), ensure_ascii=False)
+        except ValueError:
+            return content
+
+    def _collapse_whitespace(self, content: str) -> str:
+        """Trim trailing spaces, drop huge lines and collapse blank runs"""
+        lines = []
+        for line in content.splitlines():
+            line = line.rstrip()
+            if len(line) > MAX_LINE_CHARS:
+                line = f"[long line omitted: {len(line)} chars]"
+            if not line and (not lines or not lines[-1]):
+                continue
+            lines.append(line)
+        return "\n".join(lines).strip()
@@ -0,0 +1,139 @@
+import re
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from rich.text import Text
+
+
+EQUAL = "equal"
+INSERT = "insert"
+DELETE = "delete"
+
+DIFF_STYLES = {
+    EQUAL: "",
+    INSERT: "bold green",
+    DELETE: "red strike",
+}
+
+# Leading whitespace, or a word or run of punctuation with the whitespace
+# that follows it; punctuation is separate so "parser." still matches "parser"
+PUNCTUATION = '.,;:!?)]}"'
+TOKEN_PATTERN = re.compile(r'^\s+|[^\s' + re.escape(PUNCTUATION) + r']+\s*|[' + re.escape(PUNCTUATION) + r']+\s*')
+
+
+class IncrementalWordDiff:
+    """Word-level diff of a streamed text against the original prompt
+
+    The alignment only ever grows: every chunk extends it from the current
+    cursor in the original text and already emitted operations are never
+    revisited, so the cost of a chunk depends on its own size only.
+    """
+
+    def __init__(self, original: str, lookahead: int = 40, max_unconfirmed_skip: int = 2):
+        self.original_tokens = [token for token in TOKEN_PATTERN.findall(original) if not token.isspace()]
+        self.original_words = [token.strip() for token in self.original_tokens]
+        self.lookahead = lookahead
+        self.max_unconfirmed_skip = max_unconfirmed_skip
+        self.cursor = 0
+        self.pending = ""
+        self.held: Optional[Tuple[str, int]] = None
+
+        # Word -> sorted positions in the original, used to find the next match
+        self.positions: Dict[str, List[int]] = {}
+        for index, word in enumerate(self.original_words):
+            self.positions.setdefault(word, []).append(index)
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        """Consume a streamed chunk and return newly settled diff operations"""
+        self.pending += chunk
+        ops = []
+
+        # The last word may still be incomplete unless whitespace follows it
+        tokens = TOKEN_PATTERN.findall(self.pending)
+        if tokens and not self.pending[-1].isspace():
+            self.pending = tokens.pop()
+        else:
+            self.pending = ""
+
+        for token in tokens:
+            self._consume(token, ops)
+        return ops
+
+    def finish(self) -> List[Tuple[str, str]]:
+        """Flush the remaining text and report trailing deletions"""
+        ops = []
+        if self.pending:
+            self._consume(self.pending, ops)
+            self.pending = ""
+
+        if self.held is not None:
+            token, target = self.held
+            self.held = None
+            if target == len(self.original_words) - 1:
+                self._commit_match(token, target, ops)
+            else:
+                ops.append((INSERT, token))
+
+        self._delete_until(len(self.original_words), ops)
+        return ops
+
+    def _consume(self, token: str, ops: list):
+        """Align a single complete token"""
+        if token.isspace():
+            # Leading whitespace belongs after anything still held back
+            if self.held is not None:
+                self.held = (self.held[0] + token, self.held[1])
+            else:
+                ops.append((EQUAL, token))
+            return
+
+        word = token.strip()
+
+        if self.held is not None:
+            held_token, target = self.held
+            self.held = None
+            following = target + 1
+            if following < len(self.original_words) and self.original_words[following] == word:
+                self._commit_match(held_token, target, ops)
+            else:
+                ops.append((INSERT, held_token))
+
+        target = self._find(word)
+        if target is None:
+            ops.append((INSERT, token))
+        elif target - self.cursor <= self.max_unconfirmed_skip:
+            self._commit_match(token, target, ops)
+        else:
+            # Skipping many original words on a single match is usually wrong
+            # for common words, so wait for the next word to confirm it
+            self.held = (token, target)
+
+    def _find(self, word: str) -> Optional[int]:
+        """Find the next occurrence of a word within the lookahead window"""
+        candidates = self.positions.get(word)
+        if not candidates:
+            return None
+        index = bisect_left(candidates, self.cursor)
+        if index < len(candidates) and candidates[index] - self.cursor <= self.lookahead:
+            return candidates[index]
+        return None
+
+    def _commit_match(self, token: str, target: int, ops: list):
+        """Emit deletions up to the matched word followed by the match itself"""
+        self._delete_until(target, ops)
+        ops.append((EQUAL, token))
+        self.cursor = target + 1
+
+    def _delete_until(self, target: int, ops: list):
+        """Mark original words between the cursor and target as deleted"""
+        for index in range(self.cursor, target):
+            ops.append((DELETE, self.original_tokens[index]))
+        self.cursor = max(self.cursor, target)
+
+
+def render_diff_ops(ops: List[Tuple[str, str]]) -> Text:
+    """Render diff operations as styled rich text"""
+    text = Text()
+    for op, token in ops:
+        text.append(token, style=DIFF_STYLES[op])
+    return text
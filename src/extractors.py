@@ -0,0 +1,350 @@
+import csv
+import io
+import itertools
+import json
+import os
+import random
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from .context_reducer import ReductionReport
+
+
+NOTEBOOK_EXTENSIONS = {'.ipynb'}
+TABLE_DELIMITERS = {'.csv': ',', '.tsv': '\t', '.tab': '\t'}
+JSON_LINES_EXTENSIONS = {'.jsonl', '.ndjson'}
+
+# Smaller JSON files are sent as they are
+LARGE_JSON_BYTES = 8000
+
+# Rows shown from a table: the first few, then a seeded random sample of the rest
+HEAD_ROWS = 5
+SAMPLE_ROWS = 5
+
+# Column statistics are computed over this many rows; the rest are only counted
+MAX_STAT_ROWS = 1000000
+# Rows per column-wise statistics update
+STAT_BATCH_ROWS = 4096
+
+# Distinct values tracked per column before the count is reported as a lower bound
+MAX_DISTINCT = 1000
+
+MAX_CELL_CHARS = 60
+MAX_FIELDS = 50
+MAX_DEPTH = 8
+# Array elements merged into a JSON shape, per array
+MAX_ARRAY_ITEMS = 200
+
+# Cell values counted as missing rather than typed
+MISSING_VALUES = {'NA', 'N/A', 'NaN', 'nan', 'null', 'NULL', 'None', 'none'}
+
+DATA_URI = re.compile(r'data:[\w/+.-]+;base64,[A-Za-z0-9+/=\s]+')
+
+
+def _shorten(text: str, width: int = MAX_CELL_CHARS) -> str:
+    return text if len(text) <= width else text[:width - 1] + "…"
+
+
+def _number(value: float) -> str:
+    if float(value).is_integer() and abs(value) < 1e15:
+        return f"{int(value):,}"
+    if abs(value) >= 1000:
+        return f"{value:,.0f}"
+    return f"{value:.4g}"
+
+
+class _ColumnStats:
+    """Running statistics for one table column, updated a batch of rows at a time"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.values = 0
+        self.missing = 0
+        self.kind = None  # integer, number, boolean or text, widened as batches arrive
+        self.minimum = None
+        self.maximum = None
+        self.total = 0.0
+        self.max_length = 0
+        self.counts: Counter = Counter()
+        self.overflow = False
+
+    def add(self, values: Tuple[str, ...]):
+        present = [value for value in values if value and value not in MISSING_VALUES]
+        self.missing += len(values) - len(present)
+        if not present:
+            return
+        self.values += len(present)
+        self.max_length = max(self.max_length, max(map(len, present)))
+        if not self.overflow:
+            self.counts.update(present)
+            self.overflow = len(self.counts) > MAX_DISTINCT
+        if self.kind == 'text':
+            return
+
+        numbers = None
+        try:
+            numbers = list(map(float, present))
+        except ValueError:
+            kind = 'boolean' if {value.lower() for value in present} <= {'true', 'false'} else 'text'
+        else:
+            joined = "".join(present)
+            kind = 'number' if any(char in joined for char in '.eEnN') else 'integer'
+        if self.kind is None or self.kind == kind:
+            self.kind = kind
+        elif {self.kind, kind} == {'integer', 'number'}:
+            self.kind = 'number'
+        else:
+            self.kind = 'text'
+            return
+        if numbers:
+            low, high = min(numbers), max(numbers)
+            self.minimum = low if self.minimum is None else min(self.minimum, low)
+            self.maximum = high if self.maximum is None else max(self.maximum, high)
+            self.total += sum(numbers)
+
+    def describe(self) -> str:
+        parts = [self.kind or 'empty']
+        if self.missing:
+            parts.append(f"{self.missing:,} missing")
+        distinct = f"{len(self.counts):,}{'+' if self.overflow else ''}"
+        parts.append(f"{distinct} distinct")
+        if self.kind in ('integer', 'number') and self.values:
+            parts.append(f"range {_number(self.minimum)} .. {_number(self.maximum)}")
+            parts.append(f"mean {_number(self.total / self.values)}")
+        elif self.counts:
+            top = [(value, count) for value, count in self.counts.most_common(3) if count > 1]
+            if top and (self.overflow or len(self.counts) < self.values):
+                parts.append("top " + ", ".join(f"{_shorten(value, 30)!r} ({count:,})" for value, count in top))
+            if self.kind == 'text':
+                parts.append(f"up to {self.max_length:,} chars")
+        return f"{self.name}: " + ", ".join(parts)
+
+
+class _Shape:
+    """Merged structure of the JSON values seen at one position"""
+
+    def __init__(self):
+        self.types: Counter = Counter()
+        self.fields: Dict[str, '_Shape'] = {}
+        self.more_fields = False
+        self.items: Optional['_Shape'] = None
+        self.lengths: Optional[Tuple[int, int]] = None
+        self.example = None
+
+    def add(self, value, depth: int = 0):
+        kind = JSON_KINDS[type(value)]
+        self.types[kind] += 1
+        if kind == 'object':
+            if depth >= MAX_DEPTH:
+                return
+            for key, item in value.items():
+                if key not in self.fields and len(self.fields) >= MAX_FIELDS:
+                    self.more_fields = True
+                    continue
+                self.fields.setdefault(key, _Shape()).add(item, depth + 1)
+        elif kind == 'array':
+            length = len(value)
+            self.lengths = (length, length) if self.lengths is None else (
+                min(self.lengths[0], length), max(self.lengths[1], length))
+            if depth >= MAX_DEPTH:
+                return
+            if self.items is None:
+                self.items = _Shape()
+            for item in itertools.islice(value, MAX_ARRAY_ITEMS):
+                self.items.add(item, depth + 1)
+        elif kind != 'null' and self.example is None:
+            self.example = value
+
+    def render(self, indent: int = 0) -> List[str]:
+        """Description of the shape; the first line continues the caller's line"""
+        kinds = [kind for kind, _ in self.types.most_common()]
+        lines = [" | ".join(kinds) if kinds else "nothing"]
+        if 'array' in self.types and self.lengths:
+            low, high = self.lengths
+            span = f"{low:,}" if low == high else f"{low:,}-{high:,}"
+            if self.items and self.items.types:
+                item_lines = self.items.render(indent)
+                lines[0] = lines[0].replace('array', f"array ({span} items) of {item_lines[0]}", 1)
+                lines += item_lines[1:]
+            else:
+                lines[0] = lines[0].replace('array', f"array ({span} items)", 1)
+        if self.example is not None:
+            lines[0] += f", e.g. {_shorten(json.dumps(self.example, ensure_ascii=False), 40)}"
+        objects = self.types.get('object', 0)
+        pad = "  " * (indent + 1)
+        for key, field in self.fields.items():
+            seen = sum(field.types.values())
+            presence = f" (in {seen:,} of {objects:,})" if seen < objects else ""
+            field_lines = field.render(indent + 1)
+            lines.append(f"{pad}{json.dumps(key, ensure_ascii=False)}: {field_lines[0]}{presence}")
+            lines += field_lines[1:]
+        if self.more_fields:
+            lines.append(f"{pad}... more keys")
+        return lines
+
+
+JSON_KINDS = {
+    type(None): 'null', bool: 'boolean', int: 'integer', float: 'number',
+    str: 'string', list: 'array', dict: 'object',
+}
+
+
+class FileExtractor:
+    """Compact views of notebooks and data files for @file context
+
+    Notebooks keep their code and markdown cells without outputs, tables
+    (CSV/TSV) become a schema with column statistics and sampled rows, and
+    JSON Lines and large JSON files become a merged structural summary.
+    Tables and JSON Lines are read in one streaming pass.
+    """
+
+    def extract(self, path: str) -> Optional[Tuple[str, ReductionReport]]:
+        """Extracted text and its report, or None when the file is sent as is"""
+        ext = os.path.splitext(path)[1].lower()
+        try:
+            size = os.path.getsize(path)
+            if ext in NOTEBOOK_EXTENSIONS:
+                content, note = self._notebook(path)
+            elif ext in TABLE_DELIMITERS:
+                content, note = self._table(path, TABLE_DELIMITERS[ext])
+            elif ext in JSON_LINES_EXTENSIONS:
+                content, note = self._json_lines(path)
+            elif ext == '.json' and size > LARGE_JSON_BYTES:
+                content, note = self._json(path, size)
+            else:
+                return None
+        except (OSError, ValueError, UnicodeDecodeError, csv.Error, AttributeError, TypeError):
+            return None  # Malformed: fall back to the raw text
+        return content, ReductionReport(path, size, len(content), note)
+
+    def _notebook(self, path: str) -> Tuple[str, str]:
+        """Code and markdown cells in percent format, outputs dropped"""
+        with open(path, 'r', encoding='utf-8') as f:
+            notebook = json.load(f)
+        if 'cells' not in notebook:
+            raise ValueError("Not an nbformat 4 notebook")
+        metadata = notebook.get('metadata', {})
+        language = (metadata.get('kernelspec', {}).get('language')
+                    or metadata.get('language_info', {}).get('name') or 'python')
+        cells = notebook.get('cells', [])
+        outputs = 0
+        blocks = [f"# Notebook ({language}, {len(cells)} cells, outputs omitted)"]
+        for cell in cells:
+            source = cell.get('source', '')
+            if isinstance(source, list):
+                source = "".join(source)
+            cell_type = cell.get('cell_type')
+            if cell_type == 'code':
+                count = cell.get('execution_count')
+                outputs += len(cell.get('outputs', []))
+                header = f"# %% [{count}]" if count is not None else "# %%"
+            else:
+                source = DATA_URI.sub('[embedded image]', source)
+                header = f"# %% [{cell_type}]"
+            if source.strip():
+                blocks.append(f"{header}\n{source.rstrip()}")
+        return "\n\n".join(blocks), f"notebook, {outputs} output(s) dropped"
+
+    def _table(self, path: str, delimiter: str) -> Tuple[str, str]:
+        """Schema, column statistics and sampled rows from one pass over the file"""
+        rng = random.Random(0)
+        with open(path, 'r', encoding='utf-8', errors='replace', newline='') as f:
+            if delimiter == ',':
+                # .csv files also come semicolon-, pipe- or tab-separated; the header tells
+                first_line = f.readline()
+                delimiter = max(',;|\t', key=first_line.count)
+                f.seek(0)
+            reader = csv.reader(f, delimiter=delimiter)
+            header = next(reader, None)
+            if header is None:
+                return "[Empty table]", "table summary"
+            columns = [_ColumnStats(name.strip() or f"column {index + 1}") for index, name in enumerate(header)]
+            head, sample, batch = [], [], []
+            rows = 0
+            for row in reader:
+                if not row:
+                    continue
+                rows += 1
+                if rows <= MAX_STAT_ROWS:
+                    batch.append(row)
+                    if len(batch) == STAT_BATCH_ROWS:
+                        self._add_batch(columns, batch)
+                        batch = []
+                if rows <= HEAD_ROWS:
+                    head.append(row)
+                elif len(sample) < SAMPLE_ROWS:
+                    sample.append((rows, row))
+                elif rng.random() * (rows - HEAD_ROWS) < SAMPLE_ROWS:
+                    # Reservoir sampling keeps a uniform sample without holding the file
+                    sample[rng.randrange(SAMPLE_ROWS)] = (rows, row)
+            self._add_batch(columns, batch)
+
+        name = {',': 'comma', '\t': 'tab', ';': 'semicolon', '|': 'pipe'}.get(delimiter, repr(delimiter))
+        lines = [f"Table: {rows:,} rows x {len(columns)} columns ({name}-separated)"]
+        scope = f" (first {MAX_STAT_ROWS:,} rows)" if rows > MAX_STAT_ROWS else ""
+        lines.append(f"Columns{scope}:")
+        lines += [f"  {column.describe()}" for column in columns]
+
+        output = io.StringIO()
+        writer = csv.writer(output, delimiter=delimiter, lineterminator="\n")
+        writer.writerow(header)
+        for row in head:
+            writer.writerow([_shorten(cell) for cell in row])
+        shown = f"first {len(head)}"
+        if sample:
+            writer.writerow(["..."])
+            for _, row in sorted(sample, key=lambda item: item[0]):
+                writer.writerow([_shorten(cell) for cell in row])
+            shown += f" and {len(sample)} random"
+        lines.append(f"Rows ({shown}):")
+        lines.append(output.getvalue().rstrip("\n"))
+        return "\n".join(lines), "table summary"
+
+    @staticmethod
+    def _add_batch(columns: List[_ColumnStats], batch: List[List[str]]):
+        """Update each column from a block of rows, transposed so the work runs per column"""
+        if batch:
+            for column, values in zip(columns, itertools.zip_longest(*batch, fillvalue='')):
+                column.add(values)
+
+    def _json_lines(self, path: str) -> Tuple[str, str]:
+        """Merged record structure and a few sample records"""
+        rng = random.Random(0)
+        shape = _Shape()
+        records = invalid = 0
+        head, sample = [], []
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    invalid += 1
+                    continue
+                records += 1
+                shape.add(record)
+                if records <= 3:
+                    head.append(line)
+                elif len(sample) < 2:
+                    sample.append((records, line))
+                elif rng.random() * (records - 3) < 2:
+                    sample[rng.randrange(2)] = (records, line)
+
+        skipped = f", {invalid:,} invalid lines skipped" if invalid else ""
+        lines = [f"JSON Lines: {records:,} records{skipped}", "Record structure: " + "\n".join(shape.render())]
+        lines.append("Sample records:")
+        lines += [_shorten(line, 400) for line in head]
+        lines += [_shorten(line, 400) for _, line in sorted(sample)]
+        return "\n".join(lines), "JSON Lines summary"
+
+    def _json(self, path: str, size: int) -> Tuple[str, str]:
+        """Structure of a large JSON document"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        shape = _Shape()
+        shape.add(data)
+        content = f"JSON structure ({size / 1024:.0f} KB): " + "\n".join(shape.render())
+        return content, "JSON structure"
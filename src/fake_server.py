@@ -0,0 +1,195 @@
+import asyncio
+import itertools
+import json
+import time
+from typing import List, Optional
+
+from aiohttp import web
+
+
+class FakeProvider:
+    """Local stand-in for the OpenAI and Anthropic chat APIs
+
+    Serves /v1/chat/completions (and /chat/completions) and /v1/messages in
+    the providers' JSON and SSE formats, including usage, with configurable
+    time to first token and delay between chunks. The first `drops`
+    streaming responses are cut off after `drop_after` chunks to exercise
+    stream resumption. With a replay file, streams send its recorded SSE
+    events instead of generated text. Compressed request bodies are only
+    accepted in the listed encodings, which OPTIONS requests advertise.
+    With reject_stream_options, chat completions asking for stream usage
+    get a 400 reply, like compatible servers that predate it.
+    """
+
+    def __init__(self, words: int = 120, ttft: float = 0.0, chunk_delay: float = 0.0,
+                 drop_after: int = 0, drops: int = 1, replay: Optional[str] = None,
+                 accept_encodings: List[str] = None, reject_stream_options: bool = False):
+        self.words = words
+        self.ttft = ttft
+        self.chunk_delay = chunk_delay
+        self.drop_after = drop_after
+        self.drops = drops
+        self.replay_events: List[str] = []
+        if replay:
+            with open(replay, 'r', encoding='utf-8') as f:
+                self.replay_events = [event + "\n\n" for event in f.read().split("\n\n") if event.strip()]
+        self.accept_encodings = accept_encodings or []
+        self.reject_stream_options = reject_stream_options
+        self.requests = 0
+        self.compressed_requests = 0
+        self.bodies: List[dict] = []  # Parsed request bodies, in arrival order
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self._request_encoding])
+        for path, handler in (('/v1/chat/completions', self.chat_completions),
+                              ('/chat/completions', self.chat_completions),
+                              ('/v1/messages', self.messages)):
+            app.router.add_post(path, handler)
+            app.router.add_route('OPTIONS', path, self.options)
+        return app
+
+    @web.middleware
+    async def _request_encoding(self, request: web.Request, handler):
+        """Reject compressed bodies in encodings that were not advertised (aiohttp inflates the rest)"""
+        encoding = request.headers.get('Content-Encoding')
+        if encoding:
+            if encoding not in self.accept_encodings:
+                return web.Response(status=415, headers={'Accept-Encoding': ", ".join(self.accept_encodings)})
+            self.compressed_requests += 1
+        return await handler(request)
+
+    async def options(self, request: web.Request):
+        headers = {'Allow': 'POST, OPTIONS'}
+        if self.accept_encodings:
+            headers['Accept-Encoding'] = ", ".join(self.accept_encodings)
+        return web.Response(status=204, headers=headers)
+
+    def _completion(self, body: dict) -> tuple:
+        """Response words, input token estimate and whether the budget cut it short"""
+        messages = body.get('messages', [])
+        text = " ".join(_text(message.get('content')) for message in messages)
+        text += " " + _text(body.get('system'))
+        source = text.split() or ["prompt"]
+        limit = body.get('max_tokens') or body.get('max_completion_tokens') or self.words
+        count = min(self.words, limit)
+        words = ["Enhanced:"] + list(itertools.islice(itertools.cycle(source), count - 1))
+        return [word + " " for word in words], max(1, len(text) // 4), count < self.words
+
+    async def _sse(self, request: web.Request, events):
+        """Write SSE events with the configured pacing, dropping the connection if asked"""
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache'})
+        await response.prepare(request)
+        self.requests += 1
+        drop = self.drop_after and (self.drops == 0 or self.requests <= self.drops)
+        await asyncio.sleep(self.ttft)
+        try:
+            for index, event in enumerate(events):
+                if drop and index == self.drop_after:
+                    # Close mid-body so the client sees a truncated stream
+                    request.transport.close()
+                    return response
+                if index and self.chunk_delay:
+                    await asyncio.sleep(self.chunk_delay)
+                await response.write(event.encode('utf-8'))
+            await response.write_eof()
+        except ConnectionResetError:
+            pass  # The client cancelled the request
+        return response
+
+    async def chat_completions(self, request: web.Request):
+        body = await request.json()
+        self.bodies.append(body)
+        if self.reject_stream_options and 'stream_options' in body:
+            return web.json_response({"error": {
+                "message": "Unrecognized request argument supplied: stream_options",
+                "type": "invalid_request_error", "param": "stream_options",
+            }}, status=400)
+        words, input_tokens, truncated = self._completion(body)
+        finish_reason = "length" if truncated else "stop"
+        usage = {"prompt_tokens": input_tokens, "completion_tokens": len(words),
+                 "total_tokens": input_tokens + len(words)}
+        created = int(time.time())
+
+        if not body.get('stream'):
+            self.requests += 1
+            await asyncio.sleep(self.ttft + self.chunk_delay * len(words))
+            return web.json_response({
+                "id": "chatcmpl-fake", "object": "chat.completion", "created": created, "model": body.get('model'),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(words)},
+                             "finish_reason": finish_reason}],
+                "usage": usage,
+            })
+
+        if self.replay_events:
+            return await self._sse(request, self.replay_events)
+
+        def chunk(delta, finish=None, chunk_usage=None):
+            choices = [] if chunk_usage else [{"index": 0, "delta": delta, "finish_reason": finish}]
+            data = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": created,
+                    "model": body.get('model'), "choices": choices}
+            if chunk_usage:
+                data["usage"] = chunk_usage
+            return f"data: {json.dumps(data)}\n\n"
+
+        events = [chunk({"role": "assistant", "content": ""})]
+        events += [chunk({"content": word}) for word in words]
+        events.append(chunk({}, finish_reason))
+        if (body.get('stream_options') or {}).get('include_usage'):
+            events.append(chunk(None, chunk_usage=usage))
+        events.append("data: [DONE]\n\n")
+        return await self._sse(request, events)
+
+    async def messages(self, request: web.Request):
+        body = await request.json()
+        self.bodies.append(body)
+        words, input_tokens, truncated = self._completion(body)
+        stop_reason = "max_tokens" if truncated else "end_turn"
+        message = {"id": "msg_fake", "type": "message", "role": "assistant", "model": body.get('model'),
+                   "stop_sequence": None}
+
+        if not body.get('stream'):
+            self.requests += 1
+            await asyncio.sleep(self.ttft + self.chunk_delay * len(words))
+            return web.json_response(dict(
+                message, content=[{"type": "text", "text": "".join(words)}], stop_reason=stop_reason,
+                usage={"input_tokens": input_tokens, "output_tokens": len(words)}
+            ))
+
+        if self.replay_events:
+            return await self._sse(request, self.replay_events)
+
+        def event(name, data):
+            return f"event: {name}\ndata: {json.dumps(dict(data, type=name))}\n\n"
+
+        events = [
+            event("message_start", {"message": dict(message, content=[], stop_reason=None,
+                                                    usage={"input_tokens": input_tokens, "output_tokens": 1})}),
+            event("content_block_start", {"index": 0, "content_block": {"type": "text", "text": ""}}),
+        ]
+        events += [event("content_block_delta", {"index": 0, "delta": {"type": "text_delta", "text": word}})
+                   for word in words]
+        events += [
+            event("content_block_stop", {"index": 0}),
+            event("message_delta", {"delta": {"stop_reason": stop_reason, "stop_sequence": None},
+                                    "usage": {"output_tokens": len(words)}}),
+            event("message_stop", {}),
+        ]
+        return await self._sse(request, events)
+
+
+def _text(content) -> str:
+    """Plain text of a message content string or list of content blocks"""
+    if isinstance(content, list):
+        return " ".join(block.get('text', '') for block in content if isinstance(block, dict))
+    return content or ""
+
+
+async def start_fake_server(provider: FakeProvider, host: str = "127.0.0.1", port: int = 0) -> tuple:
+    """Run a fake provider in the current loop; returns (runner, base URL)"""
+    runner = web.AppRunner(provider.app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://{host}:{port}"
+
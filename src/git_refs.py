@@ -0,0 +1,317 @@
+import difflib
+import os
+import subprocess
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from .references import REFERENCE_PATTERN, TRAILING_PUNCTUATION
+
+
+# References that are not revisions
+WORKING_TREE_REFERENCES = ('diff', 'staged')
+
+# Characters that cannot appear in a revision or path expression we accept
+INVALID_REVISION_CHARS = set(' \t\n\\"\'`$;|&<>*?[]{}()')
+
+
+@dataclass
+class GitReference:
+    """A git object or diff referenced from the prompt with @"""
+    token: str
+    kind: str  # "diff", "staged", "commit" or "blob"
+    spec: str
+
+    @property
+    def label(self) -> str:
+        return f"@{self.spec}"
+
+
+class GitBatch:
+    """Reads objects through long-lived git cat-file processes
+
+    Revisions are resolved with one `git cat-file --batch-check` process and
+    contents are read with one `git cat-file --batch` process, so resolving
+    any number of references does not fork git again. Objects are immutable,
+    so contents are cached by object id.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._check: Optional[subprocess.Popen] = None
+        self._batch: Optional[subprocess.Popen] = None
+        self._objects: Dict[str, Tuple[str, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, mode: str) -> subprocess.Popen:
+        return subprocess.Popen(
+            ['git', 'cat-file', mode],
+            cwd=self.root,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def _request(self, process: subprocess.Popen, spec: str) -> Optional[List[str]]:
+        """Send one object name and read its header line"""
+        process.stdin.write(spec.encode('utf-8') + b'\n')
+        process.stdin.flush()
+        header = process.stdout.readline().decode('utf-8', errors='replace').split()
+        if len(header) != 3 or header[-1] in ('missing', 'ambiguous'):
+            return None
+        return header
+
+    def resolve(self, spec: str) -> Optional[Tuple[str, str]]:
+        """Object id and type of a revision expression"""
+        with self._lock:
+            if self._check is None:
+                self._check = self._start('--batch-check')
+            header = self._request(self._check, spec)
+        if header is None:
+            return None
+        return header[0], header[1]
+
+    def read(self, spec: str) -> Optional[Tuple[str, str, bytes]]:
+        """Object id, type and contents of a revision expression"""
+        resolved = self.resolve(spec)
+        if resolved is None:
+            return None
+        oid = resolved[0]
+        cached = self._objects.get(oid)
+        if cached:
+            return oid, cached[0], cached[1]
+
+        with self._lock:
+            if self._batch is None:
+                self._batch = self._start('--batch')
+            header = self._request(self._batch, oid)
+            if header is None:
+                return None
+            size = int(header[2])
+            data = self._batch.stdout.read(size)
+            self._batch.stdout.read(1)  # Trailing newline
+        self._objects[oid] = (header[1], data)
+        return oid, header[1], data
+
+    def close(self):
+        """Stop the git processes"""
+        for process in (self._check, self._batch):
+            if process and process.poll() is None:
+                process.stdin.close()
+                process.wait()
+        self._check = self._batch = None
+
+
+class GitReferences:
+    """Resolves @diff, @staged, @<rev> and @<rev>:<path> references"""
+
+    def __init__(self, directory: str = None):
+        self.directory = directory or os.getcwd()
+        self._root: Optional[str] = None
+        self._git_dir: Optional[str] = None
+        self._checked = False
+        self._batch: Optional[GitBatch] = None
+        self._staged_cache: Dict[tuple, str] = {}
+
+    @property
+    def root(self) -> Optional[str]:
+        """Top level of the repository, or None outside one"""
+        if not self._checked:
+            self._checked = True
+            try:
+                result = subprocess.run(
+                    ['git', 'rev-parse', '--show-toplevel', '--absolute-git-dir'],
+                    cwd=self.directory, capture_output=True, text=True, timeout=5
+                )
+                lines = result.stdout.splitlines()
+                if result.returncode == 0 and len(lines) == 2:
+                    self._root, self._git_dir = lines
+            except (OSError, subprocess.SubprocessError):
+                pass
+        return self._root
+
+    @property
+    def batch(self) -> GitBatch:
+        if self._batch is None:
+            self._batch = GitBatch(self.root)
+        return self._batch
+
+    def parse(self, token: str) -> Optional[GitReference]:
+        """Resolve an @token to a git reference, if it names one"""
+        spec = token.rstrip(TRAILING_PUNCTUATION)
+        if not spec or INVALID_REVISION_CHARS.intersection(spec) or self.root is None:
+            return None
+        if spec in WORKING_TREE_REFERENCES:
+            return GitReference(token, spec, spec)
+
+        if ':' in spec:
+            revision, _, path = spec.partition(':')
+            if not revision or not path:
+                return None
+            resolved = self.batch.resolve(f"{revision}:{path}")
+            if resolved and resolved[1] == 'blob':
+                return GitReference(token, 'blob', spec)
+            return None
+
+        if self.batch.resolve(f"{spec}^{{commit}}"):
+            return GitReference(token, 'commit', spec)
+        return None
+
+    def extract(self, prompt: str, skip_tokens=()) -> List[GitReference]:
+        """Unique git references in prompt text"""
+        references = []
+        seen = set()
+        for token in REFERENCE_PATTERN.findall(prompt):
+            if token in skip_tokens:
+                continue
+            reference = self.parse(token)
+            if reference and reference.spec not in seen:
+                seen.add(reference.spec)
+                references.append(reference)
+        return references
+
+    def content(self, reference: GitReference, max_chars: int) -> str:
+        """Text for a reference; generation stops once max_chars is exceeded"""
+        if reference.kind == 'diff':
+            return self._git_diff([]) or "[No unstaged changes]"
+        if reference.kind == 'staged':
+            return self._staged_diff() or "[No staged changes]"
+        if reference.kind == 'blob':
+            found = self.batch.read(reference.spec)
+            return _decode(found[2]) if found else f"[{reference.spec} not found]"
+        return self._show_commit(reference.spec, max_chars)
+
+    def _git_diff(self, args: List[str]) -> str:
+        """Output of git diff; the working tree has no object id to cache by"""
+        try:
+            result = subprocess.run(
+                ['git', 'diff', '--no-color', '--no-ext-diff'] + args,
+                cwd=self.root, capture_output=True, timeout=30
+            )
+        except (OSError, subprocess.SubprocessError) as e:
+            return f"[git diff failed: {e}]"
+        return result.stdout.decode('utf-8', errors='replace')
+
+    def _staged_diff(self) -> str:
+        """Staged changes, cached while HEAD and the index are unchanged"""
+        head = self.batch.resolve('HEAD')
+        index = os.path.join(self._git_dir, 'index')
+        try:
+            stat = os.stat(index)
+            key = (head and head[0], stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            key = None
+        if key and key in self._staged_cache:
+            return self._staged_cache[key]
+        diff = self._git_diff(['--cached'])
+        if key:
+            self._staged_cache = {key: diff}
+        return diff
+
+    def _show_commit(self, spec: str, max_chars: int) -> str:
+        """Commit header, message and diff against its first parent, built from objects"""
+        found = self.batch.read(f"{spec}^{{commit}}")
+        if not found:
+            return f"[{spec} not found]"
+        oid, _, data = found
+        headers, _, message = _decode(data).partition('\n\n')
+
+        tree = None
+        parents = []
+        author = ""
+        for line in headers.split('\n'):
+            key, _, value = line.partition(' ')
+            if key == 'tree':
+                tree = value
+            elif key == 'parent':
+                parents.append(value)
+            elif key == 'author':
+                author = value.rsplit(' ', 2)[0]
+
+        parts = [f"commit {oid}", f"Author: {author}", "", message.strip(), ""]
+        parent_tree = None
+        if parents:
+            parent = self.batch.read(parents[0])
+            if parent:
+                parent_tree = _decode(parent[2]).split('\n', 1)[0].partition(' ')[2]
+
+        length = sum(len(part) for part in parts)
+        for path, old_oid, new_oid in self._changed_blobs(parent_tree, tree, ""):
+            if length > max_chars:
+                parts.append("[... more changed files omitted]")
+                break
+            section = self._blob_diff(path, old_oid, new_oid)
+            parts.append(section)
+            length += len(section)
+        return "\n".join(parts)
+
+    def _tree_entries(self, oid: Optional[str]) -> Dict[str, Tuple[str, str]]:
+        """Entries of a tree object: name -> (mode, oid)"""
+        if not oid:
+            return {}
+        found = self.batch.read(oid)
+        if not found:
+            return {}
+        data = found[2]
+        oid_bytes = len(found[0]) // 2
+        entries = {}
+        position = 0
+        while position < len(data):
+            space = data.index(b' ', position)
+            null = data.index(b'\0', space)
+            mode = data[position:space].decode()
+            name = data[space + 1:null].decode('utf-8', errors='replace')
+            entries[name] = (mode, data[null + 1:null + 1 + oid_bytes].hex())
+            position = null + 1 + oid_bytes
+        return entries
+
+    def _changed_blobs(self, old_tree: Optional[str], new_tree: Optional[str], prefix: str):
+        """Paths whose blobs differ between two trees"""
+        old_entries = self._tree_entries(old_tree)
+        new_entries = self._tree_entries(new_tree)
+        for name in sorted(set(old_entries) | set(new_entries)):
+            old = old_entries.get(name)
+            new = new_entries.get(name)
+            if old == new:
+                continue
+            path = prefix + name
+            old_is_tree = bool(old) and old[0] == '40000'
+            new_is_tree = bool(new) and new[0] == '40000'
+            if old_is_tree or new_is_tree:
+                yield from self._changed_blobs(
+                    old[1] if old_is_tree else None, new[1] if new_is_tree else None, path + "/"
+                )
+                # A file replaced by a directory or the other way around
+                if old and not old_is_tree:
+                    yield path, old[1], None
+                if new and not new_is_tree:
+                    yield path, None, new[1]
+            elif '160000' not in (old and old[0], new and new[0]):
+                yield path, old and old[1], new and new[1]
+
+    def _blob_diff(self, path: str, old_oid: Optional[str], new_oid: Optional[str]) -> str:
+        """Unified diff of two blobs"""
+        contents = []
+        for oid in (old_oid, new_oid):
+            found = self.batch.read(oid) if oid else (oid, 'blob', b"")
+            if not found:
+                return f"[{path} {oid} not found]"
+            contents.append(found[2])
+        old, new = contents
+        if b'\0' in old[:8000] or b'\0' in new[:8000]:
+            return f"Binary file {path} changed"
+        lines = difflib.unified_diff(
+            _decode(old).splitlines(keepends=True),
+            _decode(new).splitlines(keepends=True),
+            fromfile=f"a/{path}" if old_oid else "/dev/null",
+            tofile=f"b/{path}" if new_oid else "/dev/null",
+        )
+        return "".join(line if line.endswith('\n') else line + '\n' for line in lines)
+
+    def close(self):
+        if self._batch:
+            self._batch.close()
+
+
+def _decode(data: bytes) -> str:
+    return data.decode('utf-8', errors='replace')
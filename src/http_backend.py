@@ -0,0 +1,163 @@
+import asyncio
+import json
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from .compression import RequestCompressor
+
+
+class HTTPStatusError(Exception):
+    """Error response from the provider, or an error event in a stream"""
+
+    def __init__(self, status_code: int, body, message: str = ""):
+        self.status_code = status_code
+        self.body = body
+        super().__init__(message or f"Error code: {status_code} - {body}")
+
+
+class SSEDecoder:
+    """Incremental server-sent events parser
+
+    Incoming bytes are appended to one bytearray and complete lines are
+    located with find(); only field values are sliced out and decoded, and
+    consumed bytes are dropped once per chunk rather than once per line.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._event = ""
+        self._data: List[str] = []
+
+    def feed(self, chunk: bytes) -> List[Tuple[str, str]]:
+        """Add bytes and return the (event, data) pairs they complete"""
+        buffer = self._buffer
+        buffer += chunk
+        events = []
+        start = 0
+        while True:
+            end = buffer.find(b'\n', start)
+            if end < 0:
+                break
+            line_end = end - 1 if end > start and buffer[end - 1] == 0x0D else end
+
+            if line_end == start:
+                # A blank line dispatches the event
+                if self._data:
+                    events.append((self._event or "message", "\n".join(self._data)))
+                self._event = ""
+                self._data = []
+            elif buffer.startswith(b'data:', start):
+                value = start + 5
+                if value < line_end and buffer[value] == 0x20:
+                    value += 1
+                self._data.append(buffer[value:line_end].decode('utf-8'))
+            elif buffer.startswith(b'event:', start):
+                self._event = buffer[start + 6:line_end].decode('utf-8').strip()
+            # Comments (":") and other fields (id, retry) are ignored
+
+            start = end + 1
+        if start:
+            del buffer[:start]
+        return events
+
+
+class HTTPBackend:
+    """Minimal async HTTP client for chat APIs
+
+    One aiohttp session (and so one connection pool) is kept per event loop.
+    JSON requests return parsed dicts and streams yield parsed SSE events,
+    so no SDK objects are built per chunk. With a compressor, large request
+    bodies are sent compressed.
+    """
+
+    def __init__(self, base_url: str, headers: Dict[str, str], read_timeout: float = 600,
+                 compressor: RequestCompressor = None):
+        self.base_url = base_url.rstrip('/')
+        self.headers = dict(headers, **{"Content-Type": "application/json"})
+        self.read_timeout = read_timeout
+        self.compressor = compressor
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Pooled session for the running loop"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=16, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=self.read_timeout),
+                headers=self.headers,
+            )
+            self._loop = loop
+        return self._session
+
+    async def _raise_for_status(self, response: aiohttp.ClientResponse):
+        """Turn an error response into HTTPStatusError"""
+        if response.status < 400:
+            return
+        text = await response.text()
+        try:
+            body = json.loads(text)
+        except ValueError:
+            body = text
+        raise HTTPStatusError(response.status, body)
+
+    async def _post(self, path: str, payload: Dict) -> aiohttp.ClientResponse:
+        """POST a JSON body, compressed when the endpoint accepts it"""
+        session = self._get_session()
+        url = self.base_url + path
+        body = json.dumps(payload).encode('utf-8')
+        if self.compressor:
+            if self.compressor.needs_probe:
+                await self._probe(session, url)
+            compressed, encoding = self.compressor.encode(body)
+            if encoding:
+                response = await session.post(url, data=compressed, headers={"Content-Encoding": encoding})
+                if response.status != 415:
+                    return response
+                response.release()
+                self.compressor.reject(encoding)
+        return await session.post(url, data=body)
+
+    async def _probe(self, session: aiohttp.ClientSession, url: str):
+        """Ask the endpoint which request encodings it accepts"""
+        try:
+            async with session.options(url) as response:
+                self.compressor.record_probe(response.headers.get("Accept-Encoding", ""))
+        except aiohttp.ClientError:
+            # Send uncompressed for now and probe again next run
+            self.compressor.needs_probe = False
+
+    async def post_json(self, path: str, payload: Dict) -> Dict:
+        """POST a JSON request and return the parsed response"""
+        async with await self._post(path, payload) as response:
+            await self._raise_for_status(response)
+            return json.loads(await response.read())
+
+    async def stream(self, path: str, payload: Dict) -> AsyncIterator[Tuple[str, Dict]]:
+        """POST a streaming request and yield (event, data) with data parsed as JSON
+
+        Stops at the OpenAI "[DONE]" sentinel or the Anthropic message_stop
+        event, and raises HTTPStatusError on error events.
+        """
+        decoder = SSEDecoder()
+        async with await self._post(path, payload) as response:
+            await self._raise_for_status(response)
+            async for chunk in response.content.iter_any():
+                for event, data in decoder.feed(chunk):
+                    if data == "[DONE]":
+                        return
+                    parsed = json.loads(data)
+                    if event == "error" or parsed.get('type') == "error" or 'error' in parsed:
+                        raise HTTPStatusError(response.status, parsed, f"Stream error: {data}")
+                    yield event, parsed
+                    if event == "message_stop":
+                        return
+        # Both formats end with an explicit marker; without it the stream was cut
+        raise ConnectionError("Stream ended before the response was complete")
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
@@ -1,7 +1,72 @@
 import os
-from collections import Counter
+import time
+from collections import Counter, deque
+from fnmatch import fnmatchcase
 from pathlib import Path
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
+
+
+def _build_extension_table(patterns: Dict[str, List[str]]) -> Dict[str, str]:
+    """Map each extension to the first language that claims it
+
+    Lookups use a file's last suffix, so compound suffixes like .d.ts are
+    left out; those files are found by their last suffix (.ts) instead.
+    """
+    table = {}
+    for language, extensions in patterns.items():
+        for ext in extensions:
+            if ext.startswith('.') and '.' not in ext[1:]:
+                table.setdefault(ext.lower(), language)
+    return table
+
+
+class GitignoreRules:
+    """Minimal .gitignore matcher (globs, anchoring, dir-only and negation)"""
+    
+    def __init__(self, rules: List[Tuple[str, str, bool, bool, bool]] = None):
+        # (base, pattern, negated, dir_only, anchored)
+        self.rules = rules or []
+    
+    def extend(self, directory: str, base: str) -> "GitignoreRules":
+        """Return rules with the .gitignore of directory added, if any"""
+        try:
+            with open(os.path.join(directory, '.gitignore'), 'r', encoding='utf-8', errors='ignore') as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return self
+        
+        rules = list(self.rules)
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            negated = line.startswith('!')
+            if negated:
+                line = line[1:]
+            dir_only = line.endswith('/')
+            line = line.strip('/') if dir_only else line
+            anchored = '/' in line
+            line = line.lstrip('/')
+            if line:
+                rules.append((base, line, negated, dir_only, anchored))
+        return GitignoreRules(rules)
+    
+    def ignored(self, rel_path: str, is_dir: bool) -> bool:
+        """Check a path relative to the scan root; the last matching rule wins"""
+        result = False
+        name = rel_path.rsplit('/', 1)[-1]
+        for base, pattern, negated, dir_only, anchored in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if base:
+                if not rel_path.startswith(base + '/'):
+                    continue
+                path = rel_path[len(base) + 1:]
+            else:
+                path = rel_path
+            if fnmatchcase(path if anchored else name, pattern):
+                result = not negated
+        return result
 
 
 class LanguageDetector:
@@ -40,6 +105,26 @@ class LanguageDetector:
         'spring': ['.java', 'pom.xml', 'build.gradle']
     }
     
+    # Precomputed extension -> language lookup used for scoring
+    EXTENSION_LANGUAGES = _build_extension_table(LANGUAGE_PATTERNS)
+    
+    LANGUAGE_NAMES = {
+        'javascript': 'JavaScript',
+        'typescript': 'TypeScript',
+        'cpp': 'C++',
+        'csharp': 'C#',
+        'php': 'PHP',
+        'r': 'R',
+        'matlab': 'MATLAB',
+        'powershell': 'PowerShell',
+    }
+    
+    # Directories that never tell us anything about the project's own code
+    SKIP_DIRS = {
+        'node_modules', '__pycache__', 'venv', 'env', 'build', 'dist', 'target',
+        'vendor', 'third_party', 'htmlcov', 'site-packages', 'bower_components'
+    }
+    
     # Framework/technology specific files
     FRAMEWORK_INDICATORS = {
         'flutter': ['pubspec.yaml', 'lib/', 'android/', 'ios/'],
@@ -55,8 +140,14 @@ class LanguageDetector:
     }
     
     
-    def __init__(self, directory: str = None):
+    def __init__(self, directory: str = None, time_budget: float = 0.25,
+                 max_files_per_dir: int = 50, max_entries: int = 20000, min_share: float = 0.05):
         self.directory = Path(directory) if directory else Path.cwd()
+        self.time_budget = time_budget
+        self.max_files_per_dir = max_files_per_dir
+        self.max_entries = max_entries
+        self.min_share = min_share
+        self._mix = None
     
     def detect_language(self) -> Optional[str]:
         """Detect the primary programming language in the directory"""
@@ -68,27 +159,53 @@ class LanguageDetector:
         if framework:
             return framework
         
-        # Count file extensions
-        extension_counts = self._count_extensions()
-        if not extension_counts:
-            return None
+        mix = self.detect_language_mix()
+        return mix[0][0] if mix else None
+    
+    def detect_language_mix(self) -> List[Tuple[str, float]]:
+        """Detect the weighted language mix as (language, share) pairs, largest first"""
+        if self._mix is not None:
+            return self._mix
+        if not self.directory.exists():
+            return []
         
-        # Find the most likely language
-        language_scores = {}
+        language_scores = Counter()
+        for ext, count in self._count_extensions().items():
+            language = self.EXTENSION_LANGUAGES.get(ext)
+            if language:
+                language_scores[language] += count
         
-        for language, extensions in self.LANGUAGE_PATTERNS.items():
-            score = 0
-            for ext in extensions:
-                if ext in extension_counts:
-                    score += extension_counts[ext]
-            if score > 0:
-                language_scores[language] = score
+        total = sum(language_scores.values())
+        if not total:
+            self._mix = []
+            return self._mix
         
-        if not language_scores:
+        self._mix = [
+            (language, score / total)
+            for language, score in language_scores.most_common()
+            if score / total >= self.min_share
+        ]
+        return self._mix
+    
+    def format_language_mix(self, mix: List[Tuple[str, float]] = None) -> str:
+        """Format a language mix like: 70% Go, 25% TypeScript"""
+        if mix is None:
+            mix = self.detect_language_mix()
+        return ", ".join(f"{share:.0%} {self.get_language_name(language)}" for language, share in mix)
+    
+    def get_language_name(self, language: str) -> str:
+        """Human readable language name"""
+        return self.LANGUAGE_NAMES.get(language, language.title())
+    
+    def describe_environment(self) -> Optional[str]:
+        """Short environment description for display"""
+        language = self.detect_language()
+        if not language:
             return None
-        
-        # Return the language with the highest score
-        return max(language_scores.items(), key=lambda x: x[1])[0]
+        mix = self.detect_language_mix()
+        if len(mix) > 1 and mix[0][0] == language:
+            return self.format_language_mix(mix)
+        return self.get_language_name(language)
     
     def _detect_framework(self) -> Optional[str]:
         """Detect specific frameworks or technologies (non-recursive)"""
@@ -112,41 +229,66 @@ class LanguageDetector:
         return None
     
     def _count_extensions(self) -> Dict[str, int]:
-        """Count file extensions in the directory (non-recursive)"""
+        """Count file extensions with a sampled, gitignore-aware recursive walk
+        
+        Directories are visited breadth-first with a per-directory file cap,
+        a total entry cap and a wall-clock budget, so large monorepos and
+        slow network mounts still return quickly with a representative sample.
+        """
         extension_counts = Counter()
+        deadline = time.monotonic() + self.time_budget
+        root = str(self.directory)
+        queue = deque([(root, '', GitignoreRules())])
+        entries_seen = 0
         
-        try:
-            # Only scan current directory, not subdirectories
-            for item in self.directory.iterdir():
-                if item.is_file():
-                    # Skip hidden files and common non-code files
-                    if item.name.startswith('.') and item.name not in ['Dockerfile', '.dockerfile']:
-                        continue
-                    
-                    # Handle special cases
-                    if item.name.lower() in ['dockerfile', 'makefile', 'gemfile', 'rakefile']:
-                        extension_counts[item.name.lower()] += 1
-                    elif item.suffix:
-                        extension_counts[item.suffix.lower()] += 1
-                        
-            # Also check common subdirectories for framework detection (limited depth)
-            common_dirs = ['src', 'lib', 'app', 'components', 'pages', 'views', 'controllers']
-            for dir_name in common_dirs:
-                subdir = self.directory / dir_name
-                if subdir.is_dir():
-                    try:
-                        # Only count a few files from each common directory
-                        file_count = 0
-                        for item in subdir.iterdir():
-                            if item.is_file() and file_count < 10:  # Limit to 10 files per subdir
-                                if not item.name.startswith('.') and item.suffix:
-                                    extension_counts[item.suffix.lower()] += 1
-                                    file_count += 1
-                    except PermissionError:
+        while queue and entries_seen < self.max_entries:
+            if time.monotonic() > deadline:
+                break
+            directory, rel_dir, rules = queue.popleft()
+            files_counted = 0
+            
+            try:
+                with os.scandir(directory) as iterator:
+                    entries = list(iterator)
+            except OSError:
+                continue
+            
+            # Only read a .gitignore when the listing shows one exists
+            if any(entry.name == '.gitignore' for entry in entries):
+                rules = rules.extend(directory, rel_dir)
+            
+            for entry in entries:
+                entries_seen += 1
+                name = entry.name
+                # Skip hidden files and directories
+                if name.startswith('.'):
+                    continue
+                rel_path = f"{rel_dir}/{name}" if rel_dir else name
+                
+                try:
+                    # d_type from scandir avoids an extra stat per entry
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                
+                if is_dir:
+                    if name not in self.SKIP_DIRS and not rules.ignored(rel_path, True):
+                        queue.append((entry.path, rel_path, rules))
+                    continue
+                
+                if files_counted >= self.max_files_per_dir or rules.ignored(rel_path, False):
+                    continue
+                
+                # Handle special cases
+                lower_name = name.lower()
+                if lower_name in ['dockerfile', 'makefile', 'gemfile', 'rakefile']:
+                    extension_counts[lower_name] += 1
+                else:
+                    dot = lower_name.rfind('.')
+                    if dot <= 0:
                         continue
-                        
-        except PermissionError:
-            pass
+                    extension_counts[lower_name[dot:]] += 1
+                files_counted += 1
         
         return dict(extension_counts)
     
@@ -156,6 +298,10 @@ class LanguageDetector:
         if not language:
             return ""
         
+        mix = self.detect_language_mix()
+        if len(mix) > 1 and mix[0][0] == language:
+            return f"multi-language project ({self.format_language_mix(mix)})"
+        
         context_map = {
             'python': "Python project",
             'javascript': "JavaScript project", 
@@ -0,0 +1,160 @@
+import re
+from typing import Optional
+
+
+# Common English misspellings and missing apostrophes
+COMMON_MISSPELLINGS = {
+    'teh': 'the', 'adn': 'and', 'taht': 'that', 'thier': 'their', 'recieve': 'receive',
+    'recieved': 'received', 'beleive': 'believe', 'acheive': 'achieve', 'occured': 'occurred',
+    'occurence': 'occurrence', 'seperate': 'separate', 'seperately': 'separately',
+    'definately': 'definitely', 'wich': 'which', 'whith': 'with', 'wiht': 'with',
+    'becuase': 'because', 'becasue': 'because', 'untill': 'until', 'alot': 'a lot',
+    'accross': 'across', 'adress': 'address', 'arguement': 'argument', 'begining': 'beginning',
+    'calender': 'calendar', 'comming': 'coming', 'commited': 'committed', 'concious': 'conscious',
+    'enviroment': 'environment', 'existance': 'existence', 'goverment': 'government',
+    'grammer': 'grammar', 'independant': 'independent', 'neccessary': 'necessary',
+    'necesary': 'necessary', 'noticable': 'noticeable', 'paramter': 'parameter',
+    'parrallel': 'parallel', 'paralell': 'parallel', 'posible': 'possible', 'prefered': 'preferred',
+    'priviledge': 'privilege', 'realy': 'really', 'refered': 'referred', 'relevent': 'relevant',
+    'responce': 'response', 'succesful': 'successful', 'successfull': 'successful',
+    'sucess': 'success', 'tommorow': 'tomorrow', 'truely': 'truly', 'wierd': 'weird',
+    'writting': 'writing', 'funtion': 'function', 'fucntion': 'function', 'functon': 'function',
+    'retrun': 'return', 'lenght': 'length', 'widht': 'width', 'heigth': 'height',
+    'dont': "don't", 'doesnt': "doesn't", 'didnt': "didn't", 'isnt': "isn't", 'arent': "aren't",
+    'wasnt': "wasn't", 'werent': "weren't", 'cant': "can't", 'couldnt': "couldn't",
+    'shouldnt': "shouldn't", 'wouldnt': "wouldn't", 'havent': "haven't", 'hasnt': "hasn't",
+}
+
+QUESTION_WORDS = {
+    'how', 'what', 'why', 'when', 'where', 'who', 'which', 'can', 'could', 'should',
+    'would', 'is', 'are', 'do', 'does', 'did', 'will',
+    # Negated forms, checked after "cant" and the like are fixed; "don't"
+    # is left out because it usually starts an instruction
+    "can't", "couldn't", "shouldn't", "wouldn't", "isn't", "aren't", "doesn't", "didn't", "won't",
+}
+
+# Function words; prose with none of them is probably not English
+ENGLISH_HINTS = {
+    'the', 'a', 'an', 'to', 'of', 'and', 'in', 'is', 'are', 'for', 'it', 'that', 'this',
+    'with', 'on', 'be', 'i', 'you', 'me', 'my', 'we', 'can', 'how', 'what', 'please', 'make',
+}
+
+# Vowel-initial words that take "a" and consonant-initial words that take "an"
+A_EXCEPTIONS = ('one', 'once', 'uni', 'use', 'usa', 'usu', 'uti', 'ure', 'eu', 'ewe')
+AN_EXCEPTIONS = ('hour', 'honest', 'honor', 'honour', 'heir')
+
+WORD_PATTERN = re.compile(r"\b[A-Za-z]+\b")
+DUPLICATE_WORD_PATTERN = re.compile(r"\b(\w+)(?:[ \t]+\1\b)+", re.IGNORECASE)
+# Words that are legitimately repeated ("I know that that works")
+ALLOWED_REPEATS = {'that', 'had', 'is'}
+CODE_HINTS = re.compile(r"[{};=<>\[\]\\|`$]|::|->|=>|\w\(\S*\)")
+
+
+class LocalGentleEngine:
+    """Offline rule-based engine for the Gentle style
+
+    Handles plain prose with deterministic whitespace, punctuation, spelling
+    and simple grammar fixes. Anything that needs understanding (code, file
+    references, long or non-English text) is left to the provider.
+    """
+
+    MAX_CHARS = 2000
+
+    def can_handle(self, text: str) -> bool:
+        """Check whether the input is plain prose the local rules are safe for"""
+        if not text or len(text) > self.MAX_CHARS:
+            return False
+        if '@' in text or '```' in text or 'http://' in text or 'https://' in text:
+            return False
+        if len(CODE_HINTS.findall(text)) > 2:
+            return False
+
+        visible = [c for c in text if not c.isspace()]
+        letters = sum(1 for c in visible if c.isascii() and c.isalpha())
+        if not visible or letters / len(visible) < 0.75:
+            return False
+
+        words = [word.lower() for word in WORD_PATTERN.findall(text)]
+        return len(words) < 4 or any(word in ENGLISH_HINTS for word in words)
+
+    def enhance(self, text: str) -> Optional[str]:
+        """Apply the gentle rules, or return None if the input needs the provider"""
+        if not self.can_handle(text):
+            return None
+
+        result = self._normalize_whitespace(text)
+        result = WORD_PATTERN.sub(self._fix_word, result)
+        result = DUPLICATE_WORD_PATTERN.sub(self._drop_duplicate, result)
+        result = self._fix_punctuation(result)
+        result = self._fix_articles(result)
+        result = self._capitalize(result)
+        return self._terminate(result)
+
+    def _normalize_whitespace(self, text: str) -> str:
+        """Collapse runs of spaces and blank lines"""
+        lines = [re.sub(r"[ \t]+", " ", line).strip() for line in text.strip().splitlines()]
+        return re.sub(r"\n{3,}", "\n\n", "\n".join(lines))
+
+    def _fix_word(self, match) -> str:
+        """Fix misspellings and the standalone pronoun "i\""""
+        word = match.group(0)
+        lower = word.lower()
+        if lower == 'i':
+            # Leave abbreviations such as "i.e." alone
+            if match.string[match.end():match.end() + 1] == '.':
+                return word
+            return 'I'
+        fixed = COMMON_MISSPELLINGS.get(lower)
+        if not fixed:
+            return word
+        return fixed[0].upper() + fixed[1:] if word[0].isupper() else fixed
+
+    def _drop_duplicate(self, match) -> str:
+        """Collapse accidentally repeated words"""
+        if match.group(1).lower() in ALLOWED_REPEATS:
+            return match.group(0)
+        return match.group(1)
+
+    def _fix_punctuation(self, text: str) -> str:
+        """Normalize spacing around punctuation"""
+        text = re.sub(r"\bi(?=['’](m|ve|ll|d)\b)", "I", text)
+        text = re.sub(r"[ \t]+([,.!?;:])", r"\1", text)
+        text = re.sub(r",(?=[A-Za-z])", ", ", text)
+        text = re.sub(r"([a-z]{2,}[.!?])(?=[A-Z][a-z])", r"\1 ", text)
+        text = re.sub(r"([!?]){2,}", r"\1", text)
+        return re.sub(r"(?<!\.)\.\.(?!\.)", ".", text)
+
+    def _fix_articles(self, text: str) -> str:
+        """Choose "a" or "an" by the following word"""
+        def replace(match):
+            article, word = match.group(1), match.group(2)
+            lower = word.lower()
+            # Leave acronyms alone; their article depends on pronunciation
+            if word.isupper() and len(word) > 1:
+                return match.group(0)
+            starts_with_vowel = lower[0] in 'aeiou'
+            if article.lower() == 'a' and starts_with_vowel and not lower.startswith(A_EXCEPTIONS):
+                fixed = 'an'
+            elif article.lower() == 'an' and not starts_with_vowel and not lower.startswith(AN_EXCEPTIONS):
+                fixed = 'a'
+            else:
+                return match.group(0)
+            if article[0].isupper():
+                fixed = fixed.capitalize()
+            return f"{fixed} {word}"
+
+        return re.sub(r"\b(a|an|A|An)\s+([A-Za-z]+)", replace, text)
+
+    def _capitalize(self, text: str) -> str:
+        """Capitalize sentence and line starts, keeping list markers"""
+        text = re.sub(r"(^|\n)(\s*(?:[-*+]|\d+[.)])?\s*)([a-z])",
+                      lambda m: m.group(1) + m.group(2) + m.group(3).upper(), text)
+        return re.sub(r"(?<!e\.g)(?<!i\.e)(?<!etc)(?<!vs)([.!?]\s+)([a-z])",
+                      lambda m: m.group(1) + m.group(2).upper(), text)
+
+    def _terminate(self, text: str) -> str:
+        """End a single-paragraph prompt with punctuation"""
+        if '\n' in text or not text or not text[-1].isalnum():
+            return text
+        first_word = text.split(None, 1)[0].lower().replace('’', "'")
+        return text + ('?' if first_word in QUESTION_WORDS else '.')
@@ -0,0 +1,57 @@
+import asyncio
+import logging
+from typing import Optional
+
+from rich.console import Console
+
+
+class LoopLagMonitor:
+    """Reports event loop stalls in debug mode
+
+    A heartbeat task measures how late it wakes up, and asyncio's own debug
+    mode logs the callback responsible for any step slower than the
+    threshold.
+    """
+
+    def __init__(self, threshold: float = 0.1, interval: float = 0.05, console: Console = None):
+        self.threshold = threshold
+        self.interval = interval
+        self.console = console or Console(stderr=True)
+        self.max_lag = 0.0
+        self.stalls = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start monitoring the running loop"""
+        loop = asyncio.get_running_loop()
+        loop.set_debug(True)
+        loop.slow_callback_duration = self.threshold
+
+        # asyncio reports slow callbacks through its logger
+        logger = logging.getLogger('asyncio')
+        if not logger.handlers and not logging.getLogger().handlers:
+            logging.basicConfig(level=logging.WARNING, format="[asyncio] %(message)s")
+
+        self._task = loop.create_task(self._watch())
+
+    def stop(self):
+        """Stop monitoring and print a summary"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+            self.console.print(
+                f"[dim]Event loop: {self.stalls} stall(s) over {self.threshold * 1000:.0f} ms, "
+                f"worst {self.max_lag * 1000:.0f} ms[/dim]"
+            )
+
+    async def _watch(self):
+        """Heartbeat that measures how late the loop wakes it up"""
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = loop.time() - started - self.interval
+            self.max_lag = max(self.max_lag, lag)
+            if lag > self.threshold:
+                self.stalls += 1
+                self.console.print(f"[yellow]⚠ Event loop blocked for {lag * 1000:.0f} ms[/yellow]")
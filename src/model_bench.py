@@ -0,0 +1,165 @@
+import asyncio
+import dataclasses
+import statistics
+import time
+from typing import Callable, Dict, List, Optional
+
+from .config import Config
+from .providers import APIClient
+from .usage import UsageTracker
+
+
+# Used when no corpus file is given: short, mixed prompts
+DEFAULT_CORPUS = [
+    "write a function that parses dates in different formats",
+    "explain the difference between a process and a thread",
+    "help me write a cover letter for a backend developer job",
+    "refactor my react component so it doesnt rerender on every keystroke",
+    "make a plan for migrating a monolith database to postgres with no downtime",
+    "summarize this meeting: we agreed to ship on friday, qa needs two more days, marketing wants a blog post",
+    "generate test cases for a url shortener",
+    "what should i check when a docker container keeps restarting",
+]
+
+PERCENTILES = (50, 95, 99)
+
+
+def load_corpus(path: str) -> List[str]:
+    """Prompts from a file: separated by lines of ---, or one per line"""
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    lines = text.splitlines()
+    if any(line.strip() == '---' for line in lines):
+        prompts, current = [], []
+        for line in lines + ['---']:
+            if line.strip() == '---':
+                if "\n".join(current).strip():
+                    prompts.append("\n".join(current).strip())
+                current = []
+            else:
+                current.append(line)
+        return prompts
+    return [line.strip() for line in lines if line.strip()]
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Linearly interpolated percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+@dataclasses.dataclass
+class BenchTarget:
+    """One cell of the benchmark matrix"""
+    backend: str
+    model: str
+    style: str
+
+
+class ModelBenchmark:
+    """Runs a prompt corpus against models, styles and backends
+
+    Every request streams through APIClient exactly like an interactive
+    enhancement, with identical-request coalescing turned off so each one
+    is measured. Requests per target run with bounded concurrency.
+    """
+
+    def __init__(self, config: Config, system_prompts: Dict[str, str], concurrency: int = 4,
+                 repeat: int = 1, api_format: str = None):
+        self.config = config
+        self.system_prompts = system_prompts
+        self.concurrency = max(1, concurrency)
+        self.repeat = max(1, repeat)
+        self.api_format = api_format
+
+    async def run(self, targets: List[BenchTarget], corpus: List[str],
+                  progress: Callable[[BenchTarget], None] = None) -> List[Dict]:
+        """Summaries per target, in order"""
+        results = []
+        for target in targets:
+            if progress:
+                progress(target)
+            results.append(await self._run_target(target, corpus))
+        return results
+
+    async def _run_target(self, target: BenchTarget, corpus: List[str]) -> Dict:
+        config = dataclasses.replace(self.config, model=target.model, backend=target.backend)
+        client = APIClient(config, api_format=self.api_format, coalesce=False)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        system_prompt = self.system_prompts[target.style]
+        started = time.perf_counter()
+        try:
+            samples = await asyncio.gather(*(
+                self._request(
+                    client, semaphore, prompt, system_prompt,
+                    config.get_output_budget(target.style, len(prompt)), target.model
+                )
+                for _ in range(self.repeat) for prompt in corpus
+            ))
+        finally:
+            await client.close()
+        return self._summarize(target, samples, time.perf_counter() - started)
+
+    async def _request(self, client: APIClient, semaphore: asyncio.Semaphore, prompt: str,
+                       system_prompt: str, max_tokens: int, model: str) -> Dict:
+        """Time one streamed request"""
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                async for _ in client.enhance_prompt_stream(prompt, system_prompt, max_tokens, model):
+                    pass
+            except Exception as e:
+                return {'ok': False, 'error': str(e), 'latency': time.perf_counter() - started}
+            usage = client.last_usage
+            return {
+                'ok': True,
+                'latency': time.perf_counter() - started,
+                'ttft': usage.get('ttft'),
+                'input_tokens': usage.get('input_tokens', 0),
+                'cached_tokens': usage.get('cached_tokens', 0),
+                'output_tokens': usage.get('output_tokens', 0),
+                'resumes': usage.get('resumes', 0),
+                'truncated': usage.get('truncated', False),
+            }
+
+    def _summarize(self, target: BenchTarget, samples: List[Dict], wall_time: float) -> Dict:
+        ok = [sample for sample in samples if sample['ok']]
+        latencies = [sample['latency'] for sample in ok]
+        ttfts = [sample['ttft'] for sample in ok if sample['ttft'] is not None]
+        throughputs = [
+            sample['output_tokens'] / (sample['latency'] - sample['ttft'])
+            for sample in ok
+            if sample['ttft'] is not None and sample['output_tokens'] and sample['latency'] > sample['ttft']
+        ]
+        errors: Dict[str, int] = {}
+        for sample in samples:
+            if not sample['ok']:
+                errors[sample['error']] = errors.get(sample['error'], 0) + 1
+
+        summary = dataclasses.asdict(target)
+        summary.update({
+            'requests': len(samples),
+            'errors': len(samples) - len(ok),
+            'error_rate': (len(samples) - len(ok)) / len(samples) if samples else 0.0,
+            'error_messages': errors,
+            'ttft_p50': percentile(ttfts, 50),
+            'tokens_per_second': statistics.median(throughputs) if throughputs else None,
+            'input_tokens': sum(sample['input_tokens'] for sample in ok),
+            'cached_tokens': sum(sample['cached_tokens'] for sample in ok),
+            'output_tokens': sum(sample['output_tokens'] for sample in ok),
+            'resumes': sum(sample['resumes'] for sample in ok),
+            'truncated': sum(1 for sample in ok if sample['truncated']),
+            'wall_time': wall_time,
+        })
+        summary['cost'] = UsageTracker().estimate_cost(
+            {key: summary[key] for key in ('model', 'input_tokens', 'cached_tokens', 'output_tokens')},
+            self.config.model_prices
+        )
+        for pct in PERCENTILES:
+            summary[f'latency_p{pct}'] = percentile(latencies, pct)
+        return summary
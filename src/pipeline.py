@@ -0,0 +1,228 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from prompt_toolkit.patch_stdout import patch_stdout
+from rich.panel import Panel
+from rich.table import Table
+from rich.text import Text
+
+
+PIPELINE_COMMANDS = ['/results', '/show', '/copy']
+
+
+@dataclass
+class PipelineItem:
+    """A submitted prompt and its progress"""
+    number: int
+    prompt: str
+    style: str
+    status: str = "queued"  # queued, running, done or failed
+    output: str = ""
+    received: int = 0  # Characters streamed so far
+    error: str = ""
+    truncated: bool = False  # The output hit its token budget
+    started: Optional[float] = None
+    finished: Optional[float] = None
+
+    @property
+    def elapsed(self) -> Optional[float]:
+        if self.started is None:
+            return None
+        return (self.finished or time.monotonic()) - self.started
+
+
+def _preview(text: str, width: int = 48) -> str:
+    """First line of text, shortened to width"""
+    line = text.strip().split('\n', 1)[0]
+    return line if len(line) <= width else line[:width - 1] + "…"
+
+
+class PipelinedSession:
+    """Interactive session where prompts are queued instead of awaited
+
+    Submitted prompts are enhanced by background workers while the input
+    line stays live; output printed by the workers appears above it. Each
+    result is announced when it completes and can be listed with /results,
+    read with /show N and copied with /copy N.
+    """
+
+    def __init__(self, app, concurrency: int = 3):
+        self.app = app
+        self.console = app.console
+        self.concurrency = max(1, concurrency)
+        self.items: Dict[int, PipelineItem] = {}
+        self._queue: Optional[asyncio.Queue] = None
+
+    @property
+    def pending(self) -> List[PipelineItem]:
+        return [item for item in self.items.values() if item.status in ("queued", "running")]
+
+    async def run(self):
+        """Read prompts until /quit, enhancing them in the background"""
+        self._queue = asyncio.Queue()
+        workers = [asyncio.ensure_future(self._worker()) for _ in range(self.concurrency)]
+        confirm_quit = False
+        try:
+            # Worker output is printed above the prompt instead of through it
+            with patch_stdout(raw=True):
+                while True:
+                    text = await self.app._get_user_prompt()
+                    if text is None:
+                        if self.pending and not confirm_quit:
+                            confirm_quit = True
+                            self.console.print(
+                                f"[yellow]{len(self.pending)} prompt(s) still running - "
+                                f"quit again to cancel them[/yellow]"
+                            )
+                            continue
+                        break
+                    confirm_quit = False
+                    if text:
+                        await self._handle(text)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def _handle(self, text: str):
+        """Run a pipeline command or queue a prompt"""
+        command, _, argument = text.partition(' ')
+        command = command.lower()
+        if command == '/results':
+            self._show_results()
+        elif command == '/show':
+            item = self._find(argument)
+            if item:
+                self._show_item(item)
+        elif command == '/copy':
+            item = self._find(argument)
+            if item:
+                await self._copy(item)
+        elif command == '/refine':
+            self.console.print("[yellow]/refine is not available in pipelined mode[/yellow]")
+        else:
+            number = len(self.items) + 1
+            item = PipelineItem(number, text, self.app.config.current_style)
+            self.items[number] = item
+            self._queue.put_nowait(item)
+            ahead = len(self.pending) - 1
+            waiting = f", {ahead} ahead" if ahead else ""
+            self.console.print(f"[dim]⏳ Queued #{number}{waiting}[/dim]")
+
+    async def _worker(self):
+        while True:
+            item = await self._queue.get()
+            item.status = "running"
+            item.started = time.monotonic()
+            try:
+                item.output = await self._enhance(item)
+                item.status = "done"
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                item.status = "failed"
+                item.error = str(e)
+            finally:
+                item.finished = time.monotonic()
+            self._announce(item)
+
+    async def _enhance(self, item: PipelineItem) -> str:
+        """Enhance one prompt with its file context, recording usage like the interactive session"""
+        app = self.app
+        integrated_prompt, _ = await app._run_blocking(app._integrate_file_context, item.prompt)
+        has_context = integrated_prompt != item.prompt
+        system_prompt = await app._build_system_prompt(item.style, has_context)
+        max_tokens = app.config.get_output_budget(item.style, len(item.prompt))
+        model = await app._run_blocking(app.model_router.choose, item.style, len(integrated_prompt))
+
+        client = app._get_api_client()
+        chunks = []
+        async for chunk in client.enhance_prompt_stream(integrated_prompt, system_prompt, max_tokens, model):
+            chunks.append(chunk)
+            item.received += len(chunk)
+        item.truncated = bool(client.last_usage.get('truncated'))
+        await app._run_blocking(
+            app.usage_tracker.record, client.last_usage, item.style, len(integrated_prompt) - len(item.prompt)
+        )
+        return "".join(chunks).strip()
+
+    def _announce(self, item: PipelineItem):
+        if item.status == "done":
+            self.console.print(
+                f"[green]✓ #{item.number}[/green] {_preview(item.output)} "
+                f"[dim]({item.elapsed:.1f}s - /show {item.number}, /copy {item.number})[/dim]"
+            )
+            if item.truncated:
+                self.console.print(
+                    f"[yellow]⚠ #{item.number} hit the output budget and was cut off. "
+                    f"Raise output_budgets in ~/.pmpt-cli/config.json if this happens often.[/yellow]"
+                )
+        else:
+            self.console.print(f"[red]✗ #{item.number} failed: {item.error}[/red]")
+
+    def _find(self, argument: str) -> Optional[PipelineItem]:
+        """Item by number, or the latest finished one"""
+        argument = argument.strip().lstrip('#')
+        if not argument:
+            finished = [item for item in self.items.values() if item.status == "done"]
+            if not finished:
+                self.console.print("[yellow]No finished results yet[/yellow]")
+                return None
+            return max(finished, key=lambda item: item.finished)
+        item = self.items.get(int(argument)) if argument.isdigit() else None
+        if item is None:
+            self.console.print(f"[red]No result #{argument}[/red]")
+        return item
+
+    def _show_results(self):
+        if not self.items:
+            self.console.print("[dim]Nothing submitted yet[/dim]")
+            return
+        table = Table(show_header=True, header_style="bold")
+        table.add_column("#", justify="right")
+        table.add_column("Status")
+        table.add_column("Style")
+        table.add_column("Time", justify="right")
+        table.add_column("Prompt")
+        table.add_column("Result")
+        colors = {"queued": "dim", "running": "yellow", "done": "green", "failed": "red"}
+        for item in self.items.values():
+            elapsed = item.elapsed
+            status = item.status
+            if status == "running" and item.received:
+                status = f"running ({item.received:,} chars)"
+            elif item.truncated:
+                status = "done (cut off)"
+            table.add_row(
+                str(item.number),
+                f"[{colors[item.status]}]{status}[/{colors[item.status]}]",
+                self.app.enhancement_styles[item.style]['name'],
+                f"{elapsed:.1f}s" if elapsed is not None else "",
+                _preview(item.prompt, 32),
+                _preview(item.output or item.error, 40),
+            )
+        self.console.print(table)
+
+    def _show_item(self, item: PipelineItem):
+        if item.status in ("queued", "running"):
+            self.console.print(f"[yellow]#{item.number} is still {item.status}[/yellow]")
+            return
+        if item.status == "failed":
+            self.console.print(f"[red]#{item.number} failed: {item.error}[/red]")
+            return
+        style_name = self.app.enhancement_styles[item.style]['name']
+        self.console.print(Panel(
+            Text(item.output), title=f"#{item.number} {style_name}" + (" (cut off)" if item.truncated else ""),
+            subtitle=_preview(item.prompt, 60), border_style="yellow" if item.truncated else "green"
+        ))
+
+    async def _copy(self, item: PipelineItem):
+        if item.status != "done":
+            self.console.print(f"[yellow]#{item.number} has no result to copy ({item.status})[/yellow]")
+            return
+        if await self.app._run_blocking(self.app.clipboard_manager.copy_to_clipboard, item.output):
+            self.console.print(f"[green]✓ Copied #{item.number} to clipboard![/green]")
+        else:
+            self.console.print("[red]✗ Failed to copy to clipboard[/red]")
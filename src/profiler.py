@@ -0,0 +1,174 @@
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+# Phases entered with profile_phase() and not left yet, per thread, oldest
+# first. A sampling thread cannot read another thread's context variables,
+# so each entry is kept here and removed by its own id when it is left
+_active_phases: Dict[int, Dict[int, str]] = {}
+_phase_ids = itertools.count()
+
+# Frames that identify a phase wherever they appear in a stack
+STACK_PHASES = [
+    ("startup imports", ("_find_and_load", "_load_unlocked", "exec_module")),
+    ("completer", ("get_completions",)),
+    ("file ingestion", ("_integrate_file_context", "_read_file_content", "_extract_file_references")),
+]
+
+# Modules whose frames mean terminal output is being produced
+RENDERING_MODULES = ("rich", "prompt_toolkit")
+
+# Leaf functions of worker threads that are just waiting for work
+IDLE_FUNCTIONS = {"wait", "get", "select", "poll", "acquire", "_wait_for_tstate_lock"}
+
+
+@contextmanager
+def profile_phase(name: str):
+    """Label samples of the calling thread with a phase (cheap when not profiling)
+
+    The newest phase still entered on a thread wins. Leaving a phase only
+    removes that phase, so asyncio tasks interleaving on one thread do not
+    end each other's phases.
+    """
+    phases = _active_phases.setdefault(threading.get_ident(), {})
+    phase_id = next(_phase_ids)
+    phases[phase_id] = name
+    try:
+        yield
+    finally:
+        del phases[phase_id]
+
+
+def _marked_phase(thread_id: int) -> str:
+    """Newest phase entered on a thread and not yet left"""
+    names = list(_active_phases.get(thread_id, {}).values())
+    return names[-1] if names else "startup"
+
+
+def _frame_name(frame) -> str:
+    """Function name with its file for collapsed stacks"""
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _module_parts(frame) -> List[str]:
+    """Path components of a frame's source file"""
+    return frame.f_code.co_filename.replace('\\', '/').split('/')
+
+
+class SamplingProfiler:
+    """Low-overhead sampling profiler
+
+    A background thread snapshots every thread's stack at a fixed interval
+    and counts collapsed stacks, which flamegraph tools read directly.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.phases: Counter = Counter()
+        self.leaves: Counter = Counter()
+        self.samples = 0
+        self.started = 0.0
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start sampling in a daemon thread"""
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="pmpt-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+
+    def _run(self):
+        """Sampling loop"""
+        own_id = threading.get_ident()
+        main_id = threading.main_thread().ident
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id:
+                    self._sample(frame, thread_id == main_id)
+
+    def _sample(self, frame, is_main: bool):
+        """Record one stack"""
+        frames = []
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+        frames.reverse()
+        if not frames:
+            return
+
+        leaf = frames[-1]
+        if not is_main and leaf.f_code.co_name in IDLE_FUNCTIONS:
+            return
+
+        phase = self._classify(frames, is_main)
+        names = [_frame_name(f) for f in frames]
+        thread = "main" if is_main else "worker"
+        self.stacks[";".join([f"[{phase}]", thread] + names)] += 1
+        self.phases[phase] += 1
+        self.leaves[names[-1]] += 1
+        self.samples += 1
+
+    def _classify(self, frames, is_main: bool) -> str:
+        """Assign a sample to a phase from its stack, falling back to the marked phase"""
+        names = {f.f_code.co_name for f in frames}
+        for phase, markers in STACK_PHASES:
+            if names.intersection(markers):
+                return phase
+        leaf_parts = _module_parts(frames[-1])
+        if any(module in leaf_parts for module in RENDERING_MODULES):
+            return "rendering"
+        return _marked_phase(threading.main_thread().ident) if is_main else "worker"
+
+    def write(self, path: str, top: int = 15) -> str:
+        """Write collapsed stacks to path and a phase summary next to it"""
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        summary = self.summary(top)
+        with open(path + ".summary.txt", 'w') as f:
+            f.write(summary + "\n")
+        return summary
+
+    def summary(self, top: int = 15) -> str:
+        """Top-N summary split by phase"""
+        total = max(self.samples, 1)
+        seconds_per_sample = self.interval
+        lines = [
+            f"Profile: {self.elapsed:.2f}s wall, {self.samples} samples every {self.interval * 1000:.0f} ms",
+            "",
+            "By phase:",
+        ]
+        for phase, count in self.phases.most_common():
+            lines.append(f"  {phase:<18} {count / total:6.1%}  ~{count * seconds_per_sample:.2f}s")
+
+        lines += ["", f"Top {top} functions (self time):"]
+        for name, count in self.leaves.most_common(top):
+            lines.append(f"  {count / total:6.1%}  {name}")
+
+        lines += ["", "Hottest phases by function:"]
+        for phase, _ in self.phases.most_common(5):
+            per_phase: Dict[str, int] = Counter()
+            for stack, count in self.stacks.items():
+                if stack.startswith(f"[{phase}];"):
+                    per_phase[stack.rsplit(";", 1)[-1]] += count
+            lines.append(f"  {phase}:")
+            for name, count in per_phase.most_common(3):
+                lines.append(f"    {count / total:6.1%}  {name}")
+        return "\n".join(lines)
@@ -1,124 +1,550 @@
-from openai import AsyncOpenAI
-from anthropic import AsyncAnthropic
+import asyncio
+import hashlib
+import time
+from contextvars import ContextVar
 
-from .config import Config
+from .compression import CompressingTransport, RequestCompressor
+from .config import CHARS_PER_TOKEN, Config
+from .singleflight import SingleFlight, flights, request_key
+
+
+# Used when the caller does not pass an output budget (Anthropic requires one)
+DEFAULT_MAX_TOKENS = 2000
+
+ANTHROPIC_VERSION = "2023-06-01"
+
+# Usage of the request running in the current task, so concurrent requests
+# through one client each see their own numbers
+_request_usage: ContextVar = ContextVar('pmpt_request_usage', default=None)
+
+# Prompts shorter than this (about 1024 tokens) are below provider cache minimums
+CACHE_MIN_CHARS = 4096
+
+# Resuming streams that drop mid-response
+MAX_STREAM_RESUMES = 2
+RESUME_BACKOFF = 0.5
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+# Matched by class name so neither SDK has to be imported to check them
+TRANSPORT_ERRORS = {"APIConnectionError", "TransportError", "TimeoutException", "ClientConnectionError", "ClientPayloadError"}
+RETRYABLE_ERROR_TYPES = {"overloaded_error", "api_error", "rate_limit_error", "server_error"}
+CONTINUE_INSTRUCTION = (
+    "Your previous response was cut off. Continue it exactly where it stopped, "
+    "without repeating anything already written and without any preamble."
+)
+# Characters of a continuation held back to detect repeated text
+OVERLAP_WINDOW = 200
+
+# Replies of OpenAI-compatible servers that reject request parameters they
+# do not know, such as stream_options on servers that predate it
+REJECTED_PARAMETER_STATUS = {400, 422}
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether an error means the connection or server failed, not the request"""
+    if isinstance(error, (ConnectionError, asyncio.TimeoutError)):
+        return True
+    # SDK connection errors, and read errors mid-stream from the HTTP library
+    if any(cls.__name__ in TRANSPORT_ERRORS for cls in type(error).__mro__):
+        return True
+    if getattr(error, 'status_code', None) in RETRYABLE_STATUS:
+        return True
+    # Errors sent as stream events arrive with a 200 status and a typed body
+    body = getattr(error, 'body', None)
+    if isinstance(body, dict):
+        details = body.get('error', body)
+        if isinstance(details, dict) and details.get('type') in RETRYABLE_ERROR_TYPES:
+            return True
+    return False
+
+
+def _field(obj, name: str, default=None):
+    """Attribute of an SDK object or key of a parsed JSON response"""
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+
+def _compressing_http_client(compressor: RequestCompressor):
+    """OpenAI SDK HTTP client whose transport compresses request bodies"""
+    import importlib
+    from openai import DefaultAsyncHttpxClient
+    # The httpx-compatible package the SDK's client is built on
+    base = next(cls for cls in DefaultAsyncHttpxClient.__mro__ if not cls.__module__.startswith('openai'))
+    http = importlib.import_module(base.__module__.partition('.')[0])
+    return DefaultAsyncHttpxClient(transport=CompressingTransport(http.AsyncHTTPTransport(), compressor))
+
+
+def _drop_overlap(received: str, continuation: str) -> str:
+    """Remove the start of a continuation that repeats the end of received"""
+    tail = received[-OVERLAP_WINDOW:]
+    for size in range(min(len(tail), len(continuation)), 0, -1):
+        if tail.endswith(continuation[:size]):
+            # Short matches are usually coincidence (a space, a letter)
+            return continuation[size:] if size >= 8 else continuation
+    return continuation
 
 
 class APIClient:
     """Unified API client for all providers"""
     
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, api_format: str = None, coalesce: bool = True):
         self.config = config
+        # Join identical in-flight requests (disabled when measuring each request)
+        self.coalesce = coalesce
         self.openai_client = None
         self.anthropic_client = None
+        self.http = None
+        # Cleared when the endpoint rejects stream_options; streams then report no usage
+        self.stream_usage = True
+        # Wire format: "anthropic" or "openai" (also used by OpenAI-compatible servers)
+        self.api_format = api_format or ("anthropic" if "anthropic.com" in config.get_base_url() else "openai")
+        self._latest_usage = {}
         self._setup_clients()
     
+    @property
+    def is_anthropic(self) -> bool:
+        return self.api_format == "anthropic"
+    
+    @property
+    def last_usage(self) -> dict:
+        """Usage of this task's latest request, or of the latest request overall"""
+        current = _request_usage.get()
+        if current and current[0] is self:
+            return current[1]
+        return self._latest_usage
+    
     def _setup_clients(self):
-        """Setup appropriate clients based on configuration"""
+        """Setup appropriate clients based on configuration
+        
+        SDKs are imported only when used; the "http" backend talks to both
+        APIs directly and needs neither.
+        """
         base_url = self.config.get_base_url()
+        extra_headers = {}
+        if "openrouter.ai" in base_url:
+            extra_headers = {
+                "HTTP-Referer": "pmpt-cli",
+                "X-Title": "PMPT CLI"
+            }
         
-        if "anthropic.com" in base_url:
+        # Request body compression is only offered to custom OpenAI-compatible endpoints
+        compressor = None
+        if not self.is_anthropic:
+            compressor = RequestCompressor.for_endpoint(base_url, self.config.request_compression)
+
+        if self.config.backend == "http":
+            from .http_backend import HTTPBackend
+            if self.is_anthropic:
+                headers = {"x-api-key": self.config.api_key, "anthropic-version": ANTHROPIC_VERSION}
+            else:
+                headers = dict(extra_headers, Authorization=f"Bearer {self.config.api_key}")
+            self.http = HTTPBackend(base_url, headers, compressor=compressor)
+        elif self.is_anthropic:
             # Use Anthropic SDK
+            from anthropic import AsyncAnthropic
             self.anthropic_client = AsyncAnthropic(
-                api_key=self.config.api_key
+                api_key=self.config.api_key,
+                base_url=None if "anthropic.com" in base_url else base_url
             )
         else:
             # Use OpenAI SDK for OpenAI-compatible APIs
-            extra_headers = {}
-            if "openrouter.ai" in base_url:
-                extra_headers = {
-                    "HTTP-Referer": "pmpt-cli",
-                    "X-Title": "PMPT CLI"
-                }
-            
+            from openai import AsyncOpenAI
+            http_client = None
+            if compressor:
+                http_client = _compressing_http_client(compressor)
             self.openai_client = AsyncOpenAI(
                 api_key=self.config.api_key,
                 base_url=base_url,
-                default_headers=extra_headers
+                default_headers=extra_headers,
+                http_client=http_client
             )
     
-    async def enhance_prompt(self, prompt: str, system_prompt: str = None) -> str:
+    async def close(self):
+        """Close pooled connections"""
+        if self.http:
+            await self.http.close()
+        for client in (self.openai_client, self.anthropic_client):
+            if client:
+                await client.close()
+    
+    async def enhance_prompt(self, prompt: str, system_prompt: str = None, max_tokens: int = None,
+                             model: str = None) -> str:
         """Enhance the given prompt"""
         if system_prompt is None:
             system_prompt = "You are a prompt enhancement assistant. Take the user's prompt and improve it to be clearer and more effective. Return ONLY the enhanced prompt with no additional text, explanations, or commentary."
 
-        if self.anthropic_client:
-            return await self._call_anthropic(system_prompt, prompt)
+        self._start_usage(max_tokens, model)
+        messages = [{"role": "user", "content": prompt}]
+        if self.is_anthropic:
+            return await self._call_anthropic(system_prompt, messages, max_tokens)
         else:
-            return await self._call_openai_compatible(system_prompt, prompt)
+            return await self._call_openai_compatible(system_prompt, messages, max_tokens)
     
-    async def enhance_prompt_stream(self, prompt: str, system_prompt: str = None):
-        """Enhance the given prompt with streaming response"""
+    async def enhance_prompt_stream(self, prompt: str, system_prompt: str = None, max_tokens: int = None,
+                                    model: str = None):
+        """Enhance the given prompt with streaming response
+        
+        If the connection drops mid-response, the request is resumed from the
+        text received so far and the continuation is stitched onto it.
+        """
         if system_prompt is None:
             system_prompt = "You are a prompt enhancement assistant. Take the user's prompt and improve it to be clearer and more effective. Return ONLY the enhanced prompt with no additional text, explanations, or commentary."
 
-        if self.anthropic_client:
-            async for chunk in self._call_anthropic_stream(system_prompt, prompt):
+        async for chunk in self.stream_conversation([{"role": "user", "content": prompt}], system_prompt, max_tokens, model):
+            yield chunk
+    
+    async def stream_conversation(self, messages: list, system_prompt: str, max_tokens: int = None,
+                                  model: str = None):
+        """Stream the next assistant turn of a conversation
+        
+        An identical request already in flight is joined instead of being
+        sent again; only the request that went upstream reports token usage.
+        """
+        model = model or self.config.get_model()
+        key = request_key(self.config.get_base_url(), model, system_prompt, messages, max_tokens)
+        flight, leader = (flights if self.coalesce else SingleFlight()).join(
+            key, lambda flight: self._stream_upstream(flight, messages, system_prompt, max_tokens, model)
+        )
+        async for chunk in flight.subscribe():
+            yield chunk
+        
+        usage = flight.metadata.get('usage', {})
+        if not leader:
+            usage = dict(usage, input_tokens=0, output_tokens=0, cached_tokens=0, coalesced=True)
+        _request_usage.set((self, usage))
+    
+    async def _stream_upstream(self, flight, messages: list, system_prompt: str, max_tokens: int, model: str):
+        """Stream from the provider, resuming dropped streams"""
+        self._start_usage(max_tokens, model)
+        flight.metadata['usage'] = self.last_usage
+        received = ""
+        resumes = 0
+        while True:
+            try:
+                if received:
+                    # The continuation only gets what is left of the budget
+                    remaining = max_tokens - len(received) // CHARS_PER_TOKEN if max_tokens else None
+                    if remaining is not None and remaining <= 0:
+                        self.last_usage['truncated'] = True
+                        return
+                    continuation = self._stream_continuation(system_prompt, messages, received, remaining)
+                else:
+                    continuation = self._stream_messages(system_prompt, messages, max_tokens)
+                async for chunk in continuation:
+                    received += chunk
+                    yield chunk
+                return
+            except Exception as e:
+                if resumes >= MAX_STREAM_RESUMES or not is_retryable(e):
+                    raise self._api_error(e)
+                resumes += 1
+                self.last_usage['resumes'] = resumes
+                await asyncio.sleep(RESUME_BACKOFF * resumes)
+    
+    def _api_error(self, error: Exception) -> Exception:
+        """Wrap a provider error for display"""
+        if self.is_anthropic:
+            return Exception(f"Anthropic API call failed: {str(error)}")
+        return Exception(f"API call failed: {str(error)}")
+    
+    def _stream_messages(self, system_prompt: str, messages: list, max_tokens: int = None):
+        """Stream a response to a conversation from the configured provider"""
+        if self.is_anthropic:
+            return self._call_anthropic_stream(system_prompt, messages, max_tokens)
+        return self._call_openai_compatible_stream(system_prompt, messages, max_tokens)
+    
+    async def _stream_continuation(self, system_prompt: str, messages: list, received: str, max_tokens: int = None):
+        """Stream the rest of a response that was cut off after received"""
+        if self.is_anthropic:
+            # Prefill the assistant turn; Anthropic rejects trailing whitespace there
+            prefill = received.rstrip()
+            skip_whitespace = prefill != received
+            resumed = messages + [{"role": "assistant", "content": prefill}]
+            async for chunk in self._call_anthropic_stream(system_prompt, resumed, max_tokens):
+                if skip_whitespace:
+                    # Whitespace stripped from the prefill was already shown
+                    chunk = chunk.lstrip()
+                    if not chunk:
+                        continue
+                    skip_whitespace = False
                 yield chunk
-        else:
-            async for chunk in self._call_openai_compatible_stream(system_prompt, prompt):
+            return
+        
+        resumed = messages + [
+            {"role": "assistant", "content": received},
+            {"role": "user", "content": CONTINUE_INSTRUCTION},
+        ]
+        # Models often repeat the last words before continuing; hold back the
+        # start of the continuation until the overlap can be removed
+        pending = ""
+        overlap_checked = False
+        async for chunk in self._call_openai_compatible_stream(system_prompt, resumed, max_tokens):
+            if overlap_checked:
                 yield chunk
+                continue
+            pending += chunk
+            if len(pending) >= OVERLAP_WINDOW:
+                overlap_checked = True
+                yield _drop_overlap(received, pending)
+        if not overlap_checked and pending:
+            yield _drop_overlap(received, pending)
+    
+    def _start_usage(self, max_tokens: int = None, model: str = None):
+        """Reset usage and timing for a new request (the calls read the model from here)"""
+        usage = {
+            'model': model or self.config.get_model(),
+            'max_tokens': max_tokens,
+            'truncated': False,
+            'input_tokens': 0,
+            'output_tokens': 0,
+            'cached_tokens': 0,
+            'started': time.monotonic(),
+            'ttft': None,
+            'latency': None,
+            'resumes': 0,
+            'output_chars': 0,
+        }
+        self._latest_usage = usage
+        _request_usage.set((self, usage))
+    
+    def _mark_output(self, text: str):
+        """Remember time to first token and count streamed characters"""
+        if self.last_usage.get('ttft') is None:
+            self.last_usage['ttft'] = time.monotonic() - self.last_usage['started']
+        # Lets routing size responses from streams that report no usage
+        self.last_usage['output_chars'] += len(text)
+    
+    def _finish_usage(self):
+        """Record total request latency"""
+        self.last_usage['latency'] = time.monotonic() - self.last_usage['started']
+    
+    def _record_openai_usage(self, usage):
+        """Store token counts from an OpenAI-compatible usage object"""
+        self._finish_usage()
+        if not usage:
+            return
+        details = _field(usage, 'prompt_tokens_details')
+        # Added up so resumed streams report the total of all requests
+        self.last_usage['input_tokens'] += _field(usage, 'prompt_tokens') or 0
+        self.last_usage['output_tokens'] += _field(usage, 'completion_tokens') or 0
+        self.last_usage['cached_tokens'] += (_field(details, 'cached_tokens') or 0) if details else 0
+    
+    def _record_anthropic_usage(self, usage):
+        """Store token counts from an Anthropic usage object"""
+        self._finish_usage()
+        if not usage:
+            return
+        cached = _field(usage, 'cache_read_input_tokens') or 0
+        cache_written = _field(usage, 'cache_creation_input_tokens') or 0
+        # Anthropic reports cached and cache-writing tokens separately from input_tokens
+        self.last_usage['input_tokens'] += (_field(usage, 'input_tokens') or 0) + cached + cache_written
+        self.last_usage['output_tokens'] += _field(usage, 'output_tokens') or 0
+        self.last_usage['cached_tokens'] += cached
+    
+    def _openai_token_limit(self, max_tokens: int = None) -> dict:
+        """Output limit parameter for OpenAI-compatible requests"""
+        if not max_tokens:
+            return {}
+        # OpenAI itself deprecated max_tokens; compatible servers still expect it
+        if "api.openai.com" in self.config.get_base_url():
+            return {"max_completion_tokens": max_tokens}
+        return {"max_tokens": max_tokens}
+    
+    def _anthropic_prompt(self, system_prompt: str, messages: list) -> dict:
+        """System and messages, with cache breakpoints on the reusable prefix
+        
+        Writing the cache costs more than plain input, so the system prompt
+        and first user turn (which carries any file context) are only marked
+        once the user has replied to an answer (/refine): a conversation in
+        progress is likely to continue, and later turns read the prefix from
+        the cache. A resumed stream's assistant prefill does not count.
+        """
+        first = messages[0]
+        if not isinstance(first['content'], str) or len(system_prompt) + len(first['content']) < CACHE_MIN_CHARS:
+            return {"system": system_prompt, "messages": messages}
+        if not any(message['role'] == 'assistant' for message in messages[:-1]):
+            return {"system": system_prompt, "messages": messages}
+        
+        cached_first = {
+            "role": first['role'],
+            "content": [{"type": "text", "text": first['content'], "cache_control": {"type": "ephemeral"}}],
+        }
+        return {
+            "system": [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}],
+            "messages": [cached_first] + messages[1:],
+        }
+    
+    def _openai_cache_options(self, system_prompt: str, messages: list) -> dict:
+        """Route requests sharing a prefix to the same cache on OpenAI
+        
+        OpenAI caches repeated prefixes automatically; the key keeps a
+        conversation's requests on the same cache. Compatible servers may
+        reject unknown parameters, so it is only sent to OpenAI itself.
+        """
+        if "api.openai.com" not in self.config.get_base_url():
+            return {}
+        if len(system_prompt) + len(messages[0]['content']) < CACHE_MIN_CHARS:
+            return {}
+        prefix = f"{system_prompt}\0{messages[0]['content']}".encode('utf-8')
+        return {"extra_body": {"prompt_cache_key": "pmpt-" + hashlib.sha256(prefix).hexdigest()[:32]}}
+    
+    def _openai_params(self, system_prompt: str, messages: list, max_tokens: int = None, stream: bool = False) -> dict:
+        """Request parameters for an OpenAI-compatible chat completion"""
+        params = dict(
+            model=self.last_usage['model'],
+            messages=[{"role": "system", "content": system_prompt}] + messages,
+            temperature=0.7,
+            **self._openai_token_limit(max_tokens),
+            **self._openai_cache_options(system_prompt, messages)
+        )
+        if stream:
+            params['stream'] = True
+            if self.stream_usage:
+                params['stream_options'] = {"include_usage": True}
+        return params
     
-    async def _call_openai_compatible(self, system_prompt: str, prompt: str) -> str:
+    def _anthropic_params(self, system_prompt: str, messages: list, max_tokens: int = None) -> dict:
+        """Request parameters for an Anthropic message"""
+        return dict(
+            model=self.last_usage['model'],
+            max_tokens=max_tokens or DEFAULT_MAX_TOKENS,
+            **self._anthropic_prompt(system_prompt, messages)
+        )
+    
+    @staticmethod
+    def _json_payload(params: dict) -> dict:
+        """SDK parameters as a JSON request body (extra_body is merged in)"""
+        payload = dict(params)
+        payload.update(payload.pop('extra_body', {}))
+        return payload
+    
+    async def _call_openai_compatible(self, system_prompt: str, messages: list, max_tokens: int = None) -> str:
         """Call using OpenAI SDK for OpenAI-compatible APIs"""
+        params = self._openai_params(system_prompt, messages, max_tokens)
         try:
-            response = await self.openai_client.chat.completions.create(
-                model=self.config.get_model(),
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7
-            )
-            return response.choices[0].message.content.strip()
+            if self.http:
+                response = await self.http.post_json("/chat/completions", self._json_payload(params))
+            else:
+                response = await self.openai_client.chat.completions.create(**params)
+            choice = _field(response, 'choices')[0]
+            self._record_openai_usage(_field(response, 'usage'))
+            self.last_usage['truncated'] = _field(choice, 'finish_reason') == "length"
+            content = _field(_field(choice, 'message'), 'content') or ""
+            self.last_usage['output_chars'] = len(content)
+            return content.strip()
         except Exception as e:
-            raise Exception(f"API call failed: {str(e)}")
+            raise self._api_error(e)
     
-    async def _call_openai_compatible_stream(self, system_prompt: str, prompt: str):
+    async def _call_openai_compatible_stream(self, system_prompt: str, messages: list, max_tokens: int = None):
         """Call using OpenAI SDK for OpenAI-compatible APIs with streaming"""
+        params = self._openai_params(system_prompt, messages, max_tokens, stream=True)
         try:
-            response = await self.openai_client.chat.completions.create(
-                model=self.config.get_model(),
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                stream=True
-            )
-            async for chunk in response:
-                if chunk.choices[0].delta.content:
-                    yield chunk.choices[0].delta.content
+            chunks, close = await self._open_openai_stream(params)
         except Exception as e:
-            raise Exception(f"API call failed: {str(e)}")
+            if 'stream_options' not in params or getattr(e, 'status_code', None) not in REJECTED_PARAMETER_STATUS:
+                raise
+            # Usage in streams is an OpenAI extension that some compatible
+            # servers reject; only stop asking if the request works without it
+            del params['stream_options']
+            chunks, close = await self._open_openai_stream(params)
+            self.stream_usage = False
+        try:
+            async for chunk in chunks:
+                usage = _field(chunk, 'usage')
+                if usage:
+                    # Sent in a final chunk without choices
+                    self._record_openai_usage(usage)
+                choices = _field(chunk, 'choices')
+                if not choices:
+                    continue
+                if _field(choices[0], 'finish_reason') == "length":
+                    self.last_usage['truncated'] = True
+                content = _field(_field(choices[0], 'delta'), 'content')
+                if content:
+                    self._mark_output(content)
+                    yield content
+            # Streams without a usage chunk still have a latency
+            self._finish_usage()
+        finally:
+            # Close the HTTP stream right away when the consumer stops
+            # early (e.g. cancellation) so the provider stops generating
+            await close()
 
-    async def _call_anthropic(self, system_prompt: str, prompt: str) -> str:
+    async def _open_openai_stream(self, params: dict):
+        """Start a streamed chat completion; returns (chunks, close) once the server has accepted it"""
+        if not self.http:
+            response = await self.openai_client.chat.completions.create(**params)
+            return response, response.close
+        
+        response = self.http.stream("/chat/completions", self._json_payload(params))
+        # The request is sent, and an error status raised, on the first read
+        try:
+            first = await response.__anext__()
+        except StopAsyncIteration:
+            first = None
+        except BaseException:
+            await response.aclose()
+            raise
+        
+        async def chunks():
+            if first:
+                yield first[1]
+            async for _, data in response:
+                yield data
+        return chunks(), response.aclose
+    
+    async def _call_anthropic(self, system_prompt: str, messages: list, max_tokens: int = None) -> str:
         """Call Anthropic API using Anthropic SDK"""
+        params = self._anthropic_params(system_prompt, messages, max_tokens)
         try:
-            response = await self.anthropic_client.messages.create(
-                model=self.config.get_model(),
-                max_tokens=2000,
-                system=system_prompt,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            return response.content[0].text.strip()
+            if self.http:
+                response = await self.http.post_json("/v1/messages", params)
+            else:
+                response = await self.anthropic_client.messages.create(**params)
+            self._record_anthropic_usage(_field(response, 'usage'))
+            self.last_usage['truncated'] = _field(response, 'stop_reason') == "max_tokens"
+            content = _field(_field(response, 'content')[0], 'text')
+            self.last_usage['output_chars'] = len(content)
+            return content.strip()
         except Exception as e:
-            raise Exception(f"Anthropic API call failed: {str(e)}")
+            raise self._api_error(e)
     
-    async def _call_anthropic_stream(self, system_prompt: str, prompt: str):
+    async def _call_anthropic_stream(self, system_prompt: str, messages: list, max_tokens: int = None):
         """Call Anthropic API using Anthropic SDK with streaming"""
+        params = self._anthropic_params(system_prompt, messages, max_tokens)
+        if self.http:
+            async for chunk in self._call_anthropic_http_stream(params):
+                yield chunk
+            return
+        
+        async with self.anthropic_client.messages.stream(**params) as stream:
+            async for text in stream.text_stream:
+                self._mark_output(text)
+                yield text
+            # Usage and stop reason accumulated from message_start and message_delta events
+            snapshot = stream.current_message_snapshot
+            self._record_anthropic_usage(snapshot.usage)
+            self.last_usage['truncated'] = snapshot.stop_reason == "max_tokens"
+    
+    async def _call_anthropic_http_stream(self, params: dict):
+        """Anthropic streaming over the built-in HTTP backend"""
+        usage = {}
+        stop_reason = None
+        events = self.http.stream("/v1/messages", dict(params, stream=True))
         try:
-            async with self.anthropic_client.messages.stream(
-                model=self.config.get_model(),
-                max_tokens=2000,
-                system=system_prompt,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            ) as stream:
-                async for text in stream.text_stream:
-                    yield text
-        except Exception as e:
-            raise Exception(f"Anthropic API call failed: {str(e)}")
\ No newline at end of file
+            async for event, data in events:
+                if event == "content_block_delta":
+                    text = data['delta'].get('text')
+                    if text:
+                        self._mark_output(text)
+                        yield text
+                elif event == "message_start":
+                    usage.update(data['message'].get('usage') or {})
+                elif event == "message_delta":
+                    # Output tokens here are cumulative
+                    usage.update(data.get('usage') or {})
+                    stop_reason = data['delta'].get('stop_reason') or stop_reason
+        finally:
+            await events.aclose()
+        self._record_anthropic_usage(usage)
+        self.last_usage['truncated'] = stop_reason == "max_tokens"
@@ -0,0 +1,76 @@
+import os
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+
+# Match @reference tokens - @filename, @path/to/file and suffixed forms
+REFERENCE_PATTERN = re.compile(r'@([^\s@]+)')
+
+CONTEXT_MODES = ('full', 'min')
+
+# Extra context for symbol references (@file.py::Class.method:callers)
+SYMBOL_OPTIONS = ('callers', 'signatures')
+
+# Punctuation that commonly follows a reference in prose ("see @app.py, then")
+TRAILING_PUNCTUATION = '.,;:!?)]}\'"'
+
+
+@dataclass
+class FileReference:
+    """A file referenced from the prompt with @"""
+    token: str
+    path: str
+    mode: Optional[str] = None
+    symbol: Optional[str] = None
+    options: Tuple[str, ...] = ()
+
+    @property
+    def label(self) -> str:
+        """Short name used when reporting integrated context"""
+        if self.symbol:
+            return f"{self.path}::{self.symbol}"
+        return self.path
+
+
+def _split_reference(token: str):
+    """Split a token into path, symbol, mode and symbol options"""
+    mode = None
+    options = []
+    while True:
+        head, sep, suffix = token.rpartition(':')
+        if not sep or head.endswith(':'):
+            break
+        if suffix in CONTEXT_MODES and mode is None:
+            mode = suffix
+        elif suffix in SYMBOL_OPTIONS:
+            options.insert(0, suffix)
+        else:
+            break
+        token = head
+
+    path, sep, symbol = token.partition('::')
+    return path, symbol or None, mode, tuple(options)
+
+
+def parse_reference(token: str) -> Optional[FileReference]:
+    """Resolve a single @token to a file reference, if it names a file"""
+    stripped = token.rstrip(TRAILING_PUNCTUATION)
+    for candidate in dict.fromkeys([stripped, token]):
+        path, symbol, mode, options = _split_reference(candidate)
+        if path and os.path.isfile(path):
+            return FileReference(token=token, path=path, mode=mode, symbol=symbol, options=options)
+    return None
+
+
+def extract_file_references(prompt: str) -> List[FileReference]:
+    """Extract unique file references (@filepath[::symbol][:mode]) from prompt text"""
+    references = []
+    seen = set()
+    for token in REFERENCE_PATTERN.findall(prompt):
+        reference = parse_reference(token)
+        key = reference and (reference.label, reference.mode, reference.options)
+        if reference and key not in seen:
+            seen.add(key)
+            references.append(reference)
+    return references
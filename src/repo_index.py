@@ -0,0 +1,492 @@
+import hashlib
+import heapq
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from .context_reducer import LOCKFILES
+from .language_detector import GitignoreRules, LanguageDetector
+from .references import REFERENCE_PATTERN, TRAILING_PUNCTUATION
+from .symbol_index import SymbolIndex
+
+
+# Bump when the chunking or tokenization changes so stored indexes are rebuilt
+INDEX_VERSION = 2
+
+# Files indexed besides source code
+TEXT_EXTENSIONS = {'.md', '.rst', '.txt', '.toml', '.yaml', '.yml', '.cfg', '.ini'}
+TEXT_NAMES = {'dockerfile', 'makefile', 'readme'}
+SKIP_DIRS = LanguageDetector.SKIP_DIRS | {'.git'}
+
+MAX_FILE_BYTES = 512 * 1024
+MAX_FILES = 50000
+
+# Chunks close at the first paragraph break after TARGET lines and never exceed MAX
+TARGET_CHUNK_LINES = 30
+MAX_CHUNK_LINES = 80
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+TOP_K = 6
+MAX_CHUNKS_PER_FILE = 2
+
+# Terms in more than this share of chunks cannot tell them apart
+MAX_DOCUMENT_FREQUENCY = 0.5
+
+# The file tree is rescanned at most this often (seconds)
+REFRESH_INTERVAL = 2.0
+
+# Postings of files changed since the last merge are kept in their own
+# table; they are merged into the per-term rows once they (plus the postings
+# of removed chunks) exceed this share of the merged postings
+MERGE_FRACTION = 0.25
+MERGE_MIN_POSTINGS = 50000
+
+# Stored term frequencies are capped to fit two bytes; BM25 saturates long before
+MAX_FREQUENCY = 0xFFFF
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value) WITHOUT ROWID;
+CREATE TABLE files (path TEXT PRIMARY KEY, mtime INTEGER, size INTEGER) WITHOUT ROWID;
+CREATE TABLE chunks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, path TEXT, start_line INTEGER, end_line INTEGER, name TEXT,
+    length INTEGER, terms INTEGER
+);
+CREATE INDEX chunks_path ON chunks (path);
+CREATE TABLE postings (term TEXT PRIMARY KEY, chunks BLOB, frequencies BLOB) WITHOUT ROWID;
+CREATE TABLE recent (term TEXT, chunk INTEGER, frequency INTEGER, PRIMARY KEY (term, chunk)) WITHOUT ROWID;
+"""
+
+IDENTIFIER_PATTERN = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+WORD_PART_PATTERN = re.compile(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+')
+
+STOP_WORDS = {
+    'the', 'and', 'for', 'to', 'of', 'in', 'is', 'it', 'an', 'be', 'on', 'as', 'are', 'or', 'if',
+    'this', 'that', 'with', 'by', 'at', 'from', 'not', 'we', 'you', 'me', 'my', 'do', 'so', 'can',
+    'why', 'how', 'what', 'when', 'where', 'which', 'does', 'should', 'would', 'please', 'have', 'has',
+    'was', 'were', 'will', 'all', 'any', 'some', 'its', 'our', 'your', 'then', 'than', 'also', 'into',
+    'self', 'def', 'return', 'import', 'const', 'let', 'var', 'none', 'null', 'true', 'false',
+}
+
+_word_parts: Dict[str, List[str]] = {}
+
+
+def tokenize(text: str) -> List[str]:
+    """Index terms: identifiers lowercased, plus their snake_case and camelCase parts"""
+    terms = []
+    for identifier in IDENTIFIER_PATTERN.findall(text):
+        parts = _word_parts.get(identifier)
+        if parts is None:
+            candidates = [identifier.lower()] + [part.lower() for part in WORD_PART_PATTERN.findall(identifier)]
+            parts = [term for term in dict.fromkeys(candidates) if len(term) > 1 and term not in STOP_WORDS]
+            if len(_word_parts) < 200000:
+                _word_parts[identifier] = parts
+        terms.extend(parts)
+    return terms
+
+
+@dataclass
+class RepoReference:
+    """An @repo reference: retrieve context relevant to the prompt"""
+    token: str
+
+    @property
+    def label(self) -> str:
+        return "@repo"
+
+
+def extract_repo_references(prompt: str, skip_tokens=()) -> List[RepoReference]:
+    """The @repo reference in prompt text, if any"""
+    for token in REFERENCE_PATTERN.findall(prompt):
+        if token not in skip_tokens and token.rstrip(TRAILING_PUNCTUATION) == 'repo':
+            return [RepoReference(token)]
+    return []
+
+
+@dataclass
+class SearchResult:
+    """A chunk of a file that matched a query"""
+    path: str
+    start_line: int
+    end_line: int
+    name: str
+    score: float
+
+    @property
+    def label(self) -> str:
+        location = f"{self.path}:{self.start_line}-{self.end_line}"
+        return f"{location} ({self.name})" if self.name else location
+
+
+class RepoIndex:
+    """Persistent BM25 index of a repository's source and docs
+
+    Files are split into chunks at function and method boundaries (via
+    SymbolIndex) or at paragraph breaks. The index is an SQLite database
+    under ~/.pmpt-cli/repo-index, kept up to date incrementally: each
+    refresh stats the tree and rewrites only the rows of files whose mtime
+    or size changed. Postings are stored one row per term, so a search
+    reads only the rows of its query terms.
+    """
+
+    def __init__(self, root: str, cache_dir: str, symbol_index: SymbolIndex = None):
+        self.root = os.path.abspath(root)
+        key = hashlib.sha1(self.root.encode('utf-8')).hexdigest()[:16]
+        self.index_file = os.path.join(cache_dir, "repo-index", f"{key}.sqlite")
+        self.symbol_index = symbol_index or SymbolIndex()
+        # path -> (mtime_ns, size)
+        self._files: Dict[str, Tuple[int, int]] = {}
+        # chunk id -> length of every live chunk; postings of other ids are stale
+        self._lengths: Dict[int, int] = {}
+        self._total_length = 0
+        # Postings in the per-term rows, in the recent table, and of removed chunks
+        self._merged = self._recent = self._stale = 0
+        self._checkpoint = False
+        self._db: Optional[sqlite3.Connection] = None
+        self._refreshed: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_empty(self) -> bool:
+        with self._lock:
+            self._load()
+            return not self._files
+
+    def _load(self):
+        """Open the stored index once, starting over if it is stale or unreadable"""
+        if self._db is not None:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+            self._db = self._open(self.index_file)
+        except (OSError, sqlite3.DatabaseError):
+            try:
+                os.remove(self.index_file)
+                self._db = self._open(self.index_file)
+            except (OSError, sqlite3.DatabaseError):
+                # Unwritable cache directory: index in memory for this session
+                self._db = self._open(":memory:")
+
+        try:
+            # Written by versions that pickled the whole index on every change
+            os.remove(os.path.splitext(self.index_file)[0] + ".pickle")
+        except OSError:
+            pass
+
+        self._files = {path: (mtime, size) for path, mtime, size in self._db.execute("SELECT * FROM files")}
+        self._lengths = dict(self._db.execute("SELECT id, length FROM chunks"))
+        self._total_length = sum(self._lengths.values())
+        meta = dict(self._db.execute("SELECT key, value FROM meta"))
+        self._merged, self._recent, self._stale = meta['merged'], meta['recent'], meta['stale']
+
+    def _open(self, index_file: str) -> sqlite3.Connection:
+        # Calls are serialized by self._lock, whichever thread makes them
+        db = sqlite3.connect(index_file, check_same_thread=False)
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            tables = [name for name, in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+            meta = dict(db.execute("SELECT key, value FROM meta")) if 'meta' in tables else {}
+            if meta.get('version') != INDEX_VERSION or meta.get('root') != self.root:
+                with db:
+                    for table in tables:
+                        if not table.startswith('sqlite_'):
+                            db.execute(f"DROP TABLE {table}")
+                    for statement in SCHEMA.split(';'):
+                        if statement.strip():
+                            db.execute(statement)
+                    db.executemany("INSERT INTO meta VALUES (?, ?)", [
+                        ('version', INDEX_VERSION), ('root', self.root), ('merged', 0), ('recent', 0), ('stale', 0),
+                    ])
+        except sqlite3.DatabaseError:
+            db.close()
+            raise
+        return db
+
+    def refresh(self, force: bool = False) -> int:
+        """Re-index changed files and drop deleted ones; returns the number updated"""
+        with self._lock:
+            self._load()
+            if not force and self._refreshed and time.monotonic() - self._refreshed < REFRESH_INTERVAL:
+                return 0
+
+            current = self._scan()
+            updated = 0
+            # term -> (chunk ids, frequencies) of the chunks added by this refresh
+            added: Dict[str, Tuple[array, array]] = {}
+            try:
+                with self._db:
+                    for path in [path for path in self._files if path not in current]:
+                        self._remove(path)
+                        updated += 1
+                    for path, (mtime, size) in current.items():
+                        entry = self._files.get(path)
+                        if entry == (mtime, size):
+                            continue
+                        if entry:
+                            self._remove(path)
+                        self._add(path, mtime, size, added)
+                        updated += 1
+                    if updated:
+                        self._store(added)
+                if self._checkpoint:
+                    # A merge can leave a write-ahead log as large as the index
+                    self._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                    self._checkpoint = False
+            except sqlite3.DatabaseError:
+                # Rolled back (disk full, locked by another process): reload and retry next time
+                self._db.close()
+                self._db = None
+                self._refreshed = None
+                return 0
+            self._refreshed = time.monotonic()
+            return updated
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        """mtime and size of every indexable file, honouring .gitignore"""
+        found = {}
+        stack = [(self.root, "", GitignoreRules())]
+        while stack and len(found) < MAX_FILES:
+            directory, rel_dir, rules = stack.pop()
+            try:
+                with os.scandir(directory) as iterator:
+                    entries = list(iterator)
+            except OSError:
+                continue
+            if any(entry.name == '.gitignore' for entry in entries):
+                rules = rules.extend(directory, rel_dir)
+
+            for entry in entries:
+                name = entry.name
+                if name.startswith('.'):
+                    continue
+                rel_path = f"{rel_dir}/{name}" if rel_dir else name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if name not in SKIP_DIRS and not rules.ignored(rel_path, True):
+                            stack.append((entry.path, rel_path, rules))
+                        continue
+                    if not self._indexable(name) or rules.ignored(rel_path, False):
+                        continue
+                    stat = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                if stat.st_size <= MAX_FILE_BYTES:
+                    found[rel_path] = (stat.st_mtime_ns, stat.st_size)
+        return found
+
+    def _indexable(self, name: str) -> bool:
+        lower = name.lower()
+        if lower in LOCKFILES:
+            return False
+        extension = os.path.splitext(lower)[1]
+        return (extension in LanguageDetector.EXTENSION_LANGUAGES or extension in TEXT_EXTENSIONS
+                or lower in TEXT_NAMES)
+
+    def _add(self, path: str, mtime: int, size: int, added: Dict[str, Tuple[array, array]]):
+        """Chunk one file, collecting its postings in added"""
+        try:
+            with open(os.path.join(self.root, path), 'rb') as f:
+                data = f.read()
+        except OSError:
+            data = b""
+
+        # Binary files are remembered with no chunks so they are not re-read
+        if data and b'\0' not in data[:8000]:
+            text = data.decode('utf-8', errors='replace')
+            lines = text.splitlines()
+            for start, end, name in self._chunk(path, text, lines):
+                counts = Counter(tokenize(name + "\n" + "\n".join(lines[start - 1:end])))
+                if not counts:
+                    continue
+                length = sum(counts.values())
+                chunk_id = self._db.execute(
+                    "INSERT INTO chunks (path, start_line, end_line, name, length, terms) VALUES (?, ?, ?, ?, ?, ?)",
+                    (path, start, end, name, length, len(counts))
+                ).lastrowid
+                self._lengths[chunk_id] = length
+                self._total_length += length
+                for term, count in counts.items():
+                    postings = added.get(term)
+                    if postings is None:
+                        postings = added[term] = _new_postings()
+                    postings[0].append(chunk_id)
+                    postings[1].append(min(count, MAX_FREQUENCY))
+        self._db.execute("INSERT INTO files VALUES (?, ?, ?)", (path, mtime, size))
+        self._files[path] = (mtime, size)
+
+    def _remove(self, path: str):
+        """Drop a file's chunks; their postings are skipped until the next merge"""
+        for chunk_id, terms in self._db.execute("SELECT id, terms FROM chunks WHERE path = ?", (path,)).fetchall():
+            self._total_length -= self._lengths.pop(chunk_id)
+            self._stale += terms
+        self._db.execute("DELETE FROM chunks WHERE path = ?", (path,))
+        self._db.execute("DELETE FROM files WHERE path = ?", (path,))
+        del self._files[path]
+
+    def _store(self, added: Dict[str, Tuple[array, array]]):
+        """Write new postings to the recent table, or merge everything once it grows too large"""
+        count = sum(len(chunks) for chunks, _ in added.values())
+        if self._recent + self._stale + count <= max(MERGE_MIN_POSTINGS, self._merged * MERGE_FRACTION):
+            self._db.executemany("INSERT INTO recent VALUES (?, ?, ?)", (
+                (term, chunk_id, frequency)
+                for term, (chunks, frequencies) in added.items() for chunk_id, frequency in zip(chunks, frequencies)
+            ))
+            self._recent += count
+        else:
+            self._merge(added)
+        self._db.executemany("UPDATE meta SET value = ? WHERE key = ?", [
+            (self._merged, 'merged'), (self._recent, 'recent'), (self._stale, 'stale'),
+        ])
+
+    def _merge(self, added: Dict[str, Tuple[array, array]]):
+        """Rewrite the per-term rows with the recent and new postings of live chunks"""
+        merged = added
+        for term, chunks, frequencies in self._read_postings():
+            postings = merged.get(term)
+            if postings is None:
+                postings = merged[term] = _new_postings()
+            for chunk_id, frequency in zip(chunks, frequencies):
+                if chunk_id in self._lengths:
+                    postings[0].append(chunk_id)
+                    postings[1].append(frequency)
+        self._db.execute("DELETE FROM postings")
+        self._db.execute("DELETE FROM recent")
+        self._db.executemany("INSERT INTO postings VALUES (?, ?, ?)", (
+            (term, chunks.tobytes(), frequencies.tobytes()) for term, (chunks, frequencies) in merged.items() if chunks
+        ))
+        self._merged = sum(len(chunks) for chunks, _ in merged.values())
+        self._recent = self._stale = 0
+        self._checkpoint = True
+
+    def _read_postings(self, term: str = None):
+        """(term, chunk ids, frequencies) rows of one term or all terms, stale entries included"""
+        where, params = ("WHERE term = ?", (term,)) if term is not None else ("", ())
+        for term, chunk_bytes, frequency_bytes in self._db.execute(f"SELECT * FROM postings {where}", params):
+            chunks, frequencies = _new_postings()
+            chunks.frombytes(chunk_bytes)
+            frequencies.frombytes(frequency_bytes)
+            yield term, chunks, frequencies
+        recent: Dict[str, Tuple[array, array]] = {}
+        for term, chunk_id, frequency in self._db.execute(f"SELECT * FROM recent {where}", params):
+            postings = recent.get(term)
+            if postings is None:
+                postings = recent[term] = _new_postings()
+            postings[0].append(chunk_id)
+            postings[1].append(frequency)
+        for term, (chunks, frequencies) in recent.items():
+            yield term, chunks, frequencies
+
+    def _chunk(self, path: str, text: str, lines: List[str]) -> List[Tuple[int, int, str]]:
+        """(start line, end line, name) of each chunk: innermost definitions,
+        with the code and prose around them split at paragraph breaks"""
+        symbols = sorted(self.symbol_index.parse(path, text), key=lambda s: (s.start_line, -s.end_line))
+        # A definition is innermost when the next one starts after it ends
+        leaves = [
+            symbol for index, symbol in enumerate(symbols)
+            if index + 1 == len(symbols) or symbols[index + 1].start_line > symbol.end_line
+        ]
+
+        chunks = []
+        line = 1
+        for symbol in leaves:
+            if symbol.start_line < line:
+                continue
+            chunks += _paragraph_chunks(lines, line, symbol.start_line - 1)
+            end = min(symbol.end_line, len(lines))
+            for start in range(symbol.start_line, end + 1, MAX_CHUNK_LINES):
+                chunks.append((start, min(end, start + MAX_CHUNK_LINES - 1), symbol.name))
+            line = end + 1
+        chunks += _paragraph_chunks(lines, line, len(lines))
+        return chunks
+
+    def search(self, query: str, top_k: int = TOP_K) -> List[SearchResult]:
+        """Best matching chunks for a query, at most MAX_CHUNKS_PER_FILE per file"""
+        with self._lock:
+            self._load()
+            count = len(self._lengths)
+            if not count:
+                return []
+            average_length = self._total_length / count
+
+            scores: Dict[int, float] = {}
+            for term in set(tokenize(query)):
+                postings = [
+                    (chunk_id, tf)
+                    for _, chunks, frequencies in self._read_postings(term)
+                    for chunk_id, tf in zip(chunks, frequencies) if chunk_id in self._lengths
+                ]
+                if not postings or len(postings) > count * MAX_DOCUMENT_FREQUENCY:
+                    continue
+                frequency = len(postings)
+                idf = math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+                for chunk_id, tf in postings:
+                    norm = K1 * (1 - B + B * self._lengths[chunk_id] / average_length)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+
+            results = []
+            per_file: Counter = Counter()
+            for chunk_id, score in heapq.nlargest(top_k * 4, scores.items(), key=lambda item: item[1]):
+                path, start, end, name = self._db.execute(
+                    "SELECT path, start_line, end_line, name FROM chunks WHERE id = ?", (chunk_id,)
+                ).fetchone()
+                if per_file[path] >= MAX_CHUNKS_PER_FILE:
+                    continue
+                per_file[path] += 1
+                results.append(SearchResult(path, start, end, name, score))
+                if len(results) == top_k:
+                    break
+            return results
+
+    def render(self, results: List[SearchResult], max_chars: int) -> str:
+        """Source of search results, stopping before max_chars is exceeded"""
+        parts = []
+        length = 0
+        file_lines: Dict[str, List[str]] = {}
+        for result in results:
+            if result.path not in file_lines:
+                try:
+                    with open(os.path.join(self.root, result.path), 'r', encoding='utf-8', errors='replace') as f:
+                        file_lines[result.path] = f.read().splitlines()
+                except OSError:
+                    file_lines[result.path] = []
+            source = "\n".join(file_lines[result.path][result.start_line - 1:result.end_line])
+            part = f"# {result.label}\n{source}\n"
+            if parts and length + len(part) > max_chars:
+                break
+            parts.append(part)
+            length += len(part)
+        return "\n".join(parts)
+
+
+def _new_postings() -> Tuple[array, array]:
+    """Empty (chunk ids, frequencies) arrays"""
+    return array('i'), array('H')
+
+
+def _paragraph_chunks(lines: List[str], start: int, end: int) -> List[Tuple[int, int, str]]:
+    """Chunks of lines start..end (1-based, inclusive) split at blank lines"""
+    chunks = []
+    chunk_start = None
+    for number in range(start, end + 1):
+        blank = not lines[number - 1].strip()
+        if chunk_start is None:
+            if not blank:
+                chunk_start = number
+            continue
+        size = number - chunk_start + 1
+        if (blank and size > TARGET_CHUNK_LINES) or size == MAX_CHUNK_LINES:
+            chunks.append((chunk_start, number if not blank else number - 1, ""))
+            chunk_start = None
+    if chunk_start is not None:
+        chunks.append((chunk_start, end, ""))
+    return chunks
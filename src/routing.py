@@ -0,0 +1,148 @@
+import os
+import statistics
+from typing import Dict, List, Optional
+
+from .config import Config, CHARS_PER_TOKEN
+from .usage import UsageTracker
+
+
+# Requests a model needs in the usage log before its speed is trusted
+MIN_SAMPLES = 3
+
+# Models are explored at most this many times for timings; requests that
+# fail or return too little to time count too, so a model that never yields
+# samples stops taking traffic (until its requests age out of STATS_DAYS)
+MAX_EXPLORATION_REQUESTS = 10
+
+# Responses shorter than this are too short to measure throughput
+MIN_SAMPLE_TOKENS = 10
+
+# Only recent requests reflect current provider performance
+STATS_DAYS = 14
+
+
+class ModelRouter:
+    """Chooses the model for a request from the style and input size
+
+    Rules in config.routing are checked in order; each may set "style"
+    (a name or list of names), "min_chars" and "max_chars", and names the
+    "model" to use. If no rule matches and config.adaptive_routing lists
+    models, the cheapest model expected to finish within the target latency
+    is chosen, based on TTFT and throughput recorded in the usage log.
+    Otherwise the configured model is used.
+    """
+
+    def __init__(self, config: Config, usage_tracker: UsageTracker):
+        self.config = config
+        self.usage_tracker = usage_tracker
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._stats_mtime: Optional[float] = None
+
+    def choose(self, style: str, input_chars: int) -> str:
+        """Model for a request"""
+        for rule in self.config.routing:
+            if self._matches(rule, style, input_chars):
+                return rule['model']
+
+        adaptive = self.config.adaptive_routing
+        if adaptive and adaptive.get('models'):
+            return self._choose_adaptive(adaptive, style, input_chars)
+        return self.config.get_model()
+
+    def _matches(self, rule: Dict, style: str, input_chars: int) -> bool:
+        """Whether a routing rule applies"""
+        if not rule.get('model'):
+            return False
+        styles = rule.get('style')
+        if isinstance(styles, str):
+            styles = [styles]
+        if styles and style not in styles:
+            return False
+        if input_chars < rule.get('min_chars', 0):
+            return False
+        max_chars = rule.get('max_chars')
+        return max_chars is None or input_chars < max_chars
+
+    def _choose_adaptive(self, adaptive: Dict, style: str, input_chars: int) -> str:
+        """Cheapest allowed model expected to meet the target latency"""
+        models: List[str] = adaptive['models']
+        target = adaptive.get('target_latency', 10.0)
+        stats = self.model_stats()
+
+        # Collect timings for models that have not been measured yet
+        for model in models:
+            model_stats = stats.get(model, {})
+            if (model_stats.get('samples', 0) < MIN_SAMPLES
+                    and model_stats.get('requests', 0) < MAX_EXPLORATION_REQUESTS):
+                return model
+
+        measured = [model for model in models if stats.get(model, {}).get('samples', 0) >= MIN_SAMPLES]
+        if not measured:
+            return models[0]
+
+        # The typical response, not the output budget (a ceiling with a large floor)
+        output_tokens = self.config.estimate_output_tokens(style, input_chars)
+        input_tokens = max(1, input_chars // CHARS_PER_TOKEN)
+        estimates = []
+        for order, model in enumerate(models):
+            if model not in measured:
+                continue
+            latency = stats[model]['ttft'] + output_tokens / stats[model]['tokens_per_second']
+            cost = self._estimate_cost(model, input_tokens, output_tokens)
+            # Unpriced models keep their listed order, after priced ones
+            estimates.append((latency, float('inf') if cost is None else cost, order, model))
+
+        fast_enough = [estimate for estimate in estimates if estimate[0] <= target]
+        if fast_enough:
+            return min(fast_enough, key=lambda estimate: (estimate[1], estimate[2]))[3]
+        return min(estimates)[3]
+
+    def _estimate_cost(self, model: str, input_tokens: int, output_tokens: int) -> Optional[float]:
+        """Expected request cost from configured prices"""
+        price = self.config.model_prices.get(model)
+        if not price:
+            return None
+        return (input_tokens * price.get('input', 0) + output_tokens * price.get('output', 0)) / 1_000_000
+
+    def model_stats(self) -> Dict[str, Dict[str, float]]:
+        """Median TTFT and output throughput per model, reloaded when the log changes
+
+        Requests without a TTFT (non-streaming calls) count their whole
+        latency as generation time, which understates throughput slightly.
+        Streams that reported no usage are sized by their characters.
+        """
+        try:
+            mtime = os.path.getmtime(self.usage_tracker.usage_file)
+        except OSError:
+            return {}
+        if mtime == self._stats_mtime:
+            return self._stats
+
+        timings: Dict[str, Dict[str, list]] = {}
+        for entry in self.usage_tracker.load(STATS_DAYS):
+            if not entry.get('model'):
+                continue
+            model_timings = timings.setdefault(entry['model'], {'requests': 0, 'ttft': [], 'tps': []})
+            model_timings['requests'] += 1
+            ttft = entry.get('ttft')
+            latency = entry.get('latency')
+            output_tokens = entry.get('output_tokens') or (entry.get('output_chars') or 0) // CHARS_PER_TOKEN
+            if not latency or output_tokens < MIN_SAMPLE_TOKENS:
+                continue
+            if ttft is None:
+                model_timings['tps'].append(output_tokens / latency)
+            elif latency > ttft:
+                model_timings['ttft'].append(ttft)
+                model_timings['tps'].append(output_tokens / (latency - ttft))
+
+        self._stats = {
+            model: {
+                'requests': values['requests'],
+                'samples': len(values['tps']),
+                'ttft': statistics.median(values['ttft']) if values['ttft'] else 0.0,
+                'tokens_per_second': statistics.median(values['tps']) if values['tps'] else 0.0,
+            }
+            for model, values in timings.items()
+        }
+        self._stats_mtime = mtime
+        return self._stats
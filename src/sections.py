@@ -0,0 +1,100 @@
+import re
+from dataclasses import dataclass
+from typing import List
+
+
+HEADING_PATTERN = re.compile(r'^(#{1,6})\s+(.+?)\s*#*\s*$')
+FENCE_PATTERN = re.compile(r'^\s*(```|~~~)')
+
+
+@dataclass
+class Section:
+    """A contiguous part of a long prompt"""
+    heading: str
+    text: str
+
+
+def _blocks(text: str) -> List[Section]:
+    """Split at markdown headings, or at blank lines when there are none
+
+    Code fences are never split.
+    """
+    lines = text.split('\n')
+    has_headings = False
+    in_fence = False
+    for line in lines:
+        if FENCE_PATTERN.match(line):
+            in_fence = not in_fence
+        elif not in_fence and HEADING_PATTERN.match(line):
+            has_headings = True
+            break
+
+    blocks = []
+    current: List[str] = []
+    heading = ""
+    in_fence = False
+    for line in lines:
+        if FENCE_PATTERN.match(line):
+            in_fence = not in_fence
+        boundary = False
+        if not in_fence:
+            match = HEADING_PATTERN.match(line)
+            if has_headings and match:
+                boundary = True
+            elif not has_headings and not line.strip() and current and current[-1].strip():
+                boundary = True
+        if boundary and any(part.strip() for part in current):
+            blocks.append(Section(heading, '\n'.join(current)))
+            current = []
+            heading = ""
+        if has_headings and not in_fence:
+            match = HEADING_PATTERN.match(line)
+            if match:
+                heading = match.group(2)
+        current.append(line)
+
+    if any(part.strip() for part in current):
+        blocks.append(Section(heading, '\n'.join(current)))
+    return blocks
+
+
+def split_sections(text: str, target_chars: int = 3000, max_sections: int = 8) -> List[Section]:
+    """Split a long prompt into roughly even sections
+
+    Adjacent blocks are merged while a section stays within target_chars;
+    the target grows for very long prompts to keep the count near
+    max_sections.
+    """
+    blocks = _blocks(text.strip('\n'))
+    if not blocks:
+        return []
+
+    target = max(target_chars, len(text) // max(1, max_sections) + 1)
+    sections: List[Section] = []
+    for block in blocks:
+        if sections and len(sections[-1].text) + len(block.text) <= target:
+            last = sections[-1]
+            heading = " / ".join(part for part in (last.heading, block.heading) if part)
+            sections[-1] = Section(heading, f"{last.text}\n{block.text}")
+        else:
+            sections.append(block)
+
+    # A short trailing section reads better attached to the one before it
+    if len(sections) > 1 and len(sections[-1].text) < target // 4:
+        tail = sections.pop()
+        last = sections[-1]
+        sections[-1] = Section(last.heading, f"{last.text}\n{tail.text}")
+    return sections
+
+
+def build_outline(sections: List[Section]) -> str:
+    """Title and outline shared with every section request"""
+    first_line = next((line.strip('# ').strip() for line in sections[0].text.split('\n') if line.strip()), "")
+    lines = [f"Title: {first_line[:120]}", "Outline:"]
+    for index, section in enumerate(sections, 1):
+        label = section.heading
+        if not label:
+            label = next((line.strip() for line in section.text.split('\n') if line.strip()), "")
+            label = label[:80] + ("..." if len(label) > 80 else "")
+        lines.append(f"{index}. {label}")
+    return "\n".join(lines)
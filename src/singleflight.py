@@ -0,0 +1,105 @@
+import asyncio
+import hashlib
+import json
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+
+def request_key(*parts: Any) -> str:
+    """Stable key for a request, built from everything that affects its output"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class Flight:
+    """One upstream stream shared by every subscriber with the same key"""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        # Filled in by the producer, e.g. token usage of the upstream request
+        self.metadata: Dict[str, Any] = {}
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def _notify(self):
+        """Wake subscribers waiting for new chunks"""
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def _produce(self, source: AsyncIterator[str]):
+        """Read the upstream stream into the shared chunk list"""
+        try:
+            async for chunk in source:
+                self.chunks.append(chunk)
+                self._notify()
+        except asyncio.CancelledError:
+            self.error = asyncio.CancelledError()
+            raise
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._notify()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        """All chunks so far, then new ones as they arrive"""
+        self.subscribers += 1
+        index = 0
+        try:
+            while True:
+                changed = self._changed
+                while index < len(self.chunks):
+                    yield self.chunks[index]
+                    index += 1
+                if self.done:
+                    if self.error:
+                        raise self.error
+                    return
+                await changed.wait()
+        finally:
+            self.subscribers -= 1
+            # Nobody is listening anymore - stop paying for the generation
+            if self.subscribers == 0 and self.task and not self.task.done():
+                self.task.cancel()
+                # Let the upstream request close its connection before returning
+                await asyncio.gather(self.task, return_exceptions=True)
+
+
+class SingleFlight:
+    """Coalesces identical concurrent streaming requests
+
+    The first request for a key starts the upstream stream in its own task;
+    requests with the same key that arrive while it runs subscribe to it and
+    receive the same chunks, including the ones already sent. The upstream
+    request is cancelled once every subscriber has stopped listening.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, Flight] = {}
+
+    def join(self, key: str, factory: Callable[[Flight], AsyncIterator[str]]) -> Tuple[Flight, bool]:
+        """Flight for key and whether this call started it"""
+        flight = self._flights.get(key)
+        if flight is not None and not flight.done:
+            return flight, False
+
+        flight = Flight(key)
+        self._flights[key] = flight
+        flight.task = asyncio.ensure_future(flight._produce(factory(flight)))
+        flight.task.add_done_callback(lambda _: self._finished(flight))
+        return flight, True
+
+    def _finished(self, flight: Flight):
+        """Forget a completed flight so later requests go upstream again"""
+        if self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+
+# Shared by every client in the process
+flights = SingleFlight()
@@ -0,0 +1,177 @@
+import asyncio
+import functools
+from typing import Optional
+
+from .config import CHARS_PER_TOKEN
+from .singleflight import Flight, SingleFlight, request_key
+
+
+# Seconds without typing before the buffer is enhanced in the background
+SPECULATION_DEBOUNCE = 0.8
+
+# Shorter buffers are usually still being typed
+MIN_SPECULATION_CHARS = 12
+
+
+class Speculation:
+    """A background enhancement of the prompt being typed"""
+
+    def __init__(self, text: str, style: str, key: str, input_chars: int, context_chars: int, model: str):
+        self.text = text
+        self.style = style
+        self.key = key
+        self.input_chars = input_chars
+        self.context_chars = context_chars
+        self.model = model
+        self.flight: Optional[Flight] = None
+        self.usage: Optional[dict] = None
+        self.received = 0
+        # None until the prompt is submitted (True) or the text changes (False)
+        self.used: Optional[bool] = None
+        self.settled = False
+
+    def stream(self):
+        """Chunks produced so far, then the rest as they arrive"""
+        return self.flight.subscribe()
+
+
+class SpeculativeEnhancer:
+    """Starts enhancing the prompt buffer while the user is still typing
+
+    After a pause in typing, the buffer goes through the same context,
+    system prompt and routing steps as a submitted prompt and is streamed
+    in the background. Editing the text cancels it; submitting the same
+    text picks up the running or finished stream instead of starting a new
+    request. Tokens spent on speculation are capped per session.
+    """
+
+    def __init__(self, app, token_budget: int, debounce: float = SPECULATION_DEBOUNCE):
+        self.app = app
+        self.token_budget = token_budget
+        self.debounce = debounce
+        self.spent_tokens = 0
+        self._timer: Optional[asyncio.Task] = None
+        self._current: Optional[Speculation] = None
+        self._flights = SingleFlight()
+
+    @property
+    def exhausted(self) -> bool:
+        return self.spent_tokens >= self.token_budget
+
+    def attach(self, buffer):
+        """Watch a prompt_toolkit buffer for edits"""
+        buffer.on_text_changed += self._on_text_changed
+
+    def _on_text_changed(self, buffer):
+        text = buffer.text.strip()
+        self._cancel_timer()
+        if self._current and self._current.text != text:
+            self._discard()
+        if self._current is None and self._eligible(text):
+            self._timer = asyncio.ensure_future(self._after_pause(text, buffer))
+
+    def _eligible(self, text: str) -> bool:
+        config = self.app.config
+        if len(text) < MIN_SPECULATION_CHARS or text.startswith('/') or self.exhausted:
+            return False
+        # Long prompts are split into sections on submit, not sent as one request
+        if config.long_prompt_chars and len(text) >= config.long_prompt_chars:
+            return False
+        return self.app.config_manager.is_configured(config)
+
+    async def _after_pause(self, text: str, buffer):
+        # Stays cancellable (as self._timer) until the request has started
+        await asyncio.sleep(self.debounce)
+        app = self.app
+        style = app.config.current_style
+        if style == "gentle" and app.config.local_gentle and app.local_engine.enhance(text) is not None:
+            return
+
+        # The same steps as a submitted prompt, so the request keys match
+        try:
+            integrated_prompt, _ = await app._run_blocking(app._integrate_file_context, text)
+            system_prompt = await app._build_system_prompt(style, integrated_prompt != text)
+            max_tokens = app.config.get_output_budget(style, len(text))
+            model = await app._run_blocking(app.model_router.choose, style, len(integrated_prompt))
+        except Exception:
+            return
+        if buffer.text.strip() != text or self._current is not None:
+            return
+        if self.spent_tokens + len(integrated_prompt) // CHARS_PER_TOKEN > self.token_budget:
+            return
+
+        key = request_key(integrated_prompt, system_prompt, max_tokens, model)
+        speculation = Speculation(
+            text, style, key, len(integrated_prompt), len(integrated_prompt) - len(text), model
+        )
+        speculation.flight, _ = self._flights.join(
+            key, lambda flight: self._generate(speculation, integrated_prompt, system_prompt, max_tokens, model)
+        )
+        self._current = speculation
+
+    async def _generate(self, speculation: Speculation, prompt: str, system_prompt: str, max_tokens: int, model: str):
+        client = self.app._get_api_client()
+        completed = False
+        try:
+            async for chunk in client.enhance_prompt_stream(prompt, system_prompt, max_tokens, model):
+                speculation.received += len(chunk)
+                yield chunk
+            completed = True
+        finally:
+            if completed:
+                speculation.usage = dict(client.last_usage)
+            else:
+                # Cancelled or failed: the provider reports no usage, so estimate it
+                speculation.usage = {
+                    'model': model,
+                    'input_tokens': speculation.input_chars // CHARS_PER_TOKEN,
+                    'output_tokens': speculation.received // CHARS_PER_TOKEN,
+                }
+            self.spent_tokens += speculation.usage.get('input_tokens', 0) + speculation.usage.get('output_tokens', 0)
+            self._settle(speculation)
+
+    def take(self, prompt: str, system_prompt: str, max_tokens: int, model: str) -> Optional[Speculation]:
+        """The speculation for a submitted request, if one matches"""
+        self._cancel_timer()
+        speculation = self._current
+        if speculation is None:
+            return None
+        self._current = None
+        if speculation.key != request_key(prompt, system_prompt, max_tokens, model):
+            self._discard(speculation)
+            return None
+        speculation.used = True
+        self._settle(speculation)
+        return speculation
+
+    def _discard(self, speculation: Speculation = None):
+        """Cancel a speculation whose text no longer matches the buffer"""
+        speculation = speculation or self._current
+        if speculation is self._current:
+            self._current = None
+        speculation.used = False
+        if speculation.flight.task and not speculation.flight.task.done():
+            speculation.flight.task.cancel()
+        self._settle(speculation)
+
+    def _settle(self, speculation: Speculation):
+        """Record usage once the request has ended and its fate is known"""
+        if speculation.settled or speculation.used is None or speculation.usage is None:
+            return
+        speculation.settled = True
+        usage = speculation.usage
+        if not speculation.used:
+            usage = dict(usage, speculative=True)
+        record = functools.partial(self.app.usage_tracker.record, usage, speculation.style, speculation.context_chars)
+        asyncio.get_running_loop().run_in_executor(None, record)
+
+    def _cancel_timer(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+    def close(self):
+        """Cancel pending and running speculation"""
+        self._cancel_timer()
+        if self._current:
+            self._discard()
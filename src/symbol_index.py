@@ -0,0 +1,289 @@
+import ast
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from .language_detector import LanguageDetector
+
+
+BRACE_LANGUAGES = {
+    'javascript', 'typescript', 'java', 'cpp', 'c', 'csharp', 'php', 'go',
+    'rust', 'swift', 'kotlin', 'scala', 'dart',
+}
+
+# Container definitions (class Foo, struct Foo, impl Foo, type Foo struct ...)
+CONTAINER_PATTERNS = [
+    re.compile(
+        r'^\s*(?:(?:export|default|public|private|protected|internal|abstract|final|static|sealed|partial|data|pub(?:\([\w:]+\))?)\s+)*'
+        r'(?:class|struct|interface|enum|trait|impl(?:<[^>]*>)?|object|namespace)\s+(?:[\w:<>, ]+\s+for\s+)?(?P<name>[A-Za-z_]\w*)'
+    ),
+    re.compile(r'^\s*type\s+(?P<name>[A-Za-z_]\w*)\s+(?:struct|interface)\b'),
+]
+
+# Function definitions in the common brace languages
+FUNCTION_PATTERNS = [
+    # Go: func Name( / func (r *Type) Name(
+    re.compile(r'^\s*func\s+(?:\(\s*\w*\s*\*?\s*(?P<owner>\w+)[^)]*\)\s*)?(?P<name>[A-Za-z_]\w*)\s*[(<\[]'),
+    # Rust / Swift / Kotlin / Scala: fn name / func name / fun name / def name
+    re.compile(r'^\s*(?:(?:pub(?:\([\w:]+\))?|async|unsafe|const|extern|override|private|public|internal|open|suspend|inline|static)\s+)*(?:fn|func|fun|def)\s+(?P<name>[A-Za-z_]\w*)'),
+    # JavaScript / TypeScript: function name( / const name = (...) =>
+    re.compile(r'^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*(?P<name>[A-Za-z_$][\w$]*)\s*[(<]'),
+    re.compile(r'^\s*(?:export\s+)?(?:const|let|var)\s+(?P<name>[A-Za-z_$][\w$]*)\s*(?::[^=]+)?=\s*(?:async\s+)?(?:\([^)]*\)|[A-Za-z_$][\w$]*)\s*(?::[^=]+)?=>'),
+]
+
+# Methods and C-family functions: [modifiers] [type] name(args) {  - only
+# accepted when the body opens on the same or the next line
+C_FUNCTION_PATTERN = re.compile(
+    r'^\s*(?:[\w$<>\[\],.*&?:]+\s+)*?(?P<name>[A-Za-z_$~][\w$]*)\s*\([^;{}]*\)\s*(?:const\s*)?'
+    r'(?:->\s*[^{]+|:\s*[^{=]+|throws\s+[\w., ]+)?\s*(?:\{.*)?$'
+)
+
+KEYWORDS = {'if', 'for', 'while', 'switch', 'catch', 'return', 'else', 'do', 'try', 'new', 'sizeof', 'when', 'match'}
+
+
+@dataclass
+class Symbol:
+    """A definition found in a source file"""
+    name: str
+    kind: str
+    start_line: int
+    end_line: int
+    signature: str
+
+    @property
+    def short_name(self) -> str:
+        return self.name.rsplit('.', 1)[-1]
+
+
+class SymbolIndex:
+    """Per-file symbol index, cached by modification time
+
+    Python files are parsed with ast; brace languages use a line-based
+    scanner that matches definitions and finds their end by brace depth.
+    """
+
+    def __init__(self):
+        self._cache: Dict[str, Tuple[float, List[Symbol]]] = {}
+
+    def symbols(self, path: str) -> List[Symbol]:
+        """All symbols defined in a file"""
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return []
+
+        cached = self._cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        try:
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                content = f.read()
+        except OSError:
+            return []
+
+        symbols = self.parse(path, content)
+        self._cache[path] = (mtime, symbols)
+        return symbols
+
+    def find(self, path: str, name: str) -> Optional[Symbol]:
+        """Find a symbol by qualified name, or by an unambiguous trailing part"""
+        symbols = self.symbols(path)
+        for symbol in symbols:
+            if symbol.name == name:
+                return symbol
+        matches = [s for s in symbols if s.name.endswith('.' + name) or s.short_name == name]
+        return matches[0] if len(matches) == 1 else None
+
+    def complete(self, path: str, partial: str) -> List[str]:
+        """Symbol names in a file starting with (or containing) partial"""
+        names = [symbol.name for symbol in self.symbols(path)]
+        lower = partial.lower()
+        prefixed = [name for name in names if name.lower().startswith(lower)]
+        contained = [name for name in names if lower in name.lower() and name not in prefixed]
+        return prefixed + contained
+
+    def extract(self, path: str, content: str, name: str,
+                callers: bool = False, signatures: bool = False) -> Optional[str]:
+        """Source of a symbol, optionally with its callers and the file's signatures"""
+        symbol = self.find(path, name)
+        if symbol is None:
+            return None
+
+        lines = content.splitlines()
+        parts = ["\n".join(lines[symbol.start_line - 1:symbol.end_line])]
+
+        if callers:
+            call = re.compile(r'\b' + re.escape(symbol.short_name) + r'\s*\(')
+            found = [
+                f"{number}: {line.strip()}"
+                for number, line in enumerate(lines, 1)
+                if call.search(line) and not symbol.start_line <= number <= symbol.end_line
+            ]
+            if found:
+                parts.append("Callers in this file:\n" + "\n".join(found[:20]))
+
+        if signatures:
+            others = [s.signature for s in self.symbols(path) if s is not symbol]
+            if others:
+                parts.append("Other definitions in this file:\n" + "\n".join(others))
+
+        return "\n\n".join(parts)
+
+    def parse(self, path: str, content: str) -> List[Symbol]:
+        """Parse symbols according to the file's language (uncached)"""
+        language = LanguageDetector.EXTENSION_LANGUAGES.get(os.path.splitext(path)[1].lower())
+        if language == 'python':
+            return self._parse_python(content)
+        if language in BRACE_LANGUAGES:
+            return self._parse_braces(content)
+        return []
+
+    def _parse_python(self, content: str) -> List[Symbol]:
+        """Collect classes and functions with ast"""
+        try:
+            tree = ast.parse(content)
+        except (SyntaxError, ValueError):
+            return []
+
+        lines = content.splitlines()
+        symbols = []
+
+        def visit(node, prefix: str, in_class: bool):
+            for child in ast.iter_child_nodes(node):
+                if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                    name = f"{prefix}{child.name}"
+                    if isinstance(child, ast.ClassDef):
+                        kind = "class"
+                    else:
+                        kind = "method" if in_class else "function"
+                    start = min([child.lineno] + [d.lineno for d in child.decorator_list])
+                    end = getattr(child, 'end_lineno', None) or self._python_block_end(lines, child.lineno)
+                    signature = lines[child.lineno - 1].strip()
+                    symbols.append(Symbol(name, kind, start, end, signature))
+                    visit(child, name + ".", isinstance(child, ast.ClassDef))
+
+        visit(tree, "", False)
+        return symbols
+
+    def _python_block_end(self, lines: List[str], start_line: int) -> int:
+        """Last line of an indented block (for Pythons without end_lineno)"""
+        indent = len(lines[start_line - 1]) - len(lines[start_line - 1].lstrip())
+        end = start_line
+        for number in range(start_line, len(lines)):
+            line = lines[number]
+            if line.strip() and len(line) - len(line.lstrip()) <= indent:
+                break
+            if line.strip():
+                end = number + 1
+        return end
+
+    def _parse_braces(self, content: str) -> List[Symbol]:
+        """Collect definitions in brace-delimited languages"""
+        lines = content.splitlines()
+        depths = self._line_depths(lines)
+        symbols = []
+
+        for index, line in enumerate(lines):
+            definition = self._match_definition(lines, index)
+            if not definition:
+                continue
+            name, kind = definition
+
+            end = self._block_end(lines, depths, index)
+            if end is None:
+                continue
+            symbols.append(Symbol(name, kind, index + 1, end + 1, line.strip()))
+
+        # Qualify nested definitions with their enclosing containers
+        for symbol in symbols:
+            parents = [
+                other for other in symbols
+                if other.kind == "class" and other is not symbol
+                and other.start_line < symbol.start_line and symbol.end_line <= other.end_line
+            ]
+            if parents:
+                parents.sort(key=lambda other: other.start_line)
+                symbol.name = ".".join(p.name for p in parents) + "." + symbol.name
+                if symbol.kind == "function":
+                    symbol.kind = "method"
+        return symbols
+
+    def _match_definition(self, lines: List[str], index: int) -> Optional[Tuple[str, str]]:
+        """Name and kind of a definition starting on a line, if any"""
+        line = lines[index]
+        for pattern in CONTAINER_PATTERNS:
+            match = pattern.match(line)
+            if match:
+                return match.group('name'), "class"
+
+        for pattern in FUNCTION_PATTERNS:
+            match = pattern.match(line)
+            if match and match.group('name') not in KEYWORDS:
+                owner = match.groupdict().get('owner')
+                if owner:
+                    return f"{owner}.{match.group('name')}", "method"
+                return match.group('name'), "function"
+
+        match = C_FUNCTION_PATTERN.match(line)
+        if match and match.group('name') not in KEYWORDS:
+            following = lines[index + 1].strip() if index + 1 < len(lines) else ""
+            if '{' in line or following.startswith('{'):
+                return match.group('name'), "function"
+        return None
+
+    def _line_depths(self, lines: List[str]) -> List[int]:
+        """Brace depth at the start of each line, ignoring strings and comments"""
+        depths = []
+        depth = 0
+        in_block_comment = False
+        for line in lines:
+            depths.append(depth)
+            index = 0
+            quote = None
+            while index < len(line):
+                char = line[index]
+                if in_block_comment:
+                    if line.startswith('*/', index):
+                        in_block_comment = False
+                        index += 1
+                elif quote:
+                    if char == '\\':
+                        index += 1
+                    elif char == quote:
+                        quote = None
+                elif line.startswith('//', index):
+                    break
+                elif line.startswith('/*', index):
+                    in_block_comment = True
+                    index += 1
+                elif char in '"`':
+                    quote = char
+                elif char == '{':
+                    depth += 1
+                elif char == '}':
+                    depth = max(0, depth - 1)
+                index += 1
+        depths.append(depth)
+        return depths
+
+    def _block_end(self, lines: List[str], depths: List[int], index: int) -> Optional[int]:
+        """Line index where the block opened at or just after index closes"""
+        start_depth = depths[index]
+        # The opening brace may follow a multi-line signature
+        for opening in range(index, min(index + 6, len(lines))):
+            if depths[opening + 1] > start_depth:
+                break
+            if '{' in lines[opening]:
+                # Opened and closed on the same line
+                return opening
+            if lines[opening].rstrip().endswith(';'):
+                return None
+        else:
+            return None
+
+        for end in range(opening + 1, len(lines)):
+            if depths[end + 1] <= start_depth:
+                return end
+        return len(lines) - 1
@@ -0,0 +1,140 @@
+import json
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+# File context size bands (characters) used when grouping by context
+CONTEXT_BANDS = [
+    (0, "none"),
+    (10_000, "< 10 KB"),
+    (50_000, "10-50 KB"),
+    (200_000, "50-200 KB"),
+]
+
+GROUPINGS = ["day", "model", "style", "context"]
+
+
+def context_band(context_chars: int) -> str:
+    """Bucket a file context size"""
+    if not context_chars:
+        return "none"
+    for limit, label in CONTEXT_BANDS[1:]:
+        if context_chars < limit:
+            return label
+    return "> 200 KB"
+
+
+class UsageTracker:
+    """Stores per-request token usage in ~/.pmpt-cli/usage.jsonl and aggregates it"""
+
+    def __init__(self, config_dir: Path = None):
+        self.config_dir = config_dir or Path.home() / ".pmpt-cli"
+        self.usage_file = self.config_dir / "usage.jsonl"
+
+    def record(self, usage: Dict, style: str, context_chars: int = 0):
+        """Append one request's usage"""
+        if not usage or not usage.get('model'):
+            return
+        entry = {
+            'timestamp': time.time(),
+            'model': usage['model'],
+            'style': style,
+            'context_chars': context_chars,
+            'input_tokens': usage.get('input_tokens', 0),
+            'output_tokens': usage.get('output_tokens', 0),
+            'output_chars': usage.get('output_chars', 0),
+            'cached_tokens': usage.get('cached_tokens', 0),
+            'ttft': usage.get('ttft'),
+            'latency': usage.get('latency'),
+            'truncated': usage.get('truncated', False),
+        }
+        # Background requests for prompts that were edited before being submitted
+        if usage.get('speculative'):
+            entry['speculative'] = True
+        try:
+            self.config_dir.mkdir(exist_ok=True)
+            with open(self.usage_file, 'a') as f:
+                f.write(json.dumps(entry) + "\n")
+        except OSError:
+            pass
+
+    def load(self, days: Optional[int] = None) -> List[Dict]:
+        """Load recorded usage, optionally limited to the last N days"""
+        if not self.usage_file.exists():
+            return []
+
+        since = time.time() - days * 86400 if days else 0
+        records = []
+        with open(self.usage_file, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if entry.get('timestamp', 0) >= since:
+                    records.append(entry)
+        return records
+
+    def aggregate(self, records: List[Dict], group_by: str, prices: Dict = None) -> List[Dict]:
+        """Aggregate records into rows keyed by day, model, style or context size"""
+        prices = prices or {}
+        groups = OrderedDict()
+
+        for entry in sorted(records, key=lambda e: e.get('timestamp', 0)):
+            key = self._group_key(entry, group_by)
+            row = groups.setdefault(key, {
+                'key': key,
+                'requests': 0,
+                'input_tokens': 0,
+                'output_tokens': 0,
+                'cached_tokens': 0,
+                'ttft_total': 0.0,
+                'ttft_count': 0,
+                'latency_total': 0.0,
+                'latency_count': 0,
+                'cost': None,
+            })
+            row['requests'] += 1
+            row['input_tokens'] += entry.get('input_tokens', 0)
+            row['output_tokens'] += entry.get('output_tokens', 0)
+            row['cached_tokens'] += entry.get('cached_tokens', 0)
+            if entry.get('ttft') is not None:
+                row['ttft_total'] += entry['ttft']
+                row['ttft_count'] += 1
+            if entry.get('latency') is not None:
+                row['latency_total'] += entry['latency']
+                row['latency_count'] += 1
+
+            cost = self.estimate_cost(entry, prices)
+            if cost is not None:
+                row['cost'] = (row['cost'] or 0.0) + cost
+
+        rows = list(groups.values())
+        for row in rows:
+            row['avg_ttft'] = row['ttft_total'] / row['ttft_count'] if row['ttft_count'] else None
+            row['avg_latency'] = row['latency_total'] / row['latency_count'] if row['latency_count'] else None
+        return rows
+
+    def estimate_cost(self, entry: Dict, prices: Dict) -> Optional[float]:
+        """Estimate request cost from per-million-token prices, if known for the model"""
+        price = prices.get(entry.get('model'))
+        if not price:
+            return None
+        cached = entry.get('cached_tokens', 0)
+        uncached = entry.get('input_tokens', 0) - cached
+        cached_price = price.get('cached_input', price.get('input', 0))
+        return (
+            uncached * price.get('input', 0)
+            + cached * cached_price
+            + entry.get('output_tokens', 0) * price.get('output', 0)
+        ) / 1_000_000
+
+    def _group_key(self, entry: Dict, group_by: str) -> str:
+        """Key of the group a record belongs to"""
+        if group_by == "day":
+            return time.strftime("%Y-%m-%d", time.localtime(entry.get('timestamp', 0)))
+        if group_by == "context":
+            return context_band(entry.get('context_chars', 0))
+        return str(entry.get(group_by) or "unknown")
@@ -0,0 +1,208 @@
+import asyncio
+import fnmatch
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from rich.console import Console
+
+
+ENHANCED_SUFFIX = ".enhanced"
+
+# Directories never worth watching
+SKIP_DIRS = {'.git', 'node_modules', '__pycache__', '.venv', 'venv'}
+
+
+def enhanced_path(path: str) -> str:
+    """Output path written next to a source file (notes.md -> notes.enhanced.md)"""
+    root, ext = os.path.splitext(path)
+    return f"{root}{ENHANCED_SUFFIX}{ext}"
+
+
+class PromptWatcher:
+    """Keeps enhanced copies of prompt files up to date
+
+    The directory is polled with os.scandir and only files whose size or
+    modification time changed are read. A change is processed once the file
+    has been quiet for the debounce period, and only if its content hash
+    differs from the last enhancement with the same style. Dirty files are
+    enhanced concurrently through the application's shared API client.
+    """
+
+    def __init__(self, app, directory: str, style: str, patterns: List[str] = None,
+                 debounce: float = 0.5, interval: float = 0.5, concurrency: int = 4,
+                 console: Console = None):
+        self.app = app
+        self.directory = os.path.abspath(directory)
+        self.style = style
+        self.patterns = patterns or ["*.md"]
+        self.debounce = debounce
+        self.interval = interval
+        self.concurrency = concurrency
+        self.console = console or app.console
+        self.cache_file = app.config_manager.config_dir / "watch-cache.json"
+        self.cache: Dict[str, Dict] = self._load_cache()
+        self._stats: Dict[str, Tuple[int, float]] = {}
+        self._pending: Dict[str, float] = {}
+        self._in_flight: set = set()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._cache_lock = threading.Lock()
+
+    def _load_cache(self) -> Dict[str, Dict]:
+        """Content hashes of already enhanced files"""
+        try:
+            with open(self.cache_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_cache(self, snapshot: Dict[str, Dict]):
+        """Persist a snapshot of the hash cache atomically"""
+        with self._cache_lock:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = self.cache_file.with_suffix(".tmp")
+            with open(temp_file, 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(temp_file, self.cache_file)
+
+    def _matches(self, name: str) -> bool:
+        """Source files only - never our own output"""
+        if os.path.splitext(os.path.splitext(name)[0])[1] == ENHANCED_SUFFIX:
+            return False
+        return any(fnmatch.fnmatch(name, pattern) for pattern in self.patterns)
+
+    def _scan(self) -> List[str]:
+        """Files whose size or mtime changed since the last scan"""
+        changed = []
+        seen = set()
+        stack = [self.directory]
+        while stack:
+            directory = stack.pop()
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in SKIP_DIRS and not entry.name.startswith('.'):
+                        stack.append(entry.path)
+                elif self._matches(entry.name):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    signature = (stat.st_size, stat.st_mtime)
+                    seen.add(entry.path)
+                    if self._stats.get(entry.path) != signature:
+                        self._stats[entry.path] = signature
+                        changed.append(entry.path)
+
+        for path in set(self._stats) - seen:
+            del self._stats[path]
+            self._pending.pop(path, None)
+        return changed
+
+    def _read_if_dirty(self, path: str) -> Optional[Tuple[str, str]]:
+        """Content and hash of a file, or None if it was already enhanced as-is"""
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                content = f.read()
+        except OSError:
+            return None
+        digest = hashlib.sha256(f"{self.style}\0{content}".encode('utf-8')).hexdigest()
+        cached = self.cache.get(path)
+        if cached and cached.get('hash') == digest and os.path.exists(enhanced_path(path)):
+            return None
+        return content, digest
+
+    def _write_output(self, path: str, text: str):
+        """Write the enhanced file atomically"""
+        output = enhanced_path(path)
+        temp_file = output + ".tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            f.write(text.rstrip() + "\n")
+        os.replace(temp_file, output)
+
+    async def _process(self, path: str):
+        """Enhance one file if its content changed"""
+        loop = asyncio.get_running_loop()
+        try:
+            dirty = await loop.run_in_executor(None, self._read_if_dirty, path)
+            if dirty is None or not dirty[0].strip():
+                return
+            content, digest = dirty
+
+            async with self._semaphore:
+                started = time.perf_counter()
+                enhanced, usage = await self.app._enhance_text(content, self.style)
+
+            await loop.run_in_executor(None, self._write_output, path, enhanced)
+            relative = os.path.relpath(path, self.directory)
+            if usage.get('truncated'):
+                # Not cached, so the file is enhanced again on its next change or run
+                self.console.print(
+                    f"[yellow]⚠ {relative}: output hit the {usage.get('max_tokens')}-token budget and was cut off. "
+                    f"Raise output_budgets in ~/.pmpt-cli/config.json if this happens often.[/yellow]"
+                )
+                return
+            self.cache[path] = {'hash': digest, 'style': self.style}
+            await loop.run_in_executor(None, self._save_cache, dict(self.cache))
+
+            self.console.print(
+                f"[green]✓[/green] {relative} → {os.path.basename(enhanced_path(path))} "
+                f"[dim]({time.perf_counter() - started:.1f}s)[/dim]"
+            )
+        except Exception as e:
+            self.console.print(f"[red]✗ {os.path.relpath(path, self.directory)}: {e}[/red]")
+        finally:
+            self._in_flight.discard(path)
+
+    def _due(self) -> List[str]:
+        """Pending files that have been quiet for the debounce period"""
+        now = time.monotonic()
+        due = [
+            path for path, changed_at in self._pending.items()
+            if now - changed_at >= self.debounce and path not in self._in_flight
+        ]
+        for path in due:
+            del self._pending[path]
+            self._in_flight.add(path)
+        return due
+
+    async def run(self, once: bool = False):
+        """Watch until interrupted; with once, process current changes and return"""
+        loop = asyncio.get_running_loop()
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+
+        # The first scan treats every file as changed; the hash cache skips
+        # the ones already enhanced in a previous session
+        ready = time.monotonic() - self.debounce
+        for path in await loop.run_in_executor(None, self._scan):
+            self._pending[path] = ready
+        self.console.print(
+            f"[dim]Watching {len(self._stats)} file(s) in {self.directory} "
+            f"({self.app.enhancement_styles[self.style]['name']} style, Ctrl+C to stop)[/dim]"
+        )
+
+        try:
+            while True:
+                for path in self._due():
+                    task = loop.create_task(self._process(path))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+
+                if once and not self._pending:
+                    if tasks:
+                        await asyncio.gather(*tasks)
+                    return
+
+                await asyncio.sleep(self.interval)
+                now = time.monotonic()
+                for path in await loop.run_in_executor(None, self._scan):
+                    self._pending[path] = now
+        finally:
+            await self.app._close_api_client()
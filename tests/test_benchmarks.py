@@ -0,0 +1,25 @@
+import json
+
+from src.benchmarks import BenchmarkSuite
+from src.config import Config
+
+
+def test_benchmark_app_ignores_the_user_config(tmp_path, monkeypatch):
+    home = tmp_path / "home"
+    (home / ".pmpt-cli").mkdir(parents=True)
+    user_config = {"api_key": "sk-user", "current_style": "creative", "long_prompt_chars": 50, "backend": "http"}
+    (home / ".pmpt-cli" / "config.json").write_text(json.dumps(user_config))
+    monkeypatch.setenv("HOME", str(home))
+
+    suite = BenchmarkSuite(home / ".pmpt-cli", repeat=1)
+    app = suite._make_app()
+    assert app.config == Config()
+    assert app.config_manager.config_dir != home / ".pmpt-cli"
+    assert app.usage_tracker.config_dir == app.config_manager.config_dir
+    assert json.loads((home / ".pmpt-cli" / "config.json").read_text()) == user_config
+
+
+def test_paced_benchmarks_report_their_own_timing(tmp_path):
+    suite = BenchmarkSuite(tmp_path, repeat=2)
+    suite.benchmarks = {"paced": lambda: lambda: 0.25}
+    assert suite.run() == {"paced": {"median": 0.25, "min": 0.25}}
@@ -0,0 +1,38 @@
+import json
+
+from src.config import CHARS_PER_TOKEN, DEFAULT_OUTPUT_BUDGETS, Config, ConfigManager
+
+
+def test_output_budget_covers_long_inputs():
+    config = Config()
+    prompt_chars = 24000
+    for style in ("gentle", "enhanced", "structured", "creative"):
+        assert config.get_output_budget(style, prompt_chars) >= 1.2 * prompt_chars // CHARS_PER_TOKEN
+
+
+def test_output_budget_coverage_stays_within_the_max():
+    # A 40K-character prompt with @file references is not split into sections
+    config = Config()
+    for style, budget in DEFAULT_OUTPUT_BUDGETS.items():
+        assert config.get_output_budget(style, 40000) == budget["max"]
+
+
+def test_output_budget_floor_leaves_room_for_reasoning():
+    assert Config().get_output_budget("gentle", 10) >= 1024
+
+
+def test_output_budget_overrides():
+    config = Config(output_budgets={"structured": {"max": 3000}})
+    assert config.get_output_budget("structured", 8000) == 3000
+    assert config.get_output_budget("structured", 40000) == 3000
+
+    config = Config(output_budgets={"structured": {"max": 16000}})
+    assert config.get_output_budget("structured", 40000) == 16000
+
+
+def test_saved_config_holds_only_changed_settings(tmp_path):
+    manager = ConfigManager(tmp_path)
+    manager.save_config(Config(api_key="key", section_concurrency=8))
+    saved = json.loads((tmp_path / "config.json").read_text())
+    assert saved == {"api_key": "key", "model": "", "current_style": "gentle", "section_concurrency": 8}
+    assert manager.load_config() == Config(api_key="key", section_concurrency=8)
@@ -0,0 +1,80 @@
+from src.context_reducer import ContextReducer
+
+
+def reduce(path, content):
+    return ContextReducer().reduce(path, content)[0]
+
+
+def test_rust_lifetimes_do_not_open_strings():
+    source = (
+        "fn f<'a>(&self, x: &'a str) {\n"
+        "    println!(\"it's at http://example.com\"); // trailing\n"
+        "}\n"
+    )
+    assert reduce("lib.rs", source) == (
+        "fn f<'a>(&self, x: &'a str) {\n"
+        "    println!(\"it's at http://example.com\");\n"
+        "}"
+    )
+
+
+def test_rust_char_literals_and_raw_strings():
+    source = (
+        "let quote = '\\'';\n"
+        "let slash = '/'; // comment\n"
+        "let newline = '\\n';\n"
+        "let path = r\"C:\\dir\\\"; // comment\n"
+        "let url = r#\"see \"http://x.y\"\"#; /* block */\n"
+    )
+    assert reduce("main.rs", source) == (
+        "let quote = '\\'';\n"
+        "let slash = '/';\n"
+        "let newline = '\\n';\n"
+        "let path = r\"C:\\dir\\\";\n"
+        "let url = r#\"see \"http://x.y\"\"#;"
+    )
+
+
+def test_go_runes_and_raw_strings():
+    source = (
+        "r := '\\'' // rune\n"
+        "s := `C:\\path\\` // raw\n"
+        "u := \"http://go.dev\" // url\n"
+    )
+    assert reduce("main.go", source) == (
+        "r := '\\''\n"
+        "s := `C:\\path\\`\n"
+        "u := \"http://go.dev\""
+    )
+
+
+def test_cpp_digit_separators():
+    source = "int n = 1'000'000; // count\nconst char* u = \"http://a.b\"; // url\n"
+    assert reduce("main.cpp", source) == "int n = 1'000'000;\nconst char* u = \"http://a.b\";"
+
+
+def test_javascript_single_quoted_strings():
+    source = "const u = 'http://a.b'; // url\nconst t = `it's // not a comment`;\n"
+    assert reduce("app.js", source) == "const u = 'http://a.b';\nconst t = `it's // not a comment`;"
+
+
+def test_python_comments_and_docstrings():
+    source = 'def f():\n    """Doc"""\n    return "# not a comment"  # comment\n'
+    assert reduce("mod.py", source) == 'def f():\n\n    return "# not a comment"'
+
+
+def test_limit_reduces_only_a_prefix():
+    source = "".join(f"x_{index} = {index}  # comment {index}\n" for index in range(100000))
+    reduced, report = ContextReducer().reduce("big.py", source, limit=1000)
+    assert 1000 <= len(reduced) < len(source) // 100
+    assert reduced.startswith("x_0 = 0\nx_1 = 1\n")
+    assert "#" not in reduced
+    assert report.original_chars == len(source)
+    assert report.note.startswith("first ")
+
+
+def test_javascript_regex_literals_are_not_comments():
+    source = "const slashes = /\\/\\//g; // comment\nconst half = total / 2 // two\nif (/[/]*/.test(s)) return /a\\/b/;\n"
+    assert reduce("app.ts", source) == (
+        "const slashes = /\\/\\//g;\nconst half = total / 2\nif (/[/]*/.test(s)) return /a\\/b/;"
+    )
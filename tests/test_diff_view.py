@@ -0,0 +1,26 @@
+from src.diff_view import DELETE, EQUAL, INSERT, IncrementalWordDiff
+
+
+def run(original: str, chunks):
+    diff = IncrementalWordDiff(original)
+    ops = []
+    for chunk in chunks:
+        ops.extend(diff.feed(chunk))
+    return ops + diff.finish()
+
+
+def test_leading_whitespace_is_kept():
+    streamed = "\n\nRefactor the parser"
+    ops = run("Refactor the parser", ["\n", "\nRefactor", " the parser"])
+    assert "".join(token for _, token in ops) == streamed
+    assert ops[:2] == [(EQUAL, "\n"), (EQUAL, "\n")]
+
+
+def test_trailing_punctuation_does_not_block_matches():
+    ops = run("Refactor the parser so it reports errors", ["Refactor the parser, so it reports errors."])
+    assert (EQUAL, "parser") in ops
+    assert (INSERT, ", ") in ops
+    assert (EQUAL, "errors") in ops
+    assert (INSERT, ".") in ops
+    assert not [token for op, token in ops if op == DELETE]
+    assert "".join(token for _, token in ops) == "Refactor the parser, so it reports errors."
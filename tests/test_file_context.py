@@ -0,0 +1,80 @@
+import threading
+
+import pytest
+
+from src import cli as cli_module
+from src.cli import PromptEnhancerCLI
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    (tmp_path / "home").mkdir()
+    project = tmp_path / "project"
+    project.mkdir()
+    (project / "parser.py").write_text("def parse_config(path):\n    # read the config file\n    return open(path).read()\n")
+    (project / "data.csv").write_text("id,name\n1,a\n2,b\n")
+    for index in range(5):
+        (project / f"util{index}.py").write_text(f"def helper_{index}(value):\n    return value * {index}\n")
+    monkeypatch.chdir(project)
+    return PromptEnhancerCLI()
+
+
+def test_reports_are_returned_per_call(app):
+    prompt, reports = app._integrate_file_context("explain @parser.py:min and @data.csv")
+    assert "--- File: parser.py:min ---" in prompt or "--- File: parser.py ---" in prompt
+    assert [report.path for report in reports.reductions] == ["parser.py", "data.csv"]
+    assert reports.retrieval is None
+
+    prompt, reports = app._integrate_file_context("no references here")
+    assert prompt == "no references here"
+    assert reports.reductions == []
+
+
+def test_concurrent_repo_references_share_one_index(app, monkeypatch):
+    created = []
+    original = cli_module.RepoIndex
+
+    def counting_index(*args, **kwargs):
+        created.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(cli_module, "RepoIndex", counting_index)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(app._integrate_file_context("how is parse config read @repo")))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
+    assert len(results) == 4
+    for prompt, reports in results:
+        assert "parse_config" in prompt
+        assert reports.retrieval is not None
+
+
+def test_references_are_extracted_once_per_prompt(app, monkeypatch):
+    calls = []
+    original = app._extract_file_references
+
+    def counting_extract(prompt):
+        calls.append(prompt)
+        return original(prompt)
+
+    monkeypatch.setattr(app, "_extract_file_references", counting_extract)
+    prompt, reports = app._integrate_file_context("explain @parser.py")
+    assert [reference.token for reference in reports.references] == ["parser.py"]
+    assert len(calls) == 1
+
+
+def test_blob_diff_of_a_missing_object_is_a_placeholder(app):
+    class MissingBatch:
+        def read(self, spec):
+            return None
+
+    app.git_references._batch = MissingBatch()
+    assert app.git_references._blob_diff("parser.py", "0" * 40, None) == f"[parser.py {'0' * 40} not found]"
@@ -0,0 +1,157 @@
+import asyncio
+import json
+import random
+from pathlib import Path
+
+import pytest
+
+from src.config import Config
+from src.fake_server import FakeProvider, start_fake_server
+from src.http_backend import HTTPBackend, HTTPStatusError, SSEDecoder
+from src.providers import APIClient
+
+
+FIXTURES = Path(__file__).parent / "fixtures"
+STREAM_FIXTURES = ["openai_stream.sse", "openai_error.sse", "anthropic_stream.sse", "anthropic_error.sse"]
+
+
+def fixture_bytes(name: str) -> bytes:
+    return (FIXTURES / name).read_bytes()
+
+
+def decode(chunks) -> list:
+    decoder = SSEDecoder()
+    events = []
+    for chunk in chunks:
+        events += decoder.feed(chunk)
+    return events
+
+
+@pytest.mark.parametrize("name", STREAM_FIXTURES)
+def test_decoder_is_independent_of_chunk_boundaries(name):
+    data = fixture_bytes(name)
+    whole = decode([data])
+    assert whole
+    assert decode(data[index:index + 1] for index in range(len(data))) == whole
+
+    rng = random.Random(name)
+    cuts = sorted(rng.sample(range(1, len(data)), 20))
+    assert decode(data[start:end] for start, end in zip([0] + cuts, cuts + [len(data)])) == whole
+
+
+@pytest.mark.parametrize("name", STREAM_FIXTURES)
+def test_decoder_accepts_crlf(name):
+    data = fixture_bytes(name)
+    assert decode([data.replace(b"\n", b"\r\n")]) == decode([data])
+
+
+def test_decoder_events_and_comments():
+    events = decode([b": keep-alive\n\nevent: ping\ndata: {}\n\ndata: first\ndata:second\n\n"])
+    assert events == [("ping", "{}"), ("message", "first\nsecond")]
+
+
+def test_decoder_openai_fixture():
+    events = decode([fixture_bytes("openai_stream.sse")])
+    assert events[-1] == ("message", "[DONE]")
+    usage = json.loads(events[-2][1])["usage"]
+    assert usage["completion_tokens"] == 7
+
+
+async def _with_server(provider: FakeProvider, test):
+    runner, url = await start_fake_server(provider)
+    try:
+        return await test(url)
+    finally:
+        await runner.cleanup()
+
+
+def _client(url: str, api_format: str, backend: str = "http") -> APIClient:
+    base_url = url + "/v1" if api_format == "openai" else url
+    config = Config(api_key="test", base_url=base_url, model="test-model", backend=backend)
+    return APIClient(config, api_format=api_format, coalesce=False)
+
+
+async def _stream(client: APIClient) -> str:
+    try:
+        return "".join([chunk async for chunk in client.enhance_prompt_stream("prompt", "system", 64)])
+    finally:
+        await client.close()
+
+
+@pytest.mark.parametrize("api_format, fixture, usage", [
+    ("openai", "openai_stream.sse", {"input_tokens": 31, "output_tokens": 7, "truncated": False}),
+    ("anthropic", "anthropic_stream.sse", {"input_tokens": 25, "output_tokens": 7, "truncated": True}),
+])
+def test_http_backend_replays_recorded_streams(api_format, fixture, usage):
+    async def test(url):
+        client = _client(url, api_format)
+        text = await _stream(client)
+        return text, client.last_usage
+
+    text, last_usage = asyncio.run(_with_server(FakeProvider(replay=str(FIXTURES / fixture)), test))
+    assert text == "Write a haiku about autumn leaves."
+    assert {key: last_usage[key] for key in usage} == usage
+
+
+@pytest.mark.parametrize("path, fixture", [
+    ("/v1/chat/completions", "openai_error.sse"),
+    ("/v1/messages", "anthropic_error.sse"),
+])
+def test_http_backend_raises_on_error_events(path, fixture):
+    async def test(url):
+        backend = HTTPBackend(url, {})
+        received = []
+        try:
+            with pytest.raises(HTTPStatusError, match="Stream error"):
+                async for event, data in backend.stream(path, {"stream": True, "messages": []}):
+                    received.append(event)
+        finally:
+            await backend.close()
+        return received
+
+    assert asyncio.run(_with_server(FakeProvider(replay=str(FIXTURES / fixture)), test))
+
+
+@pytest.mark.parametrize("api_format", ["openai", "anthropic"])
+@pytest.mark.parametrize("backend", ["http", "sdk"])
+def test_backends_agree_on_generated_streams(api_format, backend):
+    async def test(url):
+        client = _client(url, api_format, backend)
+        streamed = await _stream(client)
+        client = _client(url, api_format, backend)
+        try:
+            complete = await client.enhance_prompt("prompt", "system", 64)
+        finally:
+            await client.close()
+        return streamed, complete, client.last_usage
+
+    streamed, complete, usage = asyncio.run(_with_server(FakeProvider(words=20), test))
+    assert streamed.startswith("Enhanced:")
+    assert streamed.strip() == complete
+    assert usage["output_tokens"] == 20
+
+
+@pytest.mark.parametrize("api_format", ["openai", "anthropic"])
+def test_http_backend_resumes_dropped_stream(api_format):
+    async def test(url):
+        client = _client(url, api_format)
+        text = await _stream(client)
+        return text, client.last_usage
+
+    provider = FakeProvider(words=30, drop_after=10)
+    text, usage = asyncio.run(_with_server(provider, test))
+    assert usage["resumes"] == 1
+    assert len(text.split()) >= 30
+
+
+def test_http_status_errors_carry_the_body():
+    async def test(url):
+        backend = HTTPBackend(url, {})
+        try:
+            await backend.post_json("/missing", {})
+        finally:
+            await backend.close()
+
+    with pytest.raises(HTTPStatusError) as error:
+        asyncio.run(_with_server(FakeProvider(), test))
+    assert error.value.status_code == 404
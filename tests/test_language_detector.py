@@ -0,0 +1,7 @@
+from src.context_reducer import ContextReducer
+from src.language_detector import LanguageDetector
+
+
+def test_extension_table_holds_only_single_suffixes():
+    assert all(ext.count('.') == 1 for ext in LanguageDetector.EXTENSION_LANGUAGES)
+    assert ContextReducer().detect_language("types/index.d.ts") == "typescript"
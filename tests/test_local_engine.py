@@ -0,0 +1,8 @@
+from src.local_engine import LocalGentleEngine
+
+
+def test_negated_questions_end_with_a_question_mark():
+    engine = LocalGentleEngine()
+    assert engine.enhance("cant you help me with teh layout") == "Can't you help me with the layout?"
+    assert engine.enhance("doesn’t this need a test") == "Doesn’t this need a test?"
+    assert engine.enhance("dont change the public api") == "Don't change the public api."
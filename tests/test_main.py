@@ -0,0 +1,19 @@
+from click.testing import CliRunner
+
+import pmpt_main
+
+
+def test_profile_flag_does_not_swallow_subcommand(tmp_path):
+    out = tmp_path / "profile.txt"
+    result = CliRunner().invoke(pmpt_main.cli, ['--profile', '--profile-out', str(out), 'version'])
+    assert result.exit_code == 0
+    assert "PMPT CLI version" in result.output
+    assert out.exists()
+    assert not (tmp_path / "version").exists()
+
+
+def test_fake_server_is_left_out_of_help():
+    result = CliRunner().invoke(pmpt_main.cli, ['--help'])
+    assert result.exit_code == 0
+    assert "bench-models" in result.output
+    assert "fake-server" not in result.output
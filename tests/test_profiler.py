@@ -0,0 +1,37 @@
+import asyncio
+import sys
+
+from src.profiler import SamplingProfiler, profile_phase
+
+
+def sample_phase() -> str:
+    frames = []
+    frame = sys._getframe()
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    return SamplingProfiler()._classify(frames[::-1], True)
+
+
+def test_interleaved_tasks_keep_their_phases():
+    seen = []
+
+    async def first():
+        with profile_phase("user input"):
+            await asyncio.sleep(0)  # The second task enters its phase
+            await asyncio.sleep(0)
+        seen.append(sample_phase())  # The second task is still waiting on the network
+
+    async def second():
+        with profile_phase("network wait"):
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            seen.append(sample_phase())
+
+    async def run():
+        await asyncio.gather(first(), second())
+
+    asyncio.run(run())
+    assert seen == ["network wait", "network wait"]
+    assert sample_phase() == "startup"
@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from src.config import Config
+from src.fake_server import FakeProvider, start_fake_server
+from src.providers import APIClient
+
+
+def budget(body: dict) -> int:
+    return body.get('max_tokens') or body.get('max_completion_tokens')
+
+
+async def _run(provider: FakeProvider, api_format: str, max_tokens: int, backend: str = "http",
+               messages: list = None) -> tuple:
+    runner, url = await start_fake_server(provider)
+    base_url = url + "/v1" if api_format == "openai" else url
+    client = APIClient(Config(api_key="test", base_url=base_url, model="test-model", backend=backend),
+                       api_format=api_format, coalesce=False)
+    messages = messages or [{"role": "user", "content": "prompt"}]
+    try:
+        text = "".join([chunk async for chunk in client.stream_conversation(messages, "system", max_tokens)])
+        return text, client.last_usage
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+@pytest.mark.parametrize("api_format", ["openai", "anthropic"])
+def test_resumed_stream_gets_the_remaining_budget(api_format):
+    provider = FakeProvider(words=100, drop_after=40)
+    text, usage = asyncio.run(_run(provider, api_format, 200))
+    assert usage['resumes'] == 1
+    first, second = provider.bodies
+    assert budget(first) == 200
+    received_tokens = len(text) // 4
+    assert 0 < budget(second) < 200
+    assert budget(second) >= 200 - received_tokens
+
+
+def test_resume_stops_when_the_budget_is_spent():
+    # 60 words of roughly 8 characters already use up a 100-token budget
+    provider = FakeProvider(words=200, drop_after=60)
+    text, usage = asyncio.run(_run(provider, "openai", 100))
+    assert len(provider.bodies) == 1
+    assert usage['truncated']
+
+
+def cache_marked(body: dict) -> bool:
+    return isinstance(body['system'], list) and 'cache_control' in body['system'][0]
+
+
+LARGE_CONTEXT = "--- File: notes.md ---\n" + "Some project notes. " * 300
+
+
+def test_first_request_is_not_marked_for_caching():
+    provider = FakeProvider(words=20)
+    asyncio.run(_run(provider, "anthropic", 200, messages=[{"role": "user", "content": LARGE_CONTEXT}]))
+    assert not cache_marked(provider.bodies[0])
+
+
+def test_resumed_first_request_is_not_marked_for_caching():
+    provider = FakeProvider(words=100, drop_after=40)
+    asyncio.run(_run(provider, "anthropic", 200, messages=[{"role": "user", "content": LARGE_CONTEXT}]))
+    assert len(provider.bodies) == 2
+    assert not any(cache_marked(body) for body in provider.bodies)
+
+
+def test_refinement_marks_the_prefix_for_caching():
+    provider = FakeProvider(words=20)
+    messages = [
+        {"role": "user", "content": LARGE_CONTEXT},
+        {"role": "assistant", "content": "An enhanced prompt."},
+        {"role": "user", "content": "Revise the enhanced prompt above as follows: make it shorter"},
+    ]
+    asyncio.run(_run(provider, "anthropic", 200, messages=messages))
+    body = provider.bodies[0]
+    assert cache_marked(body)
+    assert body['messages'][0]['content'][0]['cache_control'] == {"type": "ephemeral"}
+    assert body['messages'][1:] == messages[1:]
+
+
+@pytest.mark.parametrize("backend", ["http", "sdk"])
+def test_stream_options_are_dropped_when_rejected(backend):
+    provider = FakeProvider(words=20, reject_stream_options=True)
+
+    async def run():
+        runner, url = await start_fake_server(provider)
+        client = APIClient(Config(api_key="test", base_url=url + "/v1", model="test-model", backend=backend),
+                           api_format="openai", coalesce=False)
+        try:
+            texts = []
+            for _ in range(2):
+                texts.append("".join([chunk async for chunk in client.enhance_prompt_stream("prompt", "system", 64)]))
+            return texts, client.stream_usage
+        finally:
+            await client.close()
+            await runner.cleanup()
+
+    texts, stream_usage = asyncio.run(run())
+    assert all(text.startswith("Enhanced:") for text in texts)
+    assert not stream_usage
+    # One rejected request, then the retry and the second request without the parameter
+    assert ['stream_options' in body for body in provider.bodies] == [True, False, False]
+
+
+class InvalidRequestProvider(FakeProvider):
+    """Rejects every chat completion, with or without stream_options"""
+
+    async def chat_completions(self, request):
+        self.bodies.append(await request.json())
+        return web.json_response({"error": {"message": "Unknown model", "type": "invalid_request_error"}}, status=400)
+
+
+def test_stream_options_are_kept_when_the_request_is_invalid_anyway():
+    provider = InvalidRequestProvider()
+
+    async def run():
+        runner, url = await start_fake_server(provider)
+        client = APIClient(Config(api_key="test", base_url=url + "/v1", model="test-model", backend="http"),
+                           api_format="openai", coalesce=False)
+        try:
+            with pytest.raises(Exception, match="Unknown model"):
+                async for _ in client.enhance_prompt_stream("prompt", "system", 64):
+                    pass
+            return client.stream_usage
+        finally:
+            await client.close()
+            await runner.cleanup()
+
+    assert asyncio.run(run())
+    assert ['stream_options' in body for body in provider.bodies] == [True, False]
+
+
+@pytest.mark.parametrize("backend", ["http", "sdk"])
+def test_streams_without_usage_record_latency_and_size(backend):
+    provider = FakeProvider(words=20, reject_stream_options=True)
+    text, usage = asyncio.run(_run(provider, "openai", 64, backend))
+    assert usage['output_tokens'] == 0
+    assert usage['latency'] is not None and usage['ttft'] is not None
+    assert usage['output_chars'] == len(text)
@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+from src import repo_index
+from src.repo_index import RepoIndex
+
+
+def write_module(root, name: str, function: str, body: str = "value"):
+    (root / name).write_text(f"def {function}(value):\n    return {body}\n")
+
+
+@pytest.fixture
+def project(tmp_path):
+    root = tmp_path / "project"
+    root.mkdir()
+    for index in range(8):
+        write_module(root, f"module{index}.py", f"helper_{index}_shared", f"value + {index}")
+    write_module(root, "parser.py", "parse_config", "open(value).read()")
+    return root
+
+
+def names(index: RepoIndex, query: str):
+    return [result.name for result in index.search(query)]
+
+
+def test_search_survives_reopening(project, tmp_path):
+    index = RepoIndex(str(project), str(tmp_path / "cache"))
+    assert index.refresh(force=True) == 9
+    assert names(index, "where is parse_config") == ["parse_config"]
+
+    reopened = RepoIndex(str(project), str(tmp_path / "cache"))
+    assert not reopened.is_empty
+    assert reopened.refresh(force=True) == 0
+    assert names(reopened, "where is parse_config") == ["parse_config"]
+
+
+def test_refresh_writes_only_changed_files(project, tmp_path):
+    index = RepoIndex(str(project), str(tmp_path / "cache"))
+    index.refresh(force=True)
+    merged = index._merged
+
+    write_module(project, "parser.py", "load_settings")
+    os.remove(project / "module3.py")
+    assert index.refresh(force=True) == 2
+    assert index._merged == merged
+    assert index._recent > 0
+
+    assert names(index, "parse_config") == []
+    assert names(index, "load_settings") == ["load_settings"]
+    assert names(index, "helper_3_shared") == []
+
+    reopened = RepoIndex(str(project), str(tmp_path / "cache"))
+    assert reopened.refresh(force=True) == 0
+    assert names(reopened, "load_settings") == ["load_settings"]
+    assert names(reopened, "parse_config") == []
+
+
+def test_merge_drops_stale_postings(project, tmp_path, monkeypatch):
+    monkeypatch.setattr(repo_index, "MERGE_MIN_POSTINGS", 0)
+    monkeypatch.setattr(repo_index, "MERGE_FRACTION", 0)
+    index = RepoIndex(str(project), str(tmp_path / "cache"))
+    index.refresh(force=True)
+
+    for round_number in range(3):
+        write_module(project, "parser.py", f"load_settings_{round_number}", "value" + " + 1" * round_number)
+        assert index.refresh(force=True) == 1
+        assert index._recent == index._stale == 0
+        assert names(index, f"load_settings_{round_number}") == [f"load_settings_{round_number}"]
+    assert names(index, "parse_config") == []
+
+    live = set(index._lengths)
+    stored = {chunk_id for _, chunks, _ in index._read_postings() for chunk_id in chunks}
+    assert stored == live
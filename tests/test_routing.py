@@ -0,0 +1,60 @@
+import json
+import time
+
+from src.config import Config
+from src.routing import MAX_EXPLORATION_REQUESTS, ModelRouter
+from src.usage import UsageTracker
+
+
+def write_log(tmp_path, entries) -> UsageTracker:
+    tracker = UsageTracker(tmp_path)
+    now = time.time()
+    with open(tracker.usage_file, 'w') as f:
+        for entry in entries:
+            f.write(json.dumps(dict({'timestamp': now, 'style': 'enhanced'}, **entry)) + "\n")
+    return tracker
+
+
+def entries(model: str, count: int, **fields) -> list:
+    return [dict(fields, model=model) for _ in range(count)]
+
+
+def router(tmp_path, log, models, **adaptive) -> ModelRouter:
+    config = Config(adaptive_routing=dict(adaptive, models=models), model_prices={
+        "cheap": {"input": 0.15, "output": 0.6},
+        "pricey": {"input": 2.5, "output": 10},
+    })
+    return ModelRouter(config, write_log(tmp_path, log))
+
+
+def test_non_streaming_and_usage_less_requests_are_samples(tmp_path):
+    log = (
+        # Watch mode and sections: no TTFT
+        entries("cheap", 3, output_tokens=200, latency=4.0, ttft=None)
+        # Streams from a server that rejected stream_options: no token counts
+        + entries("pricey", 3, output_tokens=0, output_chars=800, latency=2.5, ttft=0.5)
+    )
+    stats = router(tmp_path, log, ["cheap", "pricey"]).model_stats()
+    assert stats["cheap"]["samples"] == 3
+    assert stats["cheap"]["tokens_per_second"] == 50
+    assert stats["pricey"]["samples"] == 3
+    assert stats["pricey"]["tokens_per_second"] == 100
+
+
+def test_exploration_stops_for_models_that_never_yield_samples(tmp_path):
+    measured = entries("pricey", 3, output_tokens=200, latency=2.5, ttft=0.5)
+    failing = entries("cheap", MAX_EXPLORATION_REQUESTS, output_tokens=0, latency=None, ttft=None)
+    assert router(tmp_path, measured + failing[:-1], ["cheap", "pricey"]).choose("enhanced", 400) == "cheap"
+    assert router(tmp_path, measured + failing, ["cheap", "pricey"]).choose("enhanced", 400) == "pricey"
+
+
+def test_cheapest_model_within_the_target_is_chosen(tmp_path):
+    log = (
+        entries("cheap", 3, output_tokens=300, latency=7.0, ttft=1.0)  # 50 tokens/s
+        + entries("pricey", 3, output_tokens=300, latency=2.0, ttft=0.5)  # 200 tokens/s
+    )
+    # 1,000 characters: about 625 enhanced tokens, 13.5 s on the cheap model
+    assert router(tmp_path, log, ["cheap", "pricey"], target_latency=10).choose("enhanced", 1000) == "pricey"
+    # 400 characters: about 250 tokens, 6 s on the cheap model, though its
+    # 2,048-token budget floor alone would take 42 s
+    assert router(tmp_path, log, ["cheap", "pricey"], target_latency=10).choose("enhanced", 400) == "cheap"
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from src.cli import PromptEnhancerCLI
+from src.sections import split_sections
+
+
+class SectionClient:
+    """Stands in for APIClient: one section succeeds, one fails, one never finishes"""
+
+    def __init__(self):
+        self.last_usage = {}
+        self.cleaned_up = False
+
+    async def enhance_prompt(self, prompt, system_prompt=None, max_tokens=None, model=None):
+        self.last_usage = {'model': model, 'max_tokens': max_tokens, 'truncated': False}
+        if prompt.startswith("# First"):
+            return "Enhanced first section"
+        if prompt.startswith("# Second"):
+            raise ConnectionError("section request failed")
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            # Like closing the request's connection
+            await asyncio.sleep(0.05)
+            self.cleaned_up = True
+            raise
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    (tmp_path / "home").mkdir()
+    monkeypatch.chdir(tmp_path)
+    app = PromptEnhancerCLI()
+    app.api_client = SectionClient()
+    return app
+
+
+def test_failed_section_waits_for_the_cancelled_ones(app):
+    prompt = "\n\n".join(f"# {name}\n\n" + f"Details about the {name.lower()} part. " * 150
+                         for name in ("First", "Second", "Third"))
+    sections = split_sections(prompt, target_chars=1000)
+    assert len(sections) == 3
+
+    async def run():
+        result = await app._enhance_sections(prompt, sections)
+        # Still inside the same event loop turn as the return
+        return result, app.api_client.cleaned_up
+
+    result, cleaned_up = asyncio.run(run())
+    assert result.startswith("Enhanced first section")
+    assert cleaned_up
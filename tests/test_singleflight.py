@@ -0,0 +1,26 @@
+import asyncio
+
+from src.singleflight import SingleFlight
+
+
+def test_last_subscriber_waits_for_the_cancelled_upstream():
+    closed = []
+
+    async def upstream(flight):
+        try:
+            yield "first"
+            await asyncio.sleep(3600)
+        finally:
+            # Like closing the request's connection
+            await asyncio.sleep(0.05)
+            closed.append(True)
+
+    async def run():
+        flight, leader = SingleFlight().join("key", upstream)
+        assert leader
+        stream = flight.subscribe()
+        assert await stream.__anext__() == "first"
+        await stream.aclose()
+        return bool(closed), flight.task.cancelled()
+
+    assert asyncio.run(run()) == (True, True)